@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import time
+
+from app.cache import usage_to_dict
+from app.clients import get_async_groq_client
+from app.completion import CompletionTimer, stream_completion_async
+from app.prompt import build_messages, compact_prompt
+from app.utils import read_file
+
+DEFAULT_MODELS = ["llama3-8b-8192"]
+
+
+async def read_document(file_path, cache=None, executor=None, **read_options):
+    """Extract the text of a document without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(read_file, file_path, cache=cache, **read_options)
+    )
+
+
+async def prepare(resume, description, models, max_token, compact, registry):
+    # Returns [(model, messages, max_token)], the registry may need a request
+    if registry is not None:
+        await asyncio.to_thread(registry.models)
+
+    jobs = []
+    for model in models:
+        model_max_token = max_token
+        context_window = None
+        if registry is not None:
+            model_max_token = registry.max_tokens(model, max_token)
+            context_window = registry.context_window(model)
+        model_resume, model_description = resume, description
+        if compact:
+            model_resume, model_description = compact_prompt(
+                resume, description, model, model_max_token, context_window
+            )
+        jobs.append(
+            (model, build_messages(model_resume, model_description), model_max_token)
+        )
+    return jobs
+
+
+async def stream_model(
+    client,
+    messages,
+    model,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+):
+    """Async-yield {"model", "content"} pieces, then one final "done" event."""
+    timer = CompletionTimer(model)
+    error = None
+    try:
+        async for piece in stream_completion_async(
+            client, messages, model, temperature, max_token, cache, refresh, timer
+        ):
+            yield {"model": model, "content": piece}
+    except Exception as e:
+        error = str(e)
+
+    yield {
+        "model": model,
+        "done": True,
+        "usage": usage_to_dict(timer.usage),
+        "cached": timer.cached,
+        "timings": {
+            "time_to_first_token": timer.time_to_first_token,
+            "total": time.perf_counter() - timer.start,
+        },
+        "error": error,
+    }
+
+
+def check_inputs(resume, description, api_key):
+    if api_key is None:
+        raise ValueError("API key is required")
+
+    if resume is None:
+        raise ValueError("Resume is missing")
+
+    if description is None:
+        raise ValueError("Description is required")
+
+
+async def enhance(
+    resume,
+    description,
+    api_key,
+    models=None,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+    compact=False,
+    registry=None,
+):
+    """Enhance `resume` for `description` with every model at once.
+
+    Nothing is printed. Returns one dict per model, in the order of `models`:
+    {"model", "content", "usage", "cached", "timings", "error"}, where
+    timings holds "time_to_first_token" and "total" in seconds.
+    """
+    check_inputs(resume, description, api_key)
+    client = get_async_groq_client(api_key)
+    jobs = await prepare(
+        resume, description, models or DEFAULT_MODELS, max_token, compact, registry
+    )
+
+    async def run(model, messages, model_max_token):
+        parts = []
+        async for event in stream_model(
+            client, messages, model, temperature, model_max_token, cache, refresh
+        ):
+            if event.get("done"):
+                result = {key: value for key, value in event.items() if key != "done"}
+                result["content"] = None if event["error"] else "".join(parts)
+                return result
+            parts.append(event["content"])
+
+    return list(await asyncio.gather(*(run(*job) for job in jobs)))
+
+
+async def enhance_stream(
+    resume,
+    description,
+    api_key,
+    models=None,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+    compact=False,
+    registry=None,
+):
+    """Async-yield the events of every model in the order they arrive.
+
+    Content events are {"model", "content"}, and each model ends with a
+    {"model", "done": True, "usage", "cached", "timings", "error"} event.
+    """
+    check_inputs(resume, description, api_key)
+    client = get_async_groq_client(api_key)
+    jobs = await prepare(
+        resume, description, models or DEFAULT_MODELS, max_token, compact, registry
+    )
+    events = asyncio.Queue()
+
+    async def pump(model, messages, model_max_token):
+        async for event in stream_model(
+            client, messages, model, temperature, model_max_token, cache, refresh
+        ):
+            await events.put(event)
+
+    tasks = [asyncio.create_task(pump(*job)) for job in jobs]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            event = await events.get()
+            if event.get("done"):
+                remaining -= 1
+            yield event
+    finally:
+        # Stop the other models when the consumer stops early, their flights
+        # close the upstream streams once no subscriber is left
+        for task in tasks:
+            task.cancel()
+
+
+async def enhance_files(
+    resume_path,
+    description_path,
+    api_key,
+    document_cache=None,
+    read_options=None,
+    **options,
+):
+    """Read both documents in the default executor, then `enhance` them."""
+    resume, description = await asyncio.gather(
+        read_document(resume_path, document_cache, **(read_options or {})),
+        read_document(description_path, document_cache, **(read_options or {})),
+    )
+    return await enhance(resume, description, api_key, **options)
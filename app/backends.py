@@ -0,0 +1,432 @@
+import abc
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from app.cache import DEFAULT_CACHE_DIR
+from app.clients import get_groq_client
+from app.matching import TOKEN_PATTERN, tokenize
+from app.prompt import estimate_messages_tokens, estimate_tokens, split_user_message
+from app.sections import split_sections
+from app.structured import JSON_PROMPT
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+DEFAULT_BACKEND = "groq"
+
+# Description terms the keyword analyzer compares against the resume
+MAX_KEY_TERMS = 30
+MAX_MISSING_KEYWORDS = 15
+MAX_SUGGESTED_EDITS = 5
+
+# Words every job posting uses, they say nothing about the skills asked for
+POSTING_WORDS = frozenset(
+    """
+    ability able across based best candidate company day environment excellent
+    experience get good great help ideal including join know looking make new
+    one plus preferred required requirements responsibilities role run strong
+    team teams use using work working year years
+    """.split()
+)
+
+# Skill-like terms count this many times as much as other words
+SKILL_WEIGHT = 2
+
+WORD_PATTERN = re.compile(TOKEN_PATTERN.pattern, re.IGNORECASE)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?:;])\s+|\n+")
+
+# Characters per streamed chunk of an offline answer
+OFFLINE_CHUNK_CHARS = 64
+
+# Options of the llama.cpp backend, models are GGUF files in `models_dir`
+DEFAULT_LLAMA_OPTIONS = {
+    "models_dir": os.path.join(DEFAULT_CACHE_DIR, "models"),
+    "n_ctx": 4096,
+    "n_threads": None,
+}
+
+
+def make_chunk(content=None, usage=None):
+    # Same shape as a chunk of a Groq stream
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content))],
+        x_groq=SimpleNamespace(usage=usage) if usage is not None else None,
+    )
+
+
+def make_usage(messages, content, started):
+    elapsed = time.perf_counter() - started
+    prompt_tokens = estimate_messages_tokens(messages)
+    completion_tokens = estimate_tokens(content)
+    return SimpleNamespace(
+        completion_tokens=completion_tokens,
+        prompt_tokens=prompt_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+        completion_time=elapsed,
+        prompt_time=0.0,
+        queue_time=0.0,
+        total_time=elapsed,
+    )
+
+
+def stream_text(messages, content, started, chunk_chars=OFFLINE_CHUNK_CHARS, delay=0):
+    # Stream a finished answer in pieces, usage rides on the last chunk
+    for start in range(0, len(content), chunk_chars):
+        if delay:
+            time.sleep(delay)
+        yield make_chunk(content[start : start + chunk_chars])
+    yield make_chunk(usage=make_usage(messages, content, started))
+
+
+class OfflineClient(abc.ABC):
+    """Base of the clients that answer without a network request.
+
+    They follow the part of the Groq client the completion helpers use,
+    `client.chat.completions.create(...)` returning a stream of chunks, so
+    everything built on top (cache, coalescing, sections, batch) works
+    unchanged. Subclasses implement `answer(messages, model, temperature,
+    max_tokens)` and return the whole text, and name their backend in
+    `backend`, which keeps their cached responses apart from Groq's.
+    """
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, temperature=0.5, max_tokens=1024, stream=True):
+        started = time.perf_counter()
+        content = self.answer(messages, model, temperature, max_tokens)
+        return stream_text(messages, content, started)
+
+    @abc.abstractmethod
+    def answer(self, messages, model, temperature, max_tokens):
+        """Return the whole answer to `messages` as one string."""
+
+
+def split_messages(messages):
+    # Returns (system prompt, description, resume) of a request
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = next((m["content"] for m in messages if m["role"] == "user"), "")
+    description, resume = split_user_message(user)
+    return system, description, resume
+
+
+def skill_terms(text):
+    # Words capitalized inside a sentence or written with digits or symbols,
+    # such as "Kubernetes", "AWS", "C++" or "node.js", are most likely skills
+    terms = set()
+    for sentence in SENTENCE_SPLIT.split(text):
+        for index, match in enumerate(WORD_PATTERN.finditer(sentence)):
+            word = match.group(0)
+            if (index and word[0].isupper()) or re.search(r"[\d+#.]", word):
+                terms.add(word.lower())
+    return terms
+
+
+def display_term(term, text):
+    # The term as it is written in `text`, tokens themselves are lowercase
+    match = re.search(
+        r"(?<![\w+#.])" + re.escape(term) + r"(?![\w+#])", text, re.IGNORECASE
+    )
+    return match.group(0) if match else term
+
+
+def term_sentence(term, text):
+    for sentence in SENTENCE_SPLIT.split(text):
+        if term in tokenize(sentence):
+            return sentence.strip()
+    return ""
+
+
+def keyword_gap(resume, description):
+    """Compare the key terms of a job description with a resume.
+
+    Key terms are the description tokens weighted by how often they occur,
+    with skill-like terms counting double. The match score is the share of
+    the weight of the key terms that the resume covers. Returns a dict with
+    the fields of the structured result.
+    """
+    counts = Counter(
+        token
+        for token in tokenize(description)
+        if not token.isdigit() and token not in POSTING_WORDS
+    )
+    skills = skill_terms(description)
+    weights = {
+        term: count * (SKILL_WEIGHT if term in skills else 1)
+        for term, count in counts.items()
+    }
+    # Heaviest first, ties keep the order of the description
+    key_terms = sorted(weights.items(), key=lambda item: -item[1])[:MAX_KEY_TERMS]
+    present = set(tokenize(resume))
+
+    total = sum(weight for _, weight in key_terms)
+    covered = sum(weight for term, weight in key_terms if term in present)
+    missing = [term for term, _ in key_terms if term not in present]
+    score = round(100 * covered / total) if total else 0
+
+    skills_section = split_sections(resume).get("skills", "")
+    current = skills_section.splitlines()[0] if skills_section else ""
+    suggested_edits = []
+    for term in missing[:MAX_SUGGESTED_EDITS]:
+        name = display_term(term, description)
+        sentence = term_sentence(term, description)
+        suggestion = f"Add {name} if you have used it"
+        if sentence:
+            suggestion += f', the job asks for it: "{sentence}"'
+        suggested_edits.append(
+            {"section": "Skills", "current": current, "suggestion": suggestion}
+        )
+
+    matched = len(key_terms) - len(missing)
+    summary = (
+        f"The resume covers {matched} of the {len(key_terms)} key terms of the "
+        f"job description, {score}% of their weight."
+    )
+    if missing:
+        gaps = ", ".join(display_term(term, description) for term in missing[:3])
+        summary += f" The largest gaps are {gaps}."
+
+    return {
+        "match_score": score,
+        "missing_keywords": [
+            display_term(term, description) for term in missing[:MAX_MISSING_KEYWORDS]
+        ],
+        "suggested_edits": suggested_edits,
+        "summary": summary,
+    }
+
+
+def format_gap_report(result):
+    lines = [f"Keyword match: {result['match_score']}%", ""]
+    if result["missing_keywords"]:
+        lines.append("Missing keywords:")
+        lines += [f"- {keyword}" for keyword in result["missing_keywords"]]
+        lines.append("")
+    if result["suggested_edits"]:
+        lines.append("Suggested edits:")
+        lines += [
+            f"- {edit['section']}: {edit['suggestion']}"
+            for edit in result["suggested_edits"]
+        ]
+        lines.append("")
+    lines.append(result["summary"])
+    return "\n".join(lines) + "\n"
+
+
+class KeywordGapClient(OfflineClient):
+    """Deterministic keyword gap analysis of the extracted text, no model.
+
+    It does not rewrite the resume, it reports which key terms of the job
+    description the resume is missing. JSON requests get the structured
+    result, every other request a plain text report.
+    """
+
+    backend = "keywords"
+
+    def answer(self, messages, model, temperature, max_tokens):
+        system, description, resume = split_messages(messages)
+        result = keyword_gap(resume, description)
+        if system == JSON_PROMPT:
+            return json.dumps(result, indent=2)
+        return format_gap_report(result)
+
+
+MOCK_RESPONSE = (
+    "Enhanced resume\n\n"
+    "- Reworded the summary to match the job description\n"
+    "- Moved the most relevant experience to the top\n"
+)
+
+MOCK_RESULT = {
+    "match_score": 50,
+    "missing_keywords": [],
+    "suggested_edits": [],
+    "summary": "Mock result",
+}
+
+
+class MockClient(OfflineClient):
+    """Canned answers after an optional delay, for tests and benchmarks."""
+
+    backend = "mock"
+
+    def __init__(self, response=MOCK_RESPONSE, latency=0.0, chunk_delay=0.0):
+        super().__init__()
+        self.response = response
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def create(self, messages, model, temperature=0.5, max_tokens=1024, stream=True):
+        with self._lock:
+            self.requests += 1
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.answer(messages, model, temperature, max_tokens)
+        return stream_text(messages, content, started, delay=self.chunk_delay)
+
+    def answer(self, messages, model, temperature, max_tokens):
+        if messages and messages[0]["content"] == JSON_PROMPT:
+            return json.dumps(MOCK_RESULT)
+        return self.response
+
+
+class LlamaClient:
+    """Runs GGUF models on the CPU through llama-cpp-python.
+
+    A model name is a GGUF file in `models_dir`, with or without its
+    extension, or a path to one. Each file is loaded once and kept for the
+    life of the process, requests to one model are serialized because a
+    llama.cpp context is not thread safe.
+    Ref Doc: https://llama-cpp-python.readthedocs.io/en/latest/api-reference/
+    """
+
+    backend = "llama"
+
+    def __init__(self, models_dir, n_ctx=4096, n_threads=None):
+        self.models_dir = models_dir
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model_path(self, model):
+        if os.sep in model:
+            return os.path.expanduser(model)
+        if not model.endswith(".gguf"):
+            model += ".gguf"
+        return os.path.join(os.path.expanduser(self.models_dir), model)
+
+    def load(self, model):
+        try:
+            from llama_cpp import Llama  # type: ignore
+        except ImportError:
+            raise RuntimeError(
+                "The llama backend needs llama-cpp-python, install it with "
+                "pip install 'resume-enhancer[llama]'"
+            ) from None
+
+        model_path = self.model_path(model)
+        with self._lock:
+            entry = self._models.get(model_path)
+            if entry is None:
+                if not os.path.exists(model_path):
+                    raise FileNotFoundError(f"Could not find local model {model_path}")
+                logger.info(f"Loading local model {model_path}")
+                llama = Llama(
+                    model_path=model_path,
+                    n_ctx=self.n_ctx,
+                    n_threads=self.n_threads,
+                    verbose=False,
+                )
+                entry = self._models[model_path] = (llama, threading.Lock())
+            return entry
+
+    def create(self, messages, model, temperature=0.5, max_tokens=1024, stream=True):
+        llama, lock = self.load(model)
+
+        def chunks():
+            started = time.perf_counter()
+            parts = []
+            with lock:
+                for chunk in llama.create_chat_completion(
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                ):
+                    content = chunk["choices"][0]["delta"].get("content")
+                    if content:
+                        parts.append(content)
+                        yield make_chunk(content)
+            yield make_chunk(usage=make_usage(messages, "".join(parts), started))
+
+        return chunks()
+
+
+# name -> (factory, needs an API key, default model)
+BACKENDS = {
+    "groq": (get_groq_client, True, "llama3-8b-8192"),
+    "keywords": (lambda api_key: KeywordGapClient(), False, "keyword-gap"),
+    "llama": (lambda api_key: get_llama_client(), False, None),
+    "mock": (lambda api_key: MockClient(), False, "mock"),
+}
+
+_llama_client = None
+_llama_options = dict(DEFAULT_LLAMA_OPTIONS)
+_llama_lock = threading.Lock()
+
+
+def configure_llama(**options):
+    """Override the llama.cpp options, must be called before the first request."""
+    unknown = set(options) - set(DEFAULT_LLAMA_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown llama options: {', '.join(sorted(unknown))}")
+
+    with _llama_lock:
+        if _llama_client is not None:
+            logger.warning("Local models already loaded, llama options not changed")
+            return
+        _llama_options.update(
+            {name: value for name, value in options.items() if value is not None}
+        )
+
+
+def get_llama_client():
+    # Loaded models are shared by every request of the process
+    global _llama_client
+
+    with _llama_lock:
+        if _llama_client is None:
+            _llama_client = LlamaClient(**_llama_options)
+        return _llama_client
+
+
+def register_backend(name, factory, needs_api_key=False, default_model=None):
+    """Make `factory(api_key)` available as a completion backend."""
+    BACKENDS[name] = (factory, needs_api_key, default_model)
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend {backend}, choose one of: {', '.join(sorted(BACKENDS))}"
+        )
+
+
+def needs_api_key(backend):
+    check_backend(backend)
+    return BACKENDS[backend][1]
+
+
+def default_models(backend):
+    check_backend(backend)
+    model = BACKENDS[backend][2]
+    if model is None:
+        raise ValueError(f"The {backend} backend needs a model, use --model")
+    return [model]
+
+
+def get_client(backend, api_key=None):
+    """Return a client for `backend` with the interface of the Groq client."""
+    check_backend(backend)
+    factory, requires_key, _ = BACKENDS[backend]
+    if requires_key and not api_key:
+        raise ValueError("API key is required")
+    client = factory(api_key)
+    # Responses are cached and coalesced per backend, see
+    # completion.client_backend
+    if backend != DEFAULT_BACKEND and not isinstance(
+        getattr(client, "backend", None), str
+    ):
+        client.backend = backend
+    return client
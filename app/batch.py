@@ -0,0 +1,347 @@
+import collections
+import contextlib
+import csv
+import glob
+import hashlib
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.cache import usage_to_dict
+from app.backends import DEFAULT_BACKEND, default_models, get_client, needs_api_key
+from app.completion import complete
+from app.matching import prerank_pairs
+from app.metrics import get_metrics
+from app.prompt import build_messages, compact_prompt
+from app.structured import build_json_messages, parse_result
+from app.utils import JsonlWriter, read_file, setup_logging, write_to_file
+
+# Setup logger
+logger = setup_logging()
+
+SUPPORTED_EXTENSIONS = [".txt", ".pdf", ".doc", ".docx"]
+
+
+def expand_inputs(specs):
+    """Expand files, directories and glob patterns into a sorted list of files."""
+    files = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            matches = [os.path.join(spec, name) for name in os.listdir(spec)]
+        elif glob.has_magic(spec):
+            matches = glob.glob(spec, recursive=True)
+        else:
+            matches = [spec]
+
+        for path in sorted(matches):
+            extension = os.path.splitext(path)[1].lower()
+            if os.path.isfile(path) and extension in SUPPORTED_EXTENSIONS:
+                if path not in files:
+                    files.append(path)
+            elif not os.path.isdir(path):
+                logger.warning(f"Skipping unsupported batch input: {path}")
+    return files
+
+
+def read_manifest(manifest_path):
+    """Read resume/description pairs from a CSV file with a header row.
+
+    Relative paths are resolved against the directory of the manifest.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    with open(manifest_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {"resume", "description"}.issubset(
+            reader.fieldnames
+        ):
+            raise ValueError(
+                "Manifest must have a header with 'resume' and 'description' columns"
+            )
+        for row in reader:
+            pairs.append(
+                (
+                    os.path.join(base_dir, row["resume"].strip()),
+                    os.path.join(base_dir, row["description"].strip()),
+                )
+            )
+    return pairs
+
+
+def build_pairs(resumes, descriptions):
+    return list(itertools.product(resumes, descriptions))
+
+
+def document_names(paths):
+    """Map each path to a short name that is unique among `paths`.
+
+    The name is the file name without its extension, "resume-docx" when
+    another file has the same stem, and gets a short hash of the full path
+    when files in different directories share the whole file name.
+    """
+
+    def stem(path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def with_extension(path):
+        name, extension = os.path.splitext(os.path.basename(path))
+        return f"{name}-{extension.lstrip('.')}" if extension else name
+
+    paths = sorted(set(paths))
+    stems = collections.Counter(stem(path) for path in paths)
+    names = {
+        path: stem(path) if stems[stem(path)] == 1 else with_extension(path)
+        for path in paths
+    }
+    counts = collections.Counter(names.values())
+    for path, name in names.items():
+        if counts[name] > 1:
+            digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+            names[path] = f"{name}-{digest[:8]}"
+    return names
+
+
+def output_path(output_dir, resume_path, description_path, model, names=None):
+    # `names` from document_names keeps the files of two inputs apart
+    names = names or {}
+    resume_name = names.get(resume_path) or document_names([resume_path])[resume_path]
+    description_name = (
+        names.get(description_path)
+        or document_names([description_path])[description_path]
+    )
+    return os.path.join(output_dir, f"{resume_name}_{description_name}_{model}.txt")
+
+
+def read_documents(paths, executor, document_cache=None, read_options=None):
+    """Parse `paths` on `executor`, returning path to text for readable ones."""
+    documents = {}
+    parse_futures = {
+        executor.submit(
+            read_file, path, cache=document_cache, **(read_options or {})
+        ): path
+        for path in paths
+    }
+    for future in as_completed(parse_futures):
+        path = parse_futures[future]
+        try:
+            documents[path] = future.result()
+        except Exception as e:
+            logger.error(f"Failed to read {path}: {e}")
+    return documents
+
+
+def run_batch(
+    pairs,
+    api_key,
+    models=None,
+    temperature=0.5,
+    max_token=1024,
+    output_dir="results",
+    workers=4,
+    cache=None,
+    refresh=False,
+    compact=False,
+    document_cache=None,
+    read_options=None,
+    top_n=None,
+    registry=None,
+    queue=None,
+    jsonl=None,
+    backend=DEFAULT_BACKEND,
+):
+    """Enhance every (resume, description) pair for every model.
+
+    Every document is parsed once, and all requests share one client of the
+    completion `backend` and one worker pool. With `top_n`, each resume is only sent with its `top_n`
+    best matching descriptions by BM25 score. A model `registry` supplies the
+    context window and output limit of each model. Returns a list of result dicts,
+    one per pair and model.
+
+    With a WorkQueue `queue`, the jobs are added to the queue and the workers
+    drain it, skipping jobs that an earlier run already finished and taking
+    jobs that other processes added. Only the jobs run here are returned.
+
+    With a `jsonl` path the models are asked for structured JSON results,
+    and every successful result is appended to that file as one line
+    instead of being written to its own text file.
+    """
+    if api_key is None and needs_api_key(backend):
+        raise ValueError("API key is required")
+
+    if not models:
+        models = default_models(backend)
+
+    os.makedirs(output_dir, exist_ok=True)
+    client = get_client(backend, api_key)
+    started = time.perf_counter()
+    writer = JsonlWriter(jsonl) if jsonl else None
+
+    with (
+        ThreadPoolExecutor(max_workers=workers) as executor,
+        writer or contextlib.nullcontext(),
+    ):
+        # Parse each unique document once, no matter how many pairs use it
+        paths = sorted({path for pair in pairs for path in pair})
+        documents = read_documents(paths, executor, document_cache, read_options)
+        names = document_names(paths)
+        documents_lock = threading.Lock()
+
+        def document(path):
+            # Queued jobs may come from other runs, their documents are read here
+            if path not in documents and path not in paths:
+                text = read_file(path, cache=document_cache, **(read_options or {}))
+                with documents_lock:
+                    documents[path] = text
+            if path not in documents:
+                raise ValueError("Input document could not be read")
+            return documents[path]
+
+        if top_n:
+            pairs = prerank_pairs(pairs, documents, top_n)
+
+        def enhance(resume_path, description_path, model, output_name=None):
+            result = {
+                "resume": resume_path,
+                "description": description_path,
+                "model": model,
+                "output": None,
+                "usage": None,
+                "error": None,
+            }
+            try:
+                resume = document(resume_path)
+                description = document(description_path)
+                model_max_token = max_token
+                context_window = None
+                if registry is not None:
+                    model_max_token = registry.max_tokens(model, max_token)
+                    context_window = registry.context_window(model)
+                build = build_json_messages if writer else build_messages
+                with get_metrics().span("build_prompt", model=model, compact=compact):
+                    if compact:
+                        resume, description = compact_prompt(
+                            resume, description, model, model_max_token, context_window
+                        )
+                    messages = build(resume, description)
+                content, usage = complete(
+                    client,
+                    messages,
+                    model,
+                    temperature,
+                    model_max_token,
+                    cache=cache,
+                    refresh=refresh,
+                )
+                if writer is not None:
+                    result["output"] = writer.path
+                    writer.write(
+                        {
+                            "resume": resume_path,
+                            "description": description_path,
+                            "model": model,
+                            **parse_result(content),
+                            "usage": usage_to_dict(usage),
+                        }
+                    )
+                elif output_name:
+                    # Named by the run that queued the job, which saw every input
+                    result["output"] = os.path.join(output_dir, output_name)
+                    write_to_file(result["output"], content)
+                else:
+                    result["output"] = output_path(
+                        output_dir, resume_path, description_path, model, names
+                    )
+                    write_to_file(result["output"], content)
+                result["usage"] = usage
+            except Exception as e:
+                logger.error(
+                    f"Error in batch for {resume_path}, {description_path}: {e}"
+                )
+                result["error"] = str(e)
+            return result
+
+        jobs = [
+            (resume_path, description_path, model)
+            for resume_path, description_path in pairs
+            for model in models
+        ]
+        # Set on Ctrl-C, workers finish their current job and take no new one
+        stop = threading.Event()
+        futures = []
+        try:
+            if queue is None:
+                futures = [executor.submit(enhance, *job) for job in jobs]
+                results = [future.result() for future in as_completed(futures)]
+            else:
+                named_jobs = [
+                    (
+                        *job,
+                        os.path.basename(output_path(output_dir, *job, names)),
+                    )
+                    for job in jobs
+                ]
+                added = queue.add(named_jobs, refresh=refresh)
+                logger.info(f"Queued {added} new jobs in {queue.path}")
+                futures = [
+                    executor.submit(drain_queue, queue, enhance, stop)
+                    for _ in range(workers)
+                ]
+                results = [result for future in futures for result in future.result()]
+        except BaseException:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+    elapsed = time.perf_counter() - started
+    if queue is None:
+        print_batch_summary(results, len(pairs), elapsed)
+    else:
+        done_pairs = {(result["resume"], result["description"]) for result in results}
+        print_batch_summary(results, len(done_pairs), elapsed)
+        print_queue_summary(queue)
+    return results
+
+
+def drain_queue(queue, enhance, stop=None):
+    # Run queued jobs until none is left or `stop` is set, recording each
+    # outcome in the queue
+    results = []
+    while stop is None or not stop.is_set():
+        job = queue.claim()
+        if job is None:
+            break
+        try:
+            result = enhance(
+                job["resume"], job["description"], job["model"], job["output_name"]
+            )
+        except BaseException:
+            # Interrupted, the job goes back to the queue for the next run
+            queue.release(job)
+            raise
+        if result["error"]:
+            queue.fail(job, result["error"])
+        else:
+            queue.finish(job, result["output"], result["usage"])
+        results.append(result)
+    return results
+
+
+def print_batch_summary(results, pair_count, elapsed):
+    failed = sum(1 for result in results if result["error"])
+    throughput = pair_count / elapsed * 60 if elapsed > 0 else 0.0
+    print(
+        f"Processed {pair_count} pairs ({len(results)} requests, {failed} failed) "
+        f"in {elapsed:.2f} seconds: {throughput:.1f} pairs/minute"
+    )
+
+
+def print_queue_summary(queue):
+    counts = queue.counts()
+    print(
+        f"Queue {queue.path}: {counts.get('done', 0)} done, "
+        f"{counts.get('failed', 0)} failed, "
+        f"{counts.get('pending', 0) + counts.get('running', 0)} remaining"
+    )
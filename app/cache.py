@@ -0,0 +1,391 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import zlib
+
+from app.utils import read_file, setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Default location for every on-disk cache of the tool
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/resume-enhancer")
+RESPONSE_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "responses")
+DOCUMENT_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "documents")
+
+# Bump when text extraction changes so stale blobs are not reused
+EXTRACTOR_VERSION = "2"
+
+# Writes between two walks of the cache directory. A write that takes the
+# cache past max_bytes always evicts, the periodic walk sweeps expired entries
+# and catches up with entries written by other processes.
+EVICT_EVERY_WRITES = 100
+
+# Size eviction frees down to this fraction of max_bytes, so a full cache is
+# not walked again on the very next write
+EVICT_LOW_WATER = 0.9
+
+# The document path index is written back after this many changes, and by
+# flush() at the end of warm() and at exit
+INDEX_SAVE_EVERY = 100
+
+
+class DiskCache:
+    """Key/value store of files under one directory with LRU eviction.
+
+    Entries older than `max_age` seconds are dropped, and once the directory
+    grows past `max_bytes` the least recently used entries are removed first.
+    Reads refresh an entry's mtime, which is what the LRU order is based on.
+    The size of the directory is kept as a running total, so writes only walk
+    it when the total crosses `max_bytes` or every EVICT_EVERY_WRITES writes.
+    """
+
+    suffix = ".bin"
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, max_age=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        # Bytes in the directory, None until it is first walked
+        self._size = None
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get_bytes(self, key):
+        path = self._path(key)
+        try:
+            if self.max_age is not None:
+                if time.time() - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+                    raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def set_bytes(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        # Write to a temporary file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._writes += 1
+            if self._size is not None:
+                self._size += len(data) - old_size
+            due = (
+                self._size is None
+                or (self.max_bytes is not None and self._size > self.max_bytes)
+                or self._writes % EVICT_EVERY_WRITES == 0
+            )
+        if due:
+            self.evict()
+
+    def entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        now = time.time()
+        total = 0
+        kept = []
+        for mtime, size, path in entries:
+            if self.max_age is not None and now - mtime > self.max_age:
+                self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+                total += size
+
+        # Oldest entries go first until the cache fits below the low water mark
+        if self.max_bytes is not None and total > self.max_bytes:
+            target = self.max_bytes * EVICT_LOW_WATER
+            for mtime, size, path in sorted(kept):
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+        with self._lock:
+            self._size = total
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to evict cache entry {path}: {e}")
+
+
+def normalize_prompt(messages):
+    # Collapse whitespace so that indentation changes do not bust the cache
+    return [
+        {
+            "role": message["role"],
+            "content": re.sub(r"\s+", " ", message["content"]).strip(),
+        }
+        for message in messages
+    ]
+
+
+class ResponseCache(DiskCache):
+    """Cache of completed LLM responses keyed by prompt and generation options."""
+
+    suffix = ".json"
+
+    def __init__(
+        self,
+        directory=RESPONSE_CACHE_DIR,
+        max_bytes=50 * 1024 * 1024,
+        max_age=7 * 24 * 60 * 60,
+    ):
+        super().__init__(directory, max_bytes=max_bytes, max_age=max_age)
+
+    @staticmethod
+    def make_key(messages, model, temperature, max_tokens, backend=None):
+        # Offline backends answer under their own keys, so a mock or local
+        # answer is never served for a Groq model of the same name. None is
+        # the Groq API, whose keys predate the other backends.
+        payload = {
+            "messages": normalize_prompt(messages),
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if backend not in (None, "groq"):
+            payload["backend"] = backend
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key):
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            logger.warning(f"Ignoring corrupt cache entry {key}")
+            return None
+
+    def set(self, key, content, usage=None):
+        entry = {"content": content, "usage": usage_to_dict(usage)}
+        self.set_bytes(key, json.dumps(entry).encode("utf-8"))
+
+
+def usage_to_dict(usage):
+    if usage is None:
+        return None
+    fields = [
+        "completion_tokens",
+        "prompt_tokens",
+        "total_tokens",
+        "completion_time",
+        "prompt_time",
+        "queue_time",
+        "total_time",
+    ]
+    return {field: getattr(usage, field, None) for field in fields}
+
+
+class DocumentCache(DiskCache):
+    """Cache of extracted document text stored as zlib-compressed blobs.
+
+    Blobs are addressed by the hash of the file content. A small index maps
+    each path to its size, mtime and content hash, so an unchanged file is
+    served without being read or hashed again. The index is kept in memory
+    and saved every INDEX_SAVE_EVERY changes, after `warm` and at exit,
+    losing it only costs a hash. Paths that no longer exist are dropped from
+    it when it is loaded.
+    """
+
+    suffix = ".txt.z"
+
+    def __init__(
+        self,
+        directory=DOCUMENT_CACHE_DIR,
+        max_bytes=200 * 1024 * 1024,
+        max_age=30 * 24 * 60 * 60,
+    ):
+        super().__init__(directory, max_bytes=max_bytes, max_age=max_age)
+        self.index_path = os.path.join(directory, "index.json")
+        self._index_lock = threading.Lock()
+        # Changes to the index since it was last saved
+        self._index_changes = 0
+        self._index = self._load_index()
+        _document_caches.add(self)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Ignoring corrupt document cache index {self.index_path}")
+            return {}
+
+        # Deleted files are never looked up again
+        live = {path: entry for path, entry in index.items() if os.path.exists(path)}
+        self._index_changes += len(index) - len(live)
+        return live
+
+    def _save_index(self):
+        # Called with _index_lock held
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_changes = 0
+
+    def _index_changed(self):
+        # Called with _index_lock held
+        self._index_changes += 1
+        if self._index_changes >= INDEX_SAVE_EVERY:
+            self._save_index()
+
+    def flush(self):
+        """Save the path index if it changed since it was last saved."""
+        with self._index_lock:
+            if self._index_changes:
+                self._save_index()
+
+    @staticmethod
+    def hash_file(file_path):
+        digest = hashlib.sha256(EXTRACTOR_VERSION.encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def read(self, file_path, reader, options=None):
+        """Return the text of `file_path`, calling `reader` only on a miss.
+
+        `options` holds reader settings that change the extracted text, such
+        as page limits, and becomes part of the blob key.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        with self._index_lock:
+            entry = self._index.get(path)
+        if entry and entry["signature"] == signature:
+            content_hash = entry["hash"]
+        else:
+            content_hash = self.hash_file(path)
+
+        key = content_hash
+        if options:
+            variant = json.dumps(options, sort_keys=True)
+            key = hashlib.sha256(f"{content_hash}:{variant}".encode()).hexdigest()
+
+        data = self.get_bytes(key)
+        if data is not None:
+            content = zlib.decompress(data).decode("utf-8")
+        else:
+            content = reader(file_path)
+            self.set_bytes(key, zlib.compress(content.encode("utf-8")))
+
+        if entry != {"signature": signature, "hash": content_hash}:
+            with self._index_lock:
+                self._index[path] = {"signature": signature, "hash": content_hash}
+                self._index_changed()
+        return content
+
+    def forget(self, file_path):
+        with self._index_lock:
+            if self._index.pop(os.path.abspath(file_path), None) is not None:
+                self._index_changed()
+
+    def read_upload(self, data, filename, read_options=None):
+        """Return the text of an uploaded document given as bytes.
+
+        Uploads are looked up by content hash only, their temporary path is
+        not kept in the index.
+        """
+        suffix = os.path.splitext(filename)[1].lower()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "upload" + suffix)
+            with open(path, "wb") as f:
+                f.write(data)
+            try:
+                return read_file(path, cache=self, **(read_options or {}))
+            finally:
+                self.forget(path)
+
+    def warm(self, paths, workers=4, read_options=None):
+        """Extract and cache every file in `paths` ahead of time."""
+
+        def warm_one(path):
+            try:
+                read_file(path, cache=self, **(read_options or {}))
+                return True
+            except Exception as e:
+                logger.error(f"Failed to cache {path}: {e}")
+                return False
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return sum(executor.map(warm_one, paths))
+        finally:
+            self.flush()
+
+
+_document_caches = weakref.WeakSet()
+
+
+@atexit.register
+def flush_document_caches():
+    # Index changes not saved yet would otherwise be lost with the process
+    for cache in list(_document_caches):
+        try:
+            cache.flush()
+        except Exception as e:
+            logger.warning(f"Failed to save document cache index: {e}")
@@ -0,0 +1,132 @@
+import atexit
+import importlib.util
+import threading
+import weakref
+
+from app.scheduler import get_scheduler
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Connection pool shared by every request the process makes
+# Ref Doc: https://www.python-httpx.org/advanced/resource-limits/
+DEFAULT_POOL_LIMITS = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30.0,
+}
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+_lock = threading.Lock()
+_pool_limits = dict(DEFAULT_POOL_LIMITS)
+_http_client = None
+_groq_clients = {}
+# Async clients are tied to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def http2_available():
+    # httpx only speaks HTTP/2 when the optional h2 package is installed
+    return importlib.util.find_spec("h2") is not None
+
+
+def configure_pool(**limits):
+    """Override the pool limits, must be called before the first request."""
+    unknown = set(limits) - set(DEFAULT_POOL_LIMITS)
+    if unknown:
+        raise ValueError(f"Unknown pool limits: {', '.join(sorted(unknown))}")
+
+    with _lock:
+        if _http_client is not None:
+            logger.warning("HTTP client already created, pool limits not changed")
+            return
+        _pool_limits.update(
+            {name: value for name, value in limits.items() if value is not None}
+        )
+
+
+def get_http_client():
+    global _http_client
+
+    # httpx and groq are imported on first use, most CLI paths never need them
+    import httpx
+
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(**_pool_limits),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+                http2=http2_available(),
+                # Feed rate-limit headers of every response to the scheduler
+                event_hooks={"response": [get_scheduler().observe_response]},
+            )
+        return _http_client
+
+
+def get_groq_client(api_key):
+    # One Groq client per API key, all of them on the shared connection pool.
+    # Retries are left to the scheduler, which knows about the rate limits.
+    from groq import Groq  # type: ignore
+
+    http_client = get_http_client()
+    with _lock:
+        client = _groq_clients.get(api_key)
+        if client is None:
+            client = Groq(api_key=api_key, http_client=http_client, max_retries=0)
+            _groq_clients[api_key] = client
+        return client
+
+
+async def observe_async_response(response):
+    get_scheduler().observe_response(response)
+
+
+def get_async_groq_client(api_key):
+    """AsyncGroq client for `api_key` on the running event loop's shared pool."""
+    import asyncio
+
+    import httpx
+    from groq import AsyncGroq  # type: ignore
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.get(loop)
+        if entry is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(**_pool_limits),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+                http2=http2_available(),
+                event_hooks={"response": [observe_async_response]},
+            )
+            entry = _async_clients[loop] = (http_client, {})
+        http_client, clients = entry
+        client = clients.get(api_key)
+        if client is None:
+            client = AsyncGroq(api_key=api_key, http_client=http_client, max_retries=0)
+            clients[api_key] = client
+        return client
+
+
+async def aclose_clients():
+    """Close the async clients of the running event loop."""
+    import asyncio
+
+    with _lock:
+        entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].aclose()
+
+
+def close_clients():
+    global _http_client
+
+    with _lock:
+        _groq_clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+atexit.register(close_clients)
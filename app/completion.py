@@ -0,0 +1,285 @@
+import asyncio
+import inspect
+import time
+
+from app.cache import ResponseCache
+from app.metrics import get_metrics
+from app.prompt import estimate_messages_tokens, estimate_tokens
+from app.scheduler import get_scheduler
+from app.singleflight import get_async_single_flight, get_single_flight
+
+
+def request_completion(client, messages, model, temperature=0.5, max_token=1024):
+    # Start a streamed chat completion, paced and retried by the scheduler
+    return get_scheduler().call(
+        model,
+        lambda: client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_token,
+            stream=True,
+        ),
+        tokens=estimate_messages_tokens(messages) + max_token,
+    )
+
+
+async def request_completion_async(
+    client, messages, model, temperature=0.5, max_token=1024
+):
+    # Same as request_completion for an AsyncGroq client
+    return await get_scheduler().call_async(
+        model,
+        lambda: client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_token,
+            stream=True,
+        ),
+        tokens=estimate_messages_tokens(messages) + max_token,
+    )
+
+
+def client_backend(client):
+    # The backend a client answers for, None for the Groq API
+    backend = getattr(client, "backend", None)
+    return backend if isinstance(backend, str) else None
+
+
+def shared_completion(client, messages, model, temperature=0.5, max_token=1024):
+    """Start a completion, or join an identical one that is already streaming.
+
+    Identical means the same normalized prompt and model parameters, the key
+    the response cache uses. Every caller gets every chunk.
+    """
+    key = ResponseCache.make_key(
+        messages, model, temperature, max_token, client_backend(client)
+    )
+    return get_single_flight().stream(
+        key,
+        lambda: request_completion(client, messages, model, temperature, max_token),
+    )
+
+
+def shared_completion_async(client, messages, model, temperature=0.5, max_token=1024):
+    # Same as shared_completion for an AsyncGroq client, on the running loop
+    key = ResponseCache.make_key(
+        messages, model, temperature, max_token, client_backend(client)
+    )
+    return get_async_single_flight().stream(
+        key,
+        lambda: request_completion_async(
+            client, messages, model, temperature, max_token
+        ),
+    )
+
+
+class CompletionTimer:
+    """Times the chunks of one completion as they are consumed.
+
+    Shared by the sync and async streams, so both record the same metrics.
+    """
+
+    def __init__(self, model, start=None):
+        self.model = model
+        self.start = time.perf_counter() if start is None else start
+        self.first_token_at = None
+        self.tokens = 0
+        self.usage = None
+        self.cached = False
+
+    @property
+    def time_to_first_token(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.start
+
+    def observe(self, chunk):
+        # Returns the text of the chunk, None when it has none
+        chunk_content = chunk.choices[0].delta.content
+        if chunk_content:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+                metrics = get_metrics()
+                ttft = self.time_to_first_token
+                metrics.record("time_to_first_token", ttft, model=self.model)
+                metrics.set_gauge("time_to_first_token_seconds", ttft, model=self.model)
+            self.tokens += estimate_tokens(chunk_content)
+        self.usage = chunk_usage(chunk) or self.usage
+        return chunk_content
+
+    def finish(self):
+        end = time.perf_counter()
+        # Prefer the server's count, the estimate covers cached or partial streams
+        tokens = self.tokens
+        completion_tokens = getattr(self.usage, "completion_tokens", None)
+        if isinstance(completion_tokens, int):
+            tokens = completion_tokens
+        generation_time = end - (self.first_token_at or end)
+        tokens_per_second = tokens / generation_time if generation_time > 0 else 0.0
+        metrics = get_metrics()
+        metrics.record(
+            "completion",
+            end - self.start,
+            model=self.model,
+            tokens=tokens,
+            tokens_per_second=tokens_per_second,
+        )
+        metrics.set_gauge("tokens_per_second", tokens_per_second, model=self.model)
+
+
+def timed_completion(client, messages, model, temperature=0.5, max_token=1024):
+    """Start a completion and time its chunks as they are consumed.
+
+    Time to first token and tokens per second are measured on the local clock,
+    so they include the network and the scheduler's waiting time.
+    """
+    start = time.perf_counter()
+    chat_completion = shared_completion(client, messages, model, temperature, max_token)
+    return record_timings(chat_completion, model, start)
+
+
+def record_timings(chat_completion, model, start):
+    timer = CompletionTimer(model, start)
+    try:
+        for chunk in chat_completion:
+            timer.observe(chunk)
+            yield chunk
+    finally:
+        # Closing this generator early releases the stream underneath
+        close = getattr(chat_completion, "close", None)
+        if callable(close):
+            close()
+    timer.finish()
+
+
+def chunk_usage(chunk):
+    # Groq only attaches usage to the last chunk of a stream
+    x_groq = getattr(chunk, "x_groq", None)
+    return getattr(x_groq, "usage", None) if x_groq is not None else None
+
+
+def collect_completion(chat_completion):
+    parts = []
+    usage = None
+    for chunk in chat_completion:
+        chunk_content = chunk.choices[0].delta.content
+        if chunk_content:
+            parts.append(chunk_content)
+        usage = chunk_usage(chunk) or usage
+    return "".join(parts), usage
+
+
+def complete(
+    client,
+    messages,
+    model,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+):
+    """Return (content, usage) for one model, from the cache when possible.
+
+    Usage is None when the response came from the cache.
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            messages, model, temperature, max_token, client_backend(client)
+        )
+        cached = None if refresh else cache.get(cache_key)
+        if cached is not None:
+            return cached["content"], None
+
+    chat_completion = timed_completion(client, messages, model, temperature, max_token)
+    content, usage = collect_completion(chat_completion)
+    if cache is not None:
+        cache.set(cache_key, content, usage)
+    return content, usage
+
+
+def stream_completion(
+    client,
+    messages,
+    model,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+):
+    # Yield the text of a completion as it arrives, a cache hit is one piece
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            messages, model, temperature, max_token, client_backend(client)
+        )
+        cached = None if refresh else cache.get(cache_key)
+        if cached is not None:
+            yield cached["content"]
+            return
+
+    chat_completion = timed_completion(client, messages, model, temperature, max_token)
+    parts = []
+    usage = None
+    try:
+        for chunk in chat_completion:
+            chunk_content = chunk.choices[0].delta.content
+            if chunk_content:
+                parts.append(chunk_content)
+                yield chunk_content
+            usage = chunk_usage(chunk) or usage
+    finally:
+        # Closing this generator early releases the stream underneath
+        chat_completion.close()
+    if cache is not None:
+        cache.set(cache_key, "".join(parts), usage)
+
+
+async def stream_completion_async(
+    client,
+    messages,
+    model,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+    timer=None,
+):
+    """Async counterpart of stream_completion for an AsyncGroq client.
+
+    Pass a CompletionTimer as `timer` to read the usage, the timings and
+    whether the response came from the cache once the stream ends.
+    """
+    timer = timer or CompletionTimer(model)
+    cache_key = ResponseCache.make_key(
+        messages, model, temperature, max_token, client_backend(client)
+    )
+    if cache is not None and not refresh:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            timer.cached = True
+            yield cached["content"]
+            return
+
+    # Identical requests in flight on this loop share one stream
+    chat_completion = shared_completion_async(
+        client, messages, model, temperature, max_token
+    )
+    parts = []
+    try:
+        async for chunk in chat_completion:
+            chunk_content = timer.observe(chunk)
+            if chunk_content:
+                parts.append(chunk_content)
+                yield chunk_content
+    finally:
+        close = getattr(chat_completion, "aclose", None)
+        if callable(close):
+            closing = close()
+            if inspect.isawaitable(closing):
+                await closing
+    timer.finish()
+    if cache is not None:
+        await asyncio.to_thread(cache.set, cache_key, "".join(parts), timer.usage)
@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app.batch import read_documents
+from app.cache import DEFAULT_CACHE_DIR
+from app.matching import BM25Index, tokenize
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+INDEX_DIR = os.path.join(DEFAULT_CACHE_DIR, "index")
+
+# Bump when the layout of the index changes so old indexes are rebuilt
+INDEX_VERSION = 1
+
+# Forward index, term counts of every document, kept for incremental updates
+FORWARD_ARRAYS = ["doc_indptr", "doc_terms", "doc_freqs"]
+# BM25 postings read by queries
+POSTING_ARRAYS = ["indptr", "postings", "weights"]
+
+
+class CorpusIndex:
+    """BM25 index of a document corpus, such as a job board, kept on disk.
+
+    meta.json lists the indexed files with their size and mtime and points to
+    a data directory holding vocabulary.json and the NumPy arrays. The
+    arrays are the term counts of every document (a CSR matrix), so a changed
+    file is tokenized again on its own, and the BM25 postings and weights,
+    which queries open with mmap instead of reading them. Every update writes
+    a new data directory and switches meta.json to it in one rename.
+    """
+
+    def __init__(self, directory=INDEX_DIR):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.files = {}
+        self.data = None
+        self.terms = []
+        self.arrays = {}
+        self.index = None
+
+    @classmethod
+    def open(cls, directory=INDEX_DIR):
+        """Open an index built by `update`, its arrays are memory-mapped."""
+        import numpy as np
+
+        corpus = cls(directory)
+        try:
+            with open(corpus.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return corpus
+        if meta.get("version") != INDEX_VERSION:
+            logger.warning(f"Ignoring index in an old format at {directory}")
+            return corpus
+
+        corpus.files = meta["files"]
+        corpus.data = meta["data"]
+        data_dir = os.path.join(directory, corpus.data)
+        with open(
+            os.path.join(data_dir, "vocabulary.json"), "r", encoding="utf-8"
+        ) as f:
+            corpus.terms = json.load(f)
+        for name in FORWARD_ARRAYS + POSTING_ARRAYS:
+            corpus.arrays[name] = np.load(
+                os.path.join(data_dir, f"{name}.npy"), mmap_mode="r"
+            )
+        corpus.index = BM25Index(
+            list(corpus.files),
+            {term: index for index, term in enumerate(corpus.terms)},
+            corpus.arrays["indptr"],
+            corpus.arrays["postings"],
+            corpus.arrays["weights"],
+        )
+        return corpus
+
+    def __len__(self):
+        return len(self.files)
+
+    def top_k(self, text, k=10):
+        if self.index is None:
+            return []
+        return self.index.top_k(text, k)
+
+    def update(self, paths, workers=4, document_cache=None, read_options=None):
+        """Make the index cover exactly `paths`.
+
+        Only files that are new or changed since the last update are read and
+        tokenized. Returns the number of (added, updated, removed) files.
+        """
+        import numpy as np
+
+        current = {}
+        for path in paths:
+            stat = os.stat(path)
+            current[os.path.abspath(path)] = [stat.st_size, stat.st_mtime_ns]
+        kept = [path for path in self.files if current.get(path) == self.files[path]]
+        changed = sorted(set(current) - set(kept))
+        removed = sum(1 for path in self.files if path not in current)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            documents = read_documents(changed, executor, document_cache, read_options)
+        updated = sum(1 for path in documents if path in self.files)
+        added = len(documents) - updated
+
+        # Rows of the unchanged documents, renumbered in their new order
+        term_ids = {term: index for index, term in enumerate(self.terms)}
+        old_ids = {path: index for index, path in enumerate(self.files)}
+        rows = [old_ids[path] for path in kept]
+        if rows:
+            doc_indptr = np.asarray(self.arrays["doc_indptr"])
+            row_of = np.repeat(np.arange(len(self.files)), np.diff(doc_indptr))
+            renumber = np.full(len(self.files), -1, dtype=np.int32)
+            renumber[rows] = np.arange(len(rows), dtype=np.int32)
+            mask = renumber[row_of] >= 0
+            terms = [np.asarray(self.arrays["doc_terms"])[mask]]
+            docs = [renumber[row_of[mask]]]
+            freqs = [np.asarray(self.arrays["doc_freqs"])[mask]]
+        else:
+            terms, docs, freqs = [], [], []
+
+        files = {path: self.files[path] for path in kept}
+        vocabulary = list(self.terms)
+        for path in sorted(documents):
+            counter = Counter(tokenize(documents[path]))
+            for term in counter:
+                if term not in term_ids:
+                    term_ids[term] = len(vocabulary)
+                    vocabulary.append(term)
+            terms.append(np.array([term_ids[t] for t in counter], dtype=np.int32))
+            docs.append(np.full(len(counter), len(files), dtype=np.int32))
+            freqs.append(np.array(list(counter.values()), dtype=np.float32))
+            files[path] = current[path]
+
+        terms = np.concatenate(terms) if terms else np.zeros(0, np.int32)
+        docs = np.concatenate(docs) if docs else np.zeros(0, np.int32)
+        freqs = np.concatenate(freqs) if freqs else np.zeros(0, np.float32)
+
+        # Drop terms that no document uses any more
+        used = np.unique(terms)
+        compact = np.zeros(len(vocabulary), dtype=np.int32)
+        compact[used] = np.arange(len(used), dtype=np.int32)
+        terms = compact[terms]
+        vocabulary = [vocabulary[index] for index in used]
+
+        # Sorted by document, which is the forward (CSR) layout
+        order = np.argsort(docs, kind="stable")
+        doc_indptr = np.zeros(len(files) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(docs, minlength=len(files)), out=doc_indptr[1:])
+        index = BM25Index.from_postings(
+            list(files),
+            {term: position for position, term in enumerate(vocabulary)},
+            terms,
+            docs,
+            freqs,
+        )
+        self._save(
+            files,
+            vocabulary,
+            {
+                "doc_indptr": doc_indptr,
+                "doc_terms": terms[order],
+                "doc_freqs": freqs[order],
+                "indptr": index.indptr,
+                "postings": index.postings,
+                "weights": index.weights,
+            },
+        )
+        self.files = files
+        self.terms = vocabulary
+        self.index = index
+        return added, updated, removed
+
+    def _save(self, files, vocabulary, arrays):
+        import numpy as np
+
+        os.makedirs(self.directory, exist_ok=True)
+        data = f"data-{uuid.uuid4().hex}"
+        data_dir = os.path.join(self.directory, data)
+        os.makedirs(data_dir)
+        with open(
+            os.path.join(data_dir, "vocabulary.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(vocabulary, f)
+        for name, array in arrays.items():
+            np.save(os.path.join(data_dir, f"{name}.npy"), array)
+        self.arrays = arrays
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "data": data, "files": files}, f)
+        os.replace(tmp_path, self.meta_path)
+
+        if self.data is not None:
+            shutil.rmtree(os.path.join(self.directory, self.data), ignore_errors=True)
+        self.data = data
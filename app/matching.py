@@ -0,0 +1,175 @@
+import re
+from collections import Counter
+
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Keeps skills such as "c++", "c#" and "node.js" in one piece
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+STOP_WORDS = frozenset(
+    """
+    a about above after all also an and any are as at be been being both but by
+    can could did do does doing during each etc for from had has have having he
+    her here his how i if in into is it its just may me more most must my no nor
+    not of on once only or other our out over own same she should so some such
+    than that the their them then there these they this those through to too
+    under until up upon us very was we were what when where which while who will
+    with within would you your
+    """.split()
+)
+
+
+def tokenize(text):
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+class BM25Index:
+    """Okapi BM25 index over a small corpus such as a folder of job descriptions.
+
+    Postings are stored term by term in flat NumPy arrays (the layout of a CSC
+    matrix), with the BM25 weight of every posting computed once at build time.
+    Scoring a query is then a single weighted bincount over the postings of
+    its terms.
+    Ref Doc: https://en.wikipedia.org/wiki/Okapi_BM25
+    """
+
+    def __init__(self, ids, vocabulary, indptr, postings, weights):
+        self.ids = ids
+        self.positions = {doc_id: index for index, doc_id in enumerate(ids)}
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.postings = postings
+        self.weights = weights
+
+    @classmethod
+    def build(cls, documents, k1=1.5, b=0.75):
+        """Index `documents`, a mapping of id to text."""
+        import numpy as np
+
+        ids = list(documents)
+        counts = [Counter(tokenize(documents[doc_id])) for doc_id in ids]
+        vocabulary = {
+            term: index for index, term in enumerate(sorted(set().union(*counts)))
+        }
+
+        terms = []
+        docs = []
+        freqs = []
+        for doc_index, counter in enumerate(counts):
+            for term, freq in counter.items():
+                terms.append(vocabulary[term])
+                docs.append(doc_index)
+                freqs.append(freq)
+        return cls.from_postings(
+            ids,
+            vocabulary,
+            np.array(terms, dtype=np.int32),
+            np.array(docs, dtype=np.int32),
+            np.array(freqs, dtype=np.float32),
+            k1=k1,
+            b=b,
+        )
+
+    @classmethod
+    def from_postings(cls, ids, vocabulary, terms, docs, freqs, k1=1.5, b=0.75):
+        """Index term counts given as parallel (term, document, count) arrays."""
+        import numpy as np
+
+        # Group the postings by term
+        order = np.argsort(terms, kind="stable")
+        terms, docs, freqs = terms[order], docs[order], freqs[order]
+        document_freq = np.bincount(terms, minlength=len(vocabulary))
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_freq, out=indptr[1:])
+
+        lengths = np.bincount(docs, weights=freqs, minlength=len(ids))
+        average_length = lengths.mean() if len(ids) and lengths.mean() > 0 else 1.0
+        idf = np.log1p((len(ids) - document_freq + 0.5) / (document_freq + 0.5))
+        norm = k1 * (1 - b + b * lengths[docs] / average_length)
+        weights = (idf[terms] * freqs * (k1 + 1) / (freqs + norm)).astype(np.float32)
+        return cls(ids, vocabulary, indptr, docs, weights)
+
+    def scores(self, text):
+        """BM25 score of every indexed document for the query `text`."""
+        import numpy as np
+
+        columns = [
+            self.vocabulary[term]
+            for term in set(tokenize(text))
+            if term in self.vocabulary
+        ]
+        if not columns:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        postings = np.concatenate(
+            [np.arange(self.indptr[c], self.indptr[c + 1]) for c in columns]
+        )
+        return np.bincount(
+            self.postings[postings],
+            weights=self.weights[postings],
+            minlength=len(self.ids),
+        )
+
+    def top_k(self, text, k=10):
+        """Return up to `k` (id, score) pairs, best first, skipping zero scores."""
+        import numpy as np
+
+        scores = self.scores(text)
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in best if scores[i] > 0]
+
+
+def rank_documents(query, documents, k=10):
+    """Rank `documents` (id to text) against the text of `query`."""
+    return BM25Index.build(documents).top_k(query, k)
+
+
+def prerank_pairs(pairs, documents, top_n):
+    """Keep only the `top_n` best matching descriptions of every resume.
+
+    `documents` maps paths to their text. Pairs whose resume could not be read
+    are all kept, so that the batch still reports them.
+    """
+    descriptions = {
+        description: documents[description]
+        for _, description in pairs
+        if description in documents
+    }
+    if not descriptions:
+        return pairs
+    index = BM25Index.build(descriptions)
+
+    candidates = {}
+    for resume, description in pairs:
+        candidates.setdefault(resume, set()).add(description)
+
+    keep = set()
+    for resume, paired in candidates.items():
+        if resume not in documents:
+            keep.update((resume, description) for description in paired)
+            continue
+        scores = index.scores(documents[resume])
+        # Unreadable descriptions rank last
+        ranked = sorted(
+            sorted(paired),
+            key=lambda description: (
+                -scores[index.positions[description]]
+                if description in index.positions
+                else float("inf")
+            ),
+        )
+        keep.update((resume, description) for description in ranked[:top_n])
+
+    selected = [pair for pair in pairs if pair in keep]
+    logger.info(f"Pre-ranking kept {len(selected)} of {len(pairs)} pairs (top {top_n})")
+    return selected
@@ -0,0 +1,154 @@
+import contextlib
+import json
+import threading
+import time
+from collections import deque
+
+# Only the most recent spans are kept, a long-running server records forever
+MAX_SPANS = 10000
+
+
+class Metrics:
+    """Records timed spans for each stage of a run and exports them.
+
+    Every span is kept (up to MAX_SPANS) for the JSON lines export, and
+    aggregated by name and labels for the Prometheus text export.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.spans = deque(maxlen=max_spans)
+        self.summaries = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        # Yields the labels so the caller can attach values found on the way
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.record(name, time.perf_counter() - start, started=started, **labels)
+
+    def record(self, name, seconds, started=None, **labels):
+        span = {
+            "name": name,
+            "start": started if started is not None else time.time() - seconds,
+            "duration": seconds,
+            **labels,
+        }
+        key = (name, self._label_key(labels))
+        with self._lock:
+            self.spans.append(span)
+            count, total = self.summaries.get(key, (0, 0.0))
+            self.summaries[key] = (count + 1, total + seconds)
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, self._label_key(labels))] = value
+
+    @staticmethod
+    def _label_key(labels):
+        # Only short string labels such as the model become Prometheus labels
+        return tuple(
+            sorted(
+                (key, value)
+                for key, value in labels.items()
+                if key in ("model", "extension")
+            )
+        )
+
+    def export_jsonl(self, path):
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+    def export_prometheus(self):
+        # Ref Doc: https://prometheus.io/docs/instrumenting/exposition_formats/
+        lines = [
+            "# HELP resume_enhancer_span_seconds Time spent in each stage",
+            "# TYPE resume_enhancer_span_seconds summary",
+        ]
+        with self._lock:
+            summaries = sorted(self.summaries.items())
+            gauges = sorted(self.gauges.items())
+        for (name, labels), (count, total) in summaries:
+            label_text = format_labels([("span", name), *labels])
+            lines.append(f"resume_enhancer_span_seconds_count{label_text} {count}")
+            lines.append(f"resume_enhancer_span_seconds_sum{label_text} {total:.6f}")
+
+        declared = set()
+        for (name, labels), value in gauges:
+            metric = f"resume_enhancer_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} gauge")
+                declared.add(metric)
+            lines.append(f"{metric}{format_labels(labels)} {value:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        # .prom files get the Prometheus text format, anything else JSON lines
+        if path.endswith(".prom"):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.export_prometheus())
+        else:
+            self.export_jsonl(path)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = [
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    ]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+@contextlib.contextmanager
+def profile(path):
+    """Profile the block and dump the result to `path`.
+
+    An .html path uses pyinstrument when it is installed, anything else is a
+    cProfile dump that can be opened with pstats or snakeviz.
+    """
+    if not path:
+        yield
+        return
+
+    if path.endswith(".html"):
+        try:
+            from pyinstrument import Profiler  # type: ignore
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            return
+        path = path[: -len(".html")] + ".prof"
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
@@ -0,0 +1,182 @@
+import re
+from collections import Counter
+
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+SYSTEM_PROMPT = "You are a specialized AI assistant focused on optimizing resumes to closely align with specific job descriptions. Given the resume content and job description provided, analyze both documents in detail. Identify specific skills, experiences, keywords, and relevant achievements that should be emphasized, modified, or added in the resume to increase alignment with the job requirements. Highlight any key qualifications or terminology missing in the resume that would strengthen the candidate's match for the role. Provide actionable suggestions to enhance clarity, relevance, and impact."
+
+
+# The user message starts with the job description, so every request for one
+# description shares the same prefix (system prompt plus description) and the
+# provider can reuse it. Only the resume part differs between requests.
+USER_TEMPLATE = "Job Description:\n{description}\n\n{label}:\n"
+
+# Splits a user message built from USER_TEMPLATE back into its parts
+USER_PATTERN = re.compile(
+    r"\AJob Description:\n(?P<description>.*?)\n\n(?P<label>Resume[^\n]*):\n"
+    r"(?P<resume>.*)\Z",
+    re.DOTALL,
+)
+
+
+def description_prefix(description, label="Resume"):
+    # Shared by every request for `description`, see USER_TEMPLATE
+    return USER_TEMPLATE.format(description=description.strip(), label=label)
+
+
+def split_user_message(content):
+    # Returns (description, resume) of a user message built by build_messages
+    match = USER_PATTERN.match(content)
+    if match is None:
+        return "", content
+    return match.group("description"), match.group("resume")
+
+
+def build_messages(resume, description, system=SYSTEM_PROMPT):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": description_prefix(description) + resume.strip()},
+    ]
+
+
+SECTION_PROMPT = "You are a specialized AI assistant focused on optimizing one section of a resume to closely align with a specific job description. Given the job description and one section of a resume, suggest specific rewrites, keywords and achievements for this section only. Point out qualifications the job asks for that belong in this section but are missing. Keep the suggestions concise, actionable and in the order of the section."
+
+
+def build_section_messages(section, text, description):
+    # The section name comes after the description, so all sections of a
+    # resume share the system prompt and description prefix
+    prefix = description_prefix(description, label=f"Resume section ({section})")
+    return [
+        {"role": "system", "content": SECTION_PROMPT},
+        {"role": "user", "content": prefix + text.strip()},
+    ]
+
+
+# Context window of the models we know about, used to size the prompt budget
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-8b-8192": 8192,
+    "llama3-70b-8192": 8192,
+    "gemma-7b-it": 8192,
+    "gemma2-9b-it": 8192,
+    "mixtral-8x7b-32768": 32768,
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.1-70b-versatile": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Room left for the message framing and the labels in the user message
+PROMPT_OVERHEAD_TOKENS = 64
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# "Page 2", "Page 2 of 5", "2 of 5", "2/5" and "- 2 -" are always page numbers
+PAGE_NUMBER_PATTERN = re.compile(
+    r"^page\s*\d+(\s*(of|/)\s*\d+)?$|^\d+\s*(of|/)\s*\d+$|^-\s*\d+\s*-$",
+    re.IGNORECASE,
+)
+# A bare number could be a year or a phone number, it only counts as a page
+# number when it is short and one shows up on every page, counting up
+BARE_PAGE_NUMBER_PATTERN = re.compile(r"^\d{1,3}$")
+
+
+def estimate_tokens(text):
+    # Rough local estimate of the tokenizer: punctuation is one token and
+    # words cost about one token per four characters
+    return sum(-(-len(match) // 4) for match in TOKEN_PATTERN.findall(text))
+
+
+def estimate_messages_tokens(messages):
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def normalize_whitespace(text):
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    text = "\n".join(lines).strip()
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def remove_boilerplate(text, min_repeats=3):
+    """Drop page numbers and keep only the first copy of repeated lines.
+
+    Headers and footers extracted from every page of a PDF show up as the
+    same short line many times; genuine content rarely repeats verbatim.
+    """
+    lines = text.split("\n")
+    counts = Counter(line for line in lines if line)
+    bare_numbers = [int(line) for line in lines if BARE_PAGE_NUMBER_PATTERN.match(line)]
+    numbered_pages = len(bare_numbers) >= 2 and bare_numbers == sorted(
+        set(bare_numbers)
+    )
+    seen = set()
+    kept = []
+    for line in lines:
+        if PAGE_NUMBER_PATTERN.match(line):
+            continue
+        if numbered_pages and BARE_PAGE_NUMBER_PATTERN.match(line):
+            continue
+        if counts[line] >= min_repeats:
+            if line in seen:
+                continue
+            seen.add(line)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def truncate_to_tokens(text, budget):
+    if budget <= 0:
+        return ""
+    used = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += -(-len(match.group()) // 4)
+        if used > budget:
+            return text[: match.start()].rstrip()
+    return text
+
+
+def get_context_window(model):
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def compact_text(text):
+    return remove_boilerplate(normalize_whitespace(text))
+
+
+def compact_prompt(resume, description, model, max_tokens, context_window=None):
+    """Clean up both documents and trim them to fit the model's context window.
+
+    Returns the compacted (resume, description). When trimming is needed the
+    shorter document keeps as much as it can of its half of the budget and
+    the longer one gets the rest.
+    """
+    if context_window is None:
+        context_window = get_context_window(model)
+    budget = (
+        context_window
+        - max_tokens
+        - estimate_tokens(SYSTEM_PROMPT)
+        - PROMPT_OVERHEAD_TOKENS
+    )
+
+    original_tokens = estimate_tokens(resume) + estimate_tokens(description)
+    resume = compact_text(resume)
+    description = compact_text(description)
+    resume_tokens = estimate_tokens(resume)
+    description_tokens = estimate_tokens(description)
+
+    if resume_tokens + description_tokens > budget:
+        if resume_tokens <= description_tokens:
+            resume_budget = min(resume_tokens, budget // 2)
+            description_budget = budget - resume_budget
+        else:
+            description_budget = min(description_tokens, budget // 2)
+            resume_budget = budget - description_budget
+        resume = truncate_to_tokens(resume, resume_budget)
+        description = truncate_to_tokens(description, description_budget)
+
+    removed = original_tokens - estimate_tokens(resume) - estimate_tokens(description)
+    logger.info(
+        f"Compacted prompt for {model}: removed ~{removed} of ~{original_tokens} tokens"
+    )
+    return resume, description
@@ -0,0 +1,181 @@
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from app.cache import DEFAULT_CACHE_DIR
+from app.completion import chunk_usage, timed_completion
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+LATENCY_PATH = os.path.join(DEFAULT_CACHE_DIR, "latency.json")
+
+# Time to first token samples kept per model
+MAX_LATENCY_SAMPLES = 100
+
+# Fewer samples than this say little about the 95th percentile
+MIN_HEDGE_SAMPLES = 20
+
+# Backup requests are sent after this many seconds until a model has history
+DEFAULT_HEDGE_AFTER = 2.0
+
+# Shortest completion a race accepts by default
+DEFAULT_RACE_MIN_CHARS = 200
+
+
+class LatencyHistory:
+    """Recent time to first token samples per model, kept on disk.
+
+    The hedge threshold of a model is the 95th percentile of its samples, so
+    a backup request is only sent for the slowest 5% of first tokens.
+    """
+
+    def __init__(self, path=LATENCY_PATH, max_samples=MAX_LATENCY_SAMPLES):
+        self.path = path
+        self.max_samples = max_samples
+        self.samples = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.samples = json.load(f)
+            except (OSError, ValueError):
+                self.samples = {}
+
+    def add(self, model, seconds):
+        with self._lock:
+            samples = self.samples.setdefault(model, [])
+            samples.append(seconds)
+            del samples[: -self.max_samples]
+
+    def percentile(self, model, fraction=0.95):
+        with self._lock:
+            samples = sorted(self.samples.get(model, []))
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps(self.samples)
+        # Ref Doc: https://docs.python.org/3/library/os.html#os.replace
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+
+def min_length_check(min_chars=DEFAULT_RACE_MIN_CHARS):
+    def accept(content):
+        return len(content.strip()) >= min_chars
+
+    return accept
+
+
+def race(
+    client,
+    jobs,
+    temperature=0.5,
+    accept=None,
+    hedge_after=None,
+    history=None,
+):
+    """Return (model, content, usage) of the first acceptable completion.
+
+    `jobs` holds (model, messages, max_token). Every model starts at once,
+    and when one finishes with content that passes `accept` the others are
+    cancelled, which closes their streams. With `hedge_after`, only the
+    first model starts, and the second one is sent as a backup if no token
+    has arrived after `hedge_after` seconds, or the first model fails.
+
+    When no completion is accepted the longest one is returned, and None
+    when every model failed.
+    """
+    accept = accept or min_length_check()
+    pending = list(jobs)
+    finished = queue.Queue()
+    first_token = threading.Event()
+    cancelled = threading.Event()
+
+    def run(model, messages, max_token):
+        parts = []
+        usage = None
+        start = time.perf_counter()
+        stream = timed_completion(client, messages, model, temperature, max_token)
+        try:
+            for chunk in stream:
+                if cancelled.is_set():
+                    logger.info(f"Cancelled {model}, another model won the race")
+                    return
+                piece = chunk.choices[0].delta.content
+                if piece:
+                    if not parts and history is not None:
+                        history.add(model, time.perf_counter() - start)
+                    parts.append(piece)
+                    first_token.set()
+                usage = chunk_usage(chunk) or usage
+            finished.put((model, "".join(parts), usage, None))
+        except Exception as e:
+            finished.put((model, None, None, e))
+        finally:
+            stream.close()
+
+    def start_next():
+        job = pending.pop(0)
+        threading.Thread(target=run, args=job, daemon=True).start()
+
+    hedged = hedge_after is not None
+    if hedged:
+        pending = pending[:2]
+        start_next()
+        deadline = time.monotonic() + hedge_after
+    else:
+        while pending:
+            start_next()
+
+    running = 1 if hedged else len(jobs)
+    best = None
+    while running:
+        timeout = None
+        if pending and not first_token.is_set():
+            timeout = max(0.0, deadline - time.monotonic())
+        try:
+            model, content, usage, error = finished.get(timeout=timeout)
+        except queue.Empty:
+            if not first_token.is_set():
+                logger.info(
+                    f"No token after {hedge_after:.2f} seconds, "
+                    f"sending a backup request to {pending[0][0]}"
+                )
+                start_next()
+                running += 1
+            continue
+
+        running -= 1
+        if error is None and accept(content):
+            cancelled.set()
+            return model, content, usage
+        if error is not None:
+            logger.error(f"Error in race for {model}: {error}")
+        else:
+            logger.warning(f"{model} finished without an acceptable answer")
+            if best is None or len(content) > len(best[1]):
+                best = (model, content, usage)
+        if pending:
+            # The first model failed, the backup does not wait for the threshold
+            start_next()
+            running += 1
+
+    return best
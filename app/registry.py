@@ -0,0 +1,130 @@
+import difflib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from app.cache import DEFAULT_CACHE_DIR
+from app.clients import get_http_client
+from app.prompt import get_context_window
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+MODELS_URL = "https://api.groq.com/openai/v1/models"
+REGISTRY_PATH = os.path.join(DEFAULT_CACHE_DIR, "models.json")
+DEFAULT_REGISTRY_TTL = 24 * 60 * 60
+
+
+class ModelRegistry:
+    """Models available to an API key, cached on disk for `ttl` seconds.
+
+    A fresh listing is served from disk without a request. A stale one is
+    still served, and refreshed in a background thread for the next call.
+    Only when there is no listing at all does a call wait for the API.
+    Ref Doc: https://console.groq.com/docs/models
+    """
+
+    def __init__(self, api_key, path=REGISTRY_PATH, ttl=DEFAULT_REGISTRY_TTL):
+        self.api_key = api_key
+        self.path = path
+        self.ttl = ttl
+        self.fetched_at = 0.0
+        self.data = None
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            self.fetched_at = cached["fetched_at"]
+            self.data = cached["data"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring corrupt model registry {self.path}")
+
+    def _save(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "data": self.data}, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        response = get_http_client().get(MODELS_URL, headers=headers)
+        response.raise_for_status()
+        data = response.json()["data"]
+        with self._lock:
+            self.data = data
+            self.fetched_at = time.time()
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Could not save the model registry: {e}")
+        return data
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+
+            def run():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning(f"Background model registry refresh failed: {e}")
+
+            self._refreshing = threading.Thread(target=run, daemon=True)
+            self._refreshing.start()
+
+    def models(self):
+        """Return the model listing, the `data` list of the models endpoint."""
+        if self.data is None:
+            return self.refresh()
+        if time.time() - self.fetched_at > self.ttl:
+            self._refresh_in_background()
+        return self.data
+
+    def get(self, model):
+        for entry in self.models():
+            if entry.get("id") == model:
+                return entry
+        return None
+
+    def validate(self, models):
+        """Return an error message for every model the API does not offer."""
+        available = [entry["id"] for entry in self.models() if entry.get("active", 1)]
+        errors = []
+        for model in models:
+            if model in available:
+                continue
+            suggestion = difflib.get_close_matches(model, available, n=1)
+            hint = f", did you mean {suggestion[0]}?" if suggestion else ""
+            errors.append(f"Unknown model: {model}{hint}")
+        return errors
+
+    def context_window(self, model):
+        entry = self.get(model)
+        if entry and entry.get("context_window"):
+            return entry["context_window"]
+        return get_context_window(model)
+
+    def max_tokens(self, model, requested):
+        # Never ask for more output than the model can produce
+        entry = self.get(model)
+        limit = entry.get("max_completion_tokens") if entry else None
+        return min(requested, limit) if limit else requested
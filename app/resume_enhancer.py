@@ -1,18 +1,64 @@
 import argparse
+import contextlib
 import json
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests  # type: ignore
 from app.config import TOOL_NAME, VERSION
-from groq import Groq  # type: ignore
-from halo import Halo  # type: ignore
 from app.utils import (
+    OutputWriter,
     write_to_file,
     read_file,
     setup_logging,
     read_toml_config,
     get_help,
+    DEFAULT_MAX_DOCUMENT_MB,
+)
+from app.backends import (
+    DEFAULT_BACKEND,
+    configure_llama,
+    default_models,
+    get_client,
+    needs_api_key,
+)
+from app.clients import configure_pool
+from app.completion import chunk_usage, timed_completion
+from app.prompt import build_messages, compact_prompt
+from app.metrics import get_metrics, profile
+from app.scheduler import get_scheduler
+from app.registry import ModelRegistry, REGISTRY_PATH
+from app.sections import enhance_sections, split_sections
+from app.racing import (
+    DEFAULT_HEDGE_AFTER,
+    DEFAULT_RACE_MIN_CHARS,
+    LATENCY_PATH,
+    LatencyHistory,
+    min_length_check,
+    race,
+)
+from app.structured import (
+    JsonStreamParser,
+    build_json_messages,
+    format_event,
+    parse_result,
+)
+from app.cache import (
+    DocumentCache,
+    ResponseCache,
+    DOCUMENT_CACHE_DIR,
+    RESPONSE_CACHE_DIR,
+)
+from app.workqueue import WorkQueue
+from app.corpus import CorpusIndex, INDEX_DIR
+from app.matching import rank_documents
+from app.batch import (
+    expand_inputs,
+    read_manifest,
+    build_pairs,
+    read_documents,
+    run_batch,
 )
 
 # Setup logger
@@ -29,6 +75,291 @@ def get_version():
         logger.error("Failed to get_version", e)
 
 
+# Serializes terminal output when several models run at the same time
+print_lock = threading.Lock()
+
+
+def model_output_path(output, model, extension="txt"):
+    if len(output) == 1:
+        return f"{output[0]}_{model}.{extension}"
+    return f"{output[0]}_{model}.{output[1]}"
+
+
+def write_model_output(output, model, content, extension="txt"):
+    write_to_file(model_output_path(output, model, extension), content)
+
+
+def print_events(events):
+    for event in events:
+        line = format_event(event)
+        if line is not None:
+            print(line, flush=True)
+
+
+def print_token_usage(usage, cache=None):
+    # Print colored token usage info
+    # Ref Doc: https://codehs.com/tutorial/andy/ansi-colors
+    if usage is None:
+        formatted_usage = (
+            "\n\033[92m"
+            "Token Usage:\n"
+            "-------------\n"
+            "- Served from cache, no tokens used\n"
+        )
+    else:
+        formatted_usage = (
+            "\n\033[92m"
+            "Token Usage:\n"
+            "-------------\n"
+            f"- Completion Tokens: {usage.completion_tokens}\n"
+            f"- Prompt Tokens: {usage.prompt_tokens}\n"
+            f"- Total Tokens: {usage.total_tokens}\n\n"
+            "Timing:\n"
+            "-------\n"
+            f"- Completion Time: {usage.completion_time:.3f} seconds\n"
+            f"- Prompt Time: {usage.prompt_time:.3f} seconds\n"
+            f"- Queue Time: {usage.queue_time:.3f} seconds\n"
+            f"- Total Time: {usage.total_time:.3f} seconds\n"
+        )
+
+    if cache is not None:
+        formatted_usage += (
+            "\n"
+            "Cache:\n"
+            "------\n"
+            f"- Hits: {cache.hits}\n"
+            f"- Misses: {cache.misses}\n"
+        )
+
+    print(formatted_usage + "\033[0m", file=sys.stderr)
+
+
+def process_model(
+    model,
+    messages,
+    api_key,
+    temperature=0.5,
+    max_token=1024,
+    output=None,
+    token_usage=False,
+    stream=False,
+    spinner=None,
+    cache=None,
+    refresh=False,
+    structured=False,
+    backend=DEFAULT_BACKEND,
+):
+    cache_key = None
+    cached = None
+    if cache is not None:
+        cache_key = cache.make_key(messages, model, temperature, max_token, backend)
+        if not refresh:
+            cached = cache.get(cache_key)
+
+    # In JSON mode the fields are shown as soon as they are complete, and the
+    # output file gets the whole validated object at the end
+    parser = JsonStreamParser() if structured else None
+    if spinner and cached is None:
+        spinner.start()
+    try:
+        usage = None
+        if cached is not None:
+            # A cache hit skips the request entirely
+            content = cached["content"]
+            if stream:
+                print(f"\n\nModel: {model}")
+                if parser is not None:
+                    print_events(parser.feed(content))
+                else:
+                    print(content, end="")
+        else:
+            client = get_client(backend, api_key)
+
+            chat_completion = timed_completion(
+                client, messages, model, temperature, max_token
+            )
+            # Chunks go straight to the terminal and the output file, the whole
+            # text is only kept when it has to be cached or printed at the end
+            keep = cache is not None or structured or not (output or stream)
+            parts = [] if keep else None
+            content = None
+            if spinner:
+                spinner.stop()
+                print("\n")
+            if stream:
+                print(f"\n\nModel: {model}")
+            with (
+                OutputWriter(model_output_path(output, model))
+                if output and not structured
+                else contextlib.nullcontext()
+            ) as writer:
+                for chunk in chat_completion:
+                    chunk_content = chunk.choices[0].delta.content
+                    if chunk_content:
+                        if parts is not None:
+                            parts.append(chunk_content)
+                        if writer is not None:
+                            writer.write(chunk_content)
+                        if stream and parser is not None:
+                            print_events(parser.feed(chunk_content))
+                        elif stream:
+                            print(chunk_content, end="", flush=True)
+                    # Kept for the cache even without --token-usage
+                    usage = chunk_usage(chunk) or usage
+            if parts is not None:
+                content = "".join(parts)
+
+            if cache is not None:
+                cache.set(cache_key, content, usage)
+
+        if structured:
+            content = json.dumps(parse_result(content), indent=2)
+
+        with print_lock:
+            if output and (cached is not None or structured):
+                write_model_output(
+                    output, model, content, "json" if structured else "txt"
+                )
+            elif not output and not stream:
+                # Print all the fetched content on the screen
+                print(f"\n\nModel: {model}")
+                print(content)
+
+            if token_usage and usage is None and cached is None:
+                logger.warning(f"No token usage was reported for {model}")
+            elif token_usage:
+                print_token_usage(usage, cache)
+
+    except Exception as e:
+        if spinner:
+            spinner.stop()
+        logger.error(f"Error in get_response: {e}")
+
+
+def process_sections(
+    model,
+    sections,
+    description,
+    api_key,
+    temperature=0.5,
+    max_token=1024,
+    output=None,
+    token_usage=False,
+    spinner=None,
+    cache=None,
+    refresh=False,
+    compact=False,
+    context_window=None,
+    backend=DEFAULT_BACKEND,
+):
+    if spinner:
+        spinner.start()
+    try:
+        report, usage = enhance_sections(
+            get_client(backend, api_key),
+            sections,
+            description,
+            model,
+            temperature,
+            max_token,
+            cache=cache,
+            refresh=refresh,
+            compact=compact,
+            context_window=context_window,
+        )
+        if spinner:
+            spinner.stop()
+
+        with print_lock:
+            if output:
+                write_model_output(output, model, report)
+            else:
+                print(f"\n\nModel: {model}")
+                print(report)
+
+            if token_usage:
+                print_token_usage(usage, cache)
+
+    except Exception as e:
+        if spinner:
+            spinner.stop()
+        logger.error(f"Error in get_response: {e}")
+
+
+def process_race(
+    jobs,
+    api_key,
+    temperature=0.5,
+    output=None,
+    token_usage=False,
+    spinner=None,
+    cache=None,
+    refresh=False,
+    structured=False,
+    min_chars=DEFAULT_RACE_MIN_CHARS,
+    hedge_after=None,
+    history=None,
+    backend=DEFAULT_BACKEND,
+):
+    # jobs holds (model, messages, max_token), in order of preference
+    winner = None
+    if cache is not None and not refresh:
+        for model, messages, max_token in jobs:
+            key = cache.make_key(messages, model, temperature, max_token, backend)
+            cached = cache.get(key)
+            if cached is not None:
+                winner = (model, cached["content"], None)
+                break
+
+    long_enough = min_length_check(min_chars)
+
+    def accept(content):
+        if not long_enough(content):
+            return False
+        try:
+            return not structured or parse_result(content)["match_score"] is not None
+        except ValueError:
+            return False
+
+    if spinner and winner is None:
+        spinner.start()
+    try:
+        if winner is None:
+            winner = race(
+                get_client(backend, api_key),
+                jobs,
+                temperature,
+                accept=accept,
+                hedge_after=hedge_after,
+                history=history,
+            )
+            if winner is None:
+                raise RuntimeError("Every model in the race failed")
+            if cache is not None:
+                model, content, usage = winner
+                messages, max_token = next(job[1:] for job in jobs if job[0] == model)
+                key = cache.make_key(messages, model, temperature, max_token, backend)
+                cache.set(key, content, usage)
+        if spinner:
+            spinner.stop()
+
+        model, content, usage = winner
+        if structured:
+            content = json.dumps(parse_result(content), indent=2)
+        if output:
+            write_model_output(output, model, content, "json" if structured else "txt")
+        else:
+            print(f"\n\nModel: {model}")
+            print(content)
+        if token_usage:
+            print_token_usage(usage, cache)
+
+    except Exception as e:
+        if spinner:
+            spinner.stop()
+        logger.error(f"Error in get_response: {e}")
+
+
 # Using Halo as a decorator
 # Ref Doc: https://github.com/manrajgrover/halo?tab=readme-ov-file#usage
 # @Halo(text="Processing...", spinner="dots")
@@ -42,10 +373,25 @@ def get_response(
     output=None,
     token_usage=False,
     stream=False,
+    concurrency=1,
+    cache=None,
+    refresh=False,
+    compact=False,
+    sections=False,
+    registry=None,
+    structured=False,
+    race=False,
+    hedge_after=None,
+    race_min_chars=DEFAULT_RACE_MIN_CHARS,
+    history=None,
+    backend=DEFAULT_BACKEND,
 ):
+    # Imported here to keep --help and --version fast
+    from halo import Halo  # type: ignore
+
     spinner = Halo(text="Processing", spinner="dots")
 
-    if api_key is None:
+    if api_key is None and needs_api_key(backend):
         raise ValueError("API key is required")
 
     if resume is None:
@@ -55,95 +401,167 @@ def get_response(
         raise ValueError("Description is required")
 
     if not models:
-        models = ["llama3-8b-8192"]
+        models = default_models(backend)
 
-    for model in models:
-        print(f"Processing with model: {model}")
-        spinner.start()
-        try:
-            client = Groq(api_key=api_key)
-
-            system_message = {
-                "role": "system",
-                "content": "You are a specialized AI assistant focused on optimizing resumes to closely align with specific job descriptions. Given the resume content and job description provided, analyze both documents in detail. Identify specific skills, experiences, keywords, and relevant achievements that should be emphasized, modified, or added in the resume to increase alignment with the job requirements. Highlight any key qualifications or terminology missing in the resume that would strengthen the candidate's match for the role. Provide actionable suggestions to enhance clarity, relevance, and impact.",
-            }
-
-            user_message = {
-                "role": "user",
-                "content": f"""
-                    Resume:
-                    {resume}
-
-                    Job Description:
-                    {description}
-                """,
-            }
-
-            chat_completion = client.chat.completions.create(
-                messages=[system_message, user_message],
-                model=model,
+    def context_window(model):
+        return registry.context_window(model) if registry is not None else None
+
+    def model_options(model):
+        # The registry knows how much output each model can produce
+        if registry is None:
+            return options
+        return dict(options, max_token=registry.max_tokens(model, max_token))
+
+    def model_messages(model):
+        build = build_json_messages if structured else build_messages
+        with get_metrics().span("build_prompt", model=model, compact=compact):
+            if compact:
+                return build(
+                    *compact_prompt(
+                        resume,
+                        description,
+                        model,
+                        model_options(model)["max_token"],
+                        context_window=context_window(model),
+                    )
+                )
+            return build(resume, description)
+
+    options = dict(
+        api_key=api_key,
+        temperature=temperature,
+        max_token=max_token,
+        output=output,
+        token_usage=token_usage,
+        cache=cache,
+        refresh=refresh,
+        backend=backend,
+    )
+
+    if sections and structured:
+        logger.warning("JSON output covers the whole resume, ignoring --sections")
+        sections = False
+    resume_sections = split_sections(resume) if sections else None
+    if sections and len(resume_sections) < 2:
+        logger.warning("Could not find resume sections, sending the whole resume")
+        resume_sections = None
+
+    with get_metrics().span("get_response", models=len(models)):
+        if resume_sections:
+            # One request per section, all sections of a model run at once
+            for model in models:
+                print(f"Processing {len(resume_sections)} sections with model: {model}")
+                process_sections(
+                    model,
+                    resume_sections,
+                    description,
+                    spinner=spinner,
+                    compact=compact,
+                    context_window=context_window(model),
+                    **model_options(model),
+                )
+            return
+
+        if (race or hedge_after is not None) and len(models) > 1:
+            # The first acceptable answer wins, the other streams are closed
+            mode = "Hedging" if hedge_after is not None else "Racing"
+            print(f"{mode} models: {', '.join(models)}")
+            process_race(
+                [
+                    (model, model_messages(model), model_options(model)["max_token"])
+                    for model in models
+                ],
+                api_key,
                 temperature=temperature,
-                max_tokens=max_token,
-                stream=True,
+                output=output,
+                token_usage=token_usage,
+                spinner=spinner,
+                cache=cache,
+                refresh=refresh,
+                structured=structured,
+                min_chars=race_min_chars,
+                hedge_after=hedge_after,
+                history=history,
+                backend=backend,
             )
-            content = ""
-            spinner.stop()
-            print("\n")
-            if not output:
-                print(f"\n\nModel: {model}")
-            for chunk in chat_completion:
-                chunk_content = chunk.choices[0].delta.content
-                if chunk_content:
-                    if output or stream is False:
-                        content += chunk_content
-                    else:
-                        print(chunk_content, end="")
+            return
 
-            if output:
-                if len(output) == 1:
-                    write_to_file(f"{output[0]}_{model}.txt", content)
-                else:
-                    write_to_file(f"{output[0]}_{model}.{output[1]}", content)
-            elif stream is False:
-                # Print all the fetched content on the screen
-                print(content)
+        if concurrency > 1 and len(models) > 1:
+            # Run up to `concurrency` models at once, each result is written (or
+            # printed) as soon as its model finishes. Interleaving several live
+            # streams on one terminal is unreadable, so every model is buffered.
+            # Ref Doc: https://docs.python.org/3/library/concurrent.futures.html
+            for model in models:
+                print(f"Processing with model: {model}")
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(
+                        process_model,
+                        model,
+                        model_messages(model),
+                        stream=False,
+                        structured=structured,
+                        **model_options(model),
+                    )
+                    for model in models
+                ]
+                for future in as_completed(futures):
+                    future.result()
+            return
 
-            # Print colored token usage info
-            # Ref Doc: https://codehs.com/tutorial/andy/ansi-colors
-            if token_usage:
-                usage = chunk.x_groq.usage
-
-                formatted_usage = (
-                    "\n\033[92m"
-                    "Token Usage:\n"
-                    "-------------\n"
-                    f"- Completion Tokens: {usage.completion_tokens}\n"
-                    f"- Prompt Tokens: {usage.prompt_tokens}\n"
-                    f"- Total Tokens: {usage.total_tokens}\n\n"
-                    "Timing:\n"
-                    "-------\n"
-                    f"- Completion Time: {usage.completion_time:.3f} seconds\n"
-                    f"- Prompt Time: {usage.prompt_time:.3f} seconds\n"
-                    f"- Queue Time: {usage.queue_time:.3f} seconds\n"
-                    f"- Total Time: {usage.total_time:.3f} seconds\n"
-                    "\033[0m"
-                )
+        for model in models:
+            print(f"Processing with model: {model}")
+            process_model(
+                model,
+                model_messages(model),
+                stream=stream,
+                spinner=spinner,
+                structured=structured,
+                **model_options(model),
+            )
 
-                print(formatted_usage, file=sys.stderr)
 
-        except Exception as e:
-            logger.error(f"Error in get_response: {e}")
+def check_models(registry, refresh=False):
+    data = registry.refresh() if refresh else registry.models()
+    print(json.dumps({"object": "list", "data": data}, indent=4))
+
+
+def build_model_registry(cli_arguments, config, api_key):
+    if not api_key:
+        return None
+    path = None
+    if not cli_arguments.no_cache and config.get("cache", True):
+        path = os.path.expanduser(config.get("model_registry_path", REGISTRY_PATH))
+    return ModelRegistry(
+        api_key,
+        path=path,
+        ttl=config.get("model_registry_ttl_hours", 24) * 60 * 60,
+    )
 
 
-def check_models(api_key):
-    url = "https://api.groq.com/openai/v1/models"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    response = requests.get(url, headers=headers)
-    print(json.dumps(response.json(), indent=4))
+def build_latency_history(cli_arguments, config):
+    path = None
+    if not cli_arguments.no_cache and config.get("cache", True):
+        path = os.path.expanduser(config.get("latency_path", LATENCY_PATH))
+    return LatencyHistory(path)
+
+
+def models_available(registry, models):
+    # Catch typos before any document is read or request is sent
+    if registry is None:
+        return True
+    try:
+        errors = registry.validate(models)
+    except Exception as e:
+        logger.warning(f"Could not check the requested models: {e}")
+        return True
+    for error in errors:
+        logger.error(error)
+    return not errors
 
 
-def prompt_for_missing_args(cli_arguments, config):
-    if not cli_arguments.api_key and not config.get("api_key"):
+def prompt_for_missing_args(cli_arguments, config, ask_api_key=True):
+    if ask_api_key and not cli_arguments.api_key and not config.get("api_key"):
         cli_arguments.api_key = input("Please enter your API key: ")
 
     if not cli_arguments.resume and not config.get("resume"):
@@ -173,6 +591,10 @@ def parse_arguments():
     parser.add_argument(
         "--model", "-m", nargs="+", help="Specify one or more models to use"
     )
+    parser.add_argument(
+        "--backend",
+        help="Completion backend: groq, keywords (offline), llama (local GGUF model)",
+    )
     parser.add_argument(
         "--output", "-o", help="allow the user to specify an output file"
     )
@@ -187,17 +609,343 @@ def parse_arguments():
         "--token-usage", "-tu", action="store_true", help="Show token usage"
     )
     parser.add_argument("--stream", "-s", action="store_true", help="Allow streaming")
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        help="Maximum number of models to query at the same time",
+        type=int,
+    )
+    parser.add_argument(
+        "--batch-resumes",
+        nargs="+",
+        help="Resume files, directories or glob patterns to process in batch",
+    )
+    parser.add_argument(
+        "--batch-descriptions",
+        nargs="+",
+        help="Description files, directories or glob patterns to process in batch",
+    )
+    parser.add_argument(
+        "--manifest", help="CSV file with resume and description columns to batch"
+    )
+    parser.add_argument(
+        "--output-dir", help="Directory for batch results (default results)"
+    )
+    parser.add_argument(
+        "--workers", "-w", help="Number of batch worker threads", type=int
+    )
+    parser.add_argument(
+        "--queue",
+        help="SQLite work queue that makes a batch resumable and shareable",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write cached responses and documents",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses but store the new ones",
+    )
+    parser.add_argument(
+        "--max-pages", help="Maximum number of PDF pages to extract", type=int
+    )
+    parser.add_argument(
+        "--max-chars",
+        help="Maximum number of characters to extract per document",
+        type=int,
+    )
+    parser.add_argument(
+        "--max-size-mb",
+        help="Reject documents larger than this many megabytes",
+        type=float,
+    )
+    parser.add_argument(
+        "--pdf-workers",
+        help="Number of processes used to extract large PDFs",
+        type=int,
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Clean up and trim the documents to fit the model's context window",
+    )
+    parser.add_argument(
+        "--sections",
+        action="store_true",
+        help="Enhance each resume section with its own request and merge the results",
+    )
+    parser.add_argument(
+        "--race",
+        action="store_true",
+        help="Start every model at once and keep the first acceptable answer",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a backup request to the second model when the first is slow",
+    )
+    parser.add_argument(
+        "--race-min-chars",
+        help="Shortest answer --race and --hedge accept",
+        type=int,
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Ask for a structured JSON result (implied by a .json output file)",
+    )
+    parser.add_argument(
+        "--serve", action="store_true", help="Run the enhancer as an HTTP service"
+    )
+    parser.add_argument("--host", help="Host for --serve (default 127.0.0.1)")
+    parser.add_argument("--port", help="Port for --serve (default 8000)", type=int)
+    parser.add_argument(
+        "--warm-cache",
+        nargs="+",
+        help="Extract and cache documents from files, directories or globs",
+    )
+    parser.add_argument(
+        "--rank",
+        action="store_true",
+        help="Rank --batch-descriptions against --resume (or the reverse) locally",
+    )
+    parser.add_argument(
+        "--top",
+        help="Number of results for --rank, or descriptions per resume in batch",
+        type=int,
+    )
+    parser.add_argument(
+        "--build-index",
+        nargs="+",
+        help="Build or update the description index from files, directories or globs",
+    )
+    parser.add_argument(
+        "--index", help="Directory of the description index used by --rank and --top"
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Write stage timings to a file (.prom for Prometheus, else JSON lines)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Profile the run and write the result (.html uses pyinstrument)",
+    )
     return parser.parse_args()
 
 
+def build_response_cache(cli_arguments, config):
+    if cli_arguments.no_cache or not config.get("cache", True):
+        return None
+
+    try:
+        return ResponseCache(
+            directory=os.path.expanduser(config.get("cache_dir", RESPONSE_CACHE_DIR)),
+            max_bytes=config.get("cache_max_size_mb", 50) * 1024 * 1024,
+            max_age=config.get("cache_max_age_days", 7) * 24 * 60 * 60,
+        )
+    except OSError as e:
+        logger.warning(f"Response cache disabled: {e}")
+        return None
+
+
+def build_document_cache(cli_arguments, config):
+    if cli_arguments.no_cache or not config.get("document_cache", True):
+        return None
+
+    try:
+        return DocumentCache(
+            directory=os.path.expanduser(
+                config.get("document_cache_dir", DOCUMENT_CACHE_DIR)
+            ),
+            max_bytes=config.get("document_cache_max_size_mb", 200) * 1024 * 1024,
+        )
+    except OSError as e:
+        logger.warning(f"Document cache disabled: {e}")
+        return None
+
+
+def run_batch_mode(cli_arguments, config, api_key, backend=DEFAULT_BACKEND, **options):
+    if not api_key and needs_api_key(backend):
+        logger.error("You must specify an API key")
+        return
+
+    pairs = []
+    if cli_arguments.manifest:
+        try:
+            pairs.extend(read_manifest(cli_arguments.manifest))
+        except Exception as e:
+            logger.error(f"Failed to read manifest: {e}")
+            return
+
+    top = top_n = cli_arguments.top or config.get("top")
+    if cli_arguments.batch_resumes and not cli_arguments.batch_descriptions and top:
+        # Descriptions come from the prebuilt index, only the top ones are read
+        corpus = open_index(cli_arguments, config)
+        if corpus is None:
+            return
+        top_n = None
+        pairs.extend(
+            index_pairs(
+                expand_inputs(cli_arguments.batch_resumes),
+                corpus,
+                top,
+                options.get("document_cache"),
+                options.get("read_options"),
+            )
+        )
+    elif cli_arguments.batch_resumes or cli_arguments.batch_descriptions:
+        if not (cli_arguments.batch_resumes and cli_arguments.batch_descriptions):
+            logger.error(
+                "Batch mode needs both --batch-resumes and --batch-descriptions"
+            )
+            return
+        pairs.extend(
+            build_pairs(
+                expand_inputs(cli_arguments.batch_resumes),
+                expand_inputs(cli_arguments.batch_descriptions),
+            )
+        )
+
+    queue_path = cli_arguments.queue or config.get("queue")
+    if not pairs and not queue_path:
+        logger.error("No resume and description pairs found for batch processing")
+        return
+
+    queue = None
+    if queue_path:
+        # Without inputs this run only helps to drain an existing queue
+        queue = WorkQueue(os.path.expanduser(queue_path))
+
+    output_dir = cli_arguments.output_dir or config.get("output_dir", "results")
+    jsonl = None
+    if cli_arguments.json or config.get("json", False):
+        jsonl = os.path.join(output_dir, "results.jsonl")
+
+    try:
+        run_batch(
+            pairs,
+            api_key=api_key,
+            backend=backend,
+            output_dir=output_dir,
+            workers=cli_arguments.workers or config.get("workers", 4),
+            top_n=top_n,
+            queue=queue,
+            jsonl=jsonl,
+            **options,
+        )
+    finally:
+        if queue is not None:
+            queue.close()
+
+
+def index_directory(cli_arguments, config):
+    return os.path.expanduser(cli_arguments.index or config.get("index_dir", INDEX_DIR))
+
+
+def open_index(cli_arguments, config):
+    corpus = CorpusIndex.open(index_directory(cli_arguments, config))
+    if not len(corpus):
+        logger.error("The description index is empty, build it with --build-index")
+        return None
+    return corpus
+
+
+def run_build_index(cli_arguments, config, document_cache=None, read_options=None):
+    directory = index_directory(cli_arguments, config)
+    corpus = CorpusIndex.open(directory)
+    added, updated, removed = corpus.update(
+        expand_inputs(cli_arguments.build_index),
+        workers=cli_arguments.workers or config.get("workers", 4),
+        document_cache=document_cache,
+        read_options=read_options,
+    )
+    print(
+        f"Indexed {len(corpus)} documents in {directory} "
+        f"({added} added, {updated} updated, {removed} removed)"
+    )
+
+
+def run_rank_mode(cli_arguments, config, document_cache=None, read_options=None):
+    # Rank a corpus against one document locally, no API key needed
+    workers = cli_arguments.workers or config.get("workers", 4)
+    if cli_arguments.batch_descriptions:
+        query = cli_arguments.resume or config.get("resume")
+        corpus = expand_inputs(cli_arguments.batch_descriptions)
+    elif cli_arguments.batch_resumes:
+        query = cli_arguments.description or config.get("description")
+        corpus = expand_inputs(cli_arguments.batch_resumes)
+    else:
+        # Without a corpus the resume is ranked against the description index
+        query = cli_arguments.resume or config.get("resume")
+        corpus = None
+        index = open_index(cli_arguments, config) if query else None
+        if index is None:
+            return
+    if not query or corpus == []:
+        logger.error(
+            "Ranking needs --resume with --batch-descriptions or an index, "
+            "or --description with --batch-resumes"
+        )
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        documents = read_documents(
+            [query, *(corpus or [])], executor, document_cache, read_options
+        )
+    if query not in documents:
+        return
+
+    query_text = documents.pop(query)
+    top = cli_arguments.top or config.get("top", 10)
+    if corpus is None:
+        ranked = index.top_k(query_text, top)
+    else:
+        ranked = rank_documents(query_text, documents, top)
+    if not ranked:
+        print("No matching documents found")
+    for position, (path, score) in enumerate(ranked, start=1):
+        print(f"{position}. {path} (score {score:.2f})")
+
+
+def index_pairs(resumes, corpus, top, document_cache=None, read_options=None):
+    # Pair every resume with its `top` best descriptions from the index
+    pairs = []
+    for resume in resumes:
+        try:
+            text = read_file(resume, cache=document_cache, **(read_options or {}))
+        except Exception as e:
+            logger.error(f"Failed to read {resume}: {e}")
+            continue
+        pairs.extend((resume, path) for path, _ in corpus.top_k(text, top))
+    return pairs
+
+
 ## Main Function
 def main():
-    # Load configuration from the TOML file
-    config = read_toml_config(CONFIG_PATH)
+    metrics = get_metrics()
+    with metrics.span("read_config"):
+        # Load configuration from the TOML file
+        config = read_toml_config(CONFIG_PATH)
 
     # Get CLI cli_arguments
     cli_arguments = parse_arguments()
 
+    metrics_path = cli_arguments.metrics or config.get("metrics")
+    profile_path = cli_arguments.profile or config.get("profile")
+
+    with profile(profile_path), metrics.span("main"):
+        run_cli(cli_arguments, config)
+
+    if metrics_path:
+        try:
+            metrics.export(metrics_path)
+        except OSError as e:
+            logger.error(f"Failed to write metrics: {e}")
+
+
+def run_cli(cli_arguments, config):
     if cli_arguments.help:
         print(get_help())
         return
@@ -210,21 +958,140 @@ def main():
     api_key = cli_arguments.api_key or config.get("api_key")
     resume = cli_arguments.resume or config.get("resume")
     description = cli_arguments.description or config.get("description")
-    models = cli_arguments.model or config.get("model", ["llama3-8b-8192"])
+    backend = cli_arguments.backend or config.get("backend", DEFAULT_BACKEND)
+    try:
+        models = cli_arguments.model or config.get("model") or default_models(backend)
+    except ValueError as e:
+        logger.error(e)
+        return
     temperature = cli_arguments.temperature or config.get("temperature", 0.5)
     max_tokens = cli_arguments.maxTokens or config.get("maxTokens", 1024)
     output = cli_arguments.output or config.get("output", None)
     token_usage = cli_arguments.token_usage or config.get("token_usage", False)
     stream = cli_arguments.stream or config.get("stream", False)
+    concurrency = cli_arguments.concurrency or config.get("concurrency", 1)
+    refresh = cli_arguments.refresh or config.get("refresh", False)
+    compact = cli_arguments.compact or config.get("compact", False)
+    sections = cli_arguments.sections or config.get("sections", False)
+    structured = cli_arguments.json or config.get("json", False)
+    if output and output.lower().endswith(".json"):
+        structured = True
+    cache = build_response_cache(cli_arguments, config)
+    document_cache = build_document_cache(cli_arguments, config)
+    get_scheduler().max_retries = config.get("max_retries", 4)
+    configure_pool(
+        max_connections=config.get("max_connections"),
+        max_keepalive_connections=config.get("max_keepalive_connections"),
+        keepalive_expiry=config.get("keepalive_expiry"),
+    )
+    configure_llama(
+        models_dir=config.get("llama_models_dir"),
+        n_ctx=config.get("llama_context"),
+        n_threads=config.get("llama_threads"),
+    )
+    read_options = dict(
+        max_pages=cli_arguments.max_pages or config.get("max_pages"),
+        max_chars=cli_arguments.max_chars or config.get("max_chars"),
+        max_bytes=int(
+            (
+                cli_arguments.max_size_mb
+                or config.get("max_size_mb", DEFAULT_MAX_DOCUMENT_MB)
+            )
+            * 1024
+            * 1024
+        ),
+        workers=cli_arguments.pdf_workers or config.get("pdf_workers", 1),
+    )
+    # The model registry and --serve only know about the Groq API
+    hosted = backend == DEFAULT_BACKEND
+    registry = build_model_registry(cli_arguments, config, api_key) if hosted else None
+
+    if cli_arguments.warm_cache:
+        if document_cache is None:
+            logger.error("The document cache is disabled")
+            return
+        paths = expand_inputs(cli_arguments.warm_cache)
+        cached = document_cache.warm(
+            paths,
+            workers=cli_arguments.workers or config.get("workers", 4),
+            read_options=read_options,
+        )
+        print(f"Cached {cached} of {len(paths)} documents")
+        return
+
+    if cli_arguments.serve:
+        if not hosted:
+            logger.error("--serve only supports the groq backend")
+            return
+        if not api_key:
+            logger.error("You must specify an API key")
+            return
+        if not models_available(registry, models):
+            return
+        # The HTTP server stack is only needed in service mode
+        from app.server import DEFAULT_PARSE_WORKERS, run_server
+
+        run_server(
+            host=cli_arguments.host or config.get("host", "127.0.0.1"),
+            port=cli_arguments.port or config.get("port", 8000),
+            api_key=api_key,
+            models=models,
+            temperature=temperature,
+            max_token=max_tokens,
+            cache=cache,
+            document_cache=document_cache,
+            read_options=read_options,
+            workers=cli_arguments.workers or config.get("workers", 8),
+            parse_workers=config.get("serve_parse_workers", DEFAULT_PARSE_WORKERS),
+        )
+        return
 
     if cli_arguments.models:
+        if not hosted:
+            logger.error("--models only supports the groq backend")
+            return
         if not api_key:
             logger.error("You must specify an API key")
             return
-        check_models(api_key)
+        check_models(registry, refresh=refresh)
         return
 
-    cli_arguments = prompt_for_missing_args(cli_arguments, config)
+    if cli_arguments.build_index:
+        run_build_index(cli_arguments, config, document_cache, read_options)
+        return
+
+    if cli_arguments.rank:
+        run_rank_mode(cli_arguments, config, document_cache, read_options)
+        return
+
+    if (
+        cli_arguments.manifest
+        or cli_arguments.batch_resumes
+        or cli_arguments.batch_descriptions
+        or cli_arguments.queue
+    ):
+        if not models_available(registry, models):
+            return
+        run_batch_mode(
+            cli_arguments,
+            config,
+            api_key,
+            backend=backend,
+            models=models,
+            temperature=temperature,
+            max_token=max_tokens,
+            cache=cache,
+            refresh=refresh,
+            compact=compact,
+            document_cache=document_cache,
+            read_options=read_options,
+            registry=registry,
+        )
+        return
+
+    cli_arguments = prompt_for_missing_args(
+        cli_arguments, config, ask_api_key=needs_api_key(backend)
+    )
 
     if not resume:
         logger.error("You must provide a resume path for processing")
@@ -242,14 +1109,29 @@ def main():
         logger.error("Could not find description file at provided path")
         return
 
+    if not models_available(registry, models):
+        return
+
     try:
-        parsed_resume_content = read_file(resume)
-        parsed_job_description = read_file(description)
+        parsed_resume_content = read_file(resume, cache=document_cache, **read_options)
+        parsed_job_description = read_file(
+            description, cache=document_cache, **read_options
+        )
         if output:
             output = output.split(".")
         else:
             output = None
 
+        race_mode = cli_arguments.race or config.get("race", False)
+        hedge = cli_arguments.hedge or config.get("hedge", False)
+        history = build_latency_history(cli_arguments, config)
+        hedge_after = None
+        if hedge:
+            # Back up only the slowest 5% of first tokens once there is history
+            hedge_after = history.percentile(models[0]) or config.get(
+                "hedge_after", DEFAULT_HEDGE_AFTER
+            )
+
         get_response(
             resume=parsed_resume_content,
             description=parsed_job_description,
@@ -260,7 +1142,22 @@ def main():
             output=output,
             token_usage=token_usage,
             stream=stream,
+            concurrency=concurrency,
+            cache=cache,
+            refresh=refresh,
+            compact=compact,
+            sections=sections,
+            structured=structured,
+            registry=registry,
+            race=race_mode,
+            hedge_after=hedge_after,
+            race_min_chars=cli_arguments.race_min_chars
+            or config.get("race_min_chars", DEFAULT_RACE_MIN_CHARS),
+            history=history,
+            backend=backend,
         )
+        if race_mode or hedge:
+            history.save()
     except Exception as e:
         logger.error(f"Error: {e}")
 
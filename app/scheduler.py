@@ -0,0 +1,223 @@
+import json
+import random
+import re
+import threading
+import time
+
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Status codes worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value):
+    """Parse Groq reset durations such as "2m59.56s", "7.66s" or "120ms"."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def is_retryable(error):
+    from groq import APIConnectionError  # type: ignore
+
+    if isinstance(error, APIConnectionError):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    return parse_duration(response.headers.get("retry-after"))
+
+
+class ModelLimits:
+    def __init__(self):
+        self.limit_requests = None
+        self.limit_tokens = None
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.reset_requests_at = 0.0
+        self.reset_tokens_at = 0.0
+        self.blocked_until = 0.0
+
+
+class RequestScheduler:
+    """Paces requests per model using Groq's rate-limit headers.
+
+    The headers of every response update what is left of the request and token
+    quotas, requests wait for the quota to reset once it runs out, and failed
+    calls are retried with jittered exponential backoff. A 429 pauses every
+    caller of that model, not just the one that hit it.
+    Ref Doc: https://console.groq.com/docs/rate-limits
+    """
+
+    def __init__(
+        self,
+        max_retries=4,
+        base_delay=0.5,
+        max_delay=30.0,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.clock = clock
+        self.limits = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, model):
+        if model not in self.limits:
+            self.limits[model] = ModelLimits()
+        return self.limits[model]
+
+    def observe(self, model, headers):
+        now = self.clock()
+
+        def header_int(name):
+            try:
+                return int(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._lock:
+            limits = self._limits(model)
+            for kind in ["requests", "tokens"]:
+                limit = header_int(f"x-ratelimit-limit-{kind}")
+                remaining = header_int(f"x-ratelimit-remaining-{kind}")
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if limit is not None:
+                    setattr(limits, f"limit_{kind}", limit)
+                if remaining is not None:
+                    setattr(limits, f"remaining_{kind}", remaining)
+                if reset is not None:
+                    setattr(limits, f"reset_{kind}_at", now + reset)
+
+            wait = parse_duration(headers.get("retry-after"))
+            if wait is not None:
+                limits.blocked_until = max(limits.blocked_until, now + wait)
+
+    def observe_response(self, response):
+        # httpx response hook, the model is read back from the request body
+        try:
+            model = json.loads(response.request.content).get("model")
+        except (ValueError, AttributeError):
+            return
+        if model:
+            self.observe(model, response.headers)
+
+    def wait_time(self, model, tokens=0):
+        now = self.clock()
+        with self._lock:
+            limits = self._limits(model)
+            wait = limits.blocked_until - now
+            if limits.remaining_requests is not None and limits.remaining_requests < 1:
+                wait = max(wait, limits.reset_requests_at - now)
+            if limits.remaining_tokens is not None and limits.remaining_tokens < tokens:
+                wait = max(wait, limits.reset_tokens_at - now)
+        return max(wait, 0.0)
+
+    def acquire(self, model, tokens=0):
+        wait = self.wait_time(model, tokens)
+        if wait > 0:
+            logger.info(f"Rate limit reached for {model}, waiting {wait:.1f} seconds")
+            self.sleep(wait)
+        self.reserve(model, tokens)
+
+    def reserve(self, model, tokens=0):
+        now = self.clock()
+        with self._lock:
+            limits = self._limits(model)
+            # Quotas refill once their reset time has passed
+            if now >= limits.reset_requests_at:
+                limits.remaining_requests = limits.limit_requests
+            if now >= limits.reset_tokens_at:
+                limits.remaining_tokens = limits.limit_tokens
+            # Reserve the quota now so concurrent callers see it as spent
+            if limits.remaining_requests is not None:
+                limits.remaining_requests -= 1
+            if limits.remaining_tokens is not None:
+                limits.remaining_tokens -= tokens
+
+    def backoff(self, attempt, error=None):
+        # Full jitter, see https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        server_delay = retry_after(error) if error is not None else None
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        return delay
+
+    def retry_delay(self, model, attempt, error):
+        # Seconds to wait before retrying, or None when the error is final
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = self.backoff(attempt, error)
+        if getattr(error, "status_code", None) == 429:
+            with self._lock:
+                limits = self._limits(model)
+                limits.blocked_until = max(limits.blocked_until, self.clock() + delay)
+        logger.warning(
+            f"Request to {model} failed ({error}), retry {attempt + 1} of "
+            f"{self.max_retries} in {delay:.1f} seconds"
+        )
+        return delay
+
+    def call(self, model, request, tokens=0):
+        """Run `request()` for `model`, pacing and retrying it as needed."""
+        attempt = 0
+        while True:
+            self.acquire(model, tokens)
+            try:
+                return request()
+            except Exception as e:
+                delay = self.retry_delay(model, attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.sleep(delay)
+
+    async def call_async(self, model, request, tokens=0):
+        """Await `request()` for `model`, like `call` but without blocking."""
+        import asyncio
+
+        attempt = 0
+        while True:
+            wait = self.wait_time(model, tokens)
+            if wait > 0:
+                logger.info(
+                    f"Rate limit reached for {model}, waiting {wait:.1f} seconds"
+                )
+                await asyncio.sleep(wait)
+            self.reserve(model, tokens)
+            try:
+                return await request()
+            except Exception as e:
+                delay = self.retry_delay(model, attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler():
+    return _scheduler
@@ -0,0 +1,141 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from app.completion import complete
+from app.prompt import build_section_messages, compact_prompt
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Headings recognised in resumes, in the order sections appear in the report
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "objective", "about me"],
+    "experience": [
+        "experience",
+        "work experience",
+        "professional experience",
+        "employment",
+        "employment history",
+        "work history",
+    ],
+    "projects": ["projects", "personal projects", "selected projects"],
+    "skills": [
+        "skills",
+        "technical skills",
+        "core competencies",
+        "technologies",
+        "tools",
+    ],
+    "education": ["education", "academic background", "education and training"],
+    "certifications": ["certifications", "certificates", "licenses", "awards"],
+}
+HEADING_NAMES = {
+    alias: name for name, aliases in SECTION_HEADINGS.items() for alias in aliases
+}
+
+# Headings are short lines, optionally followed by a colon or underlined
+MAX_HEADING_LENGTH = 40
+HEADING_CLEANUP = re.compile(r"[^a-z ]+")
+
+
+def heading_name(line):
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_LENGTH:
+        return None
+    words = HEADING_CLEANUP.sub(" ", line.lower()).split()
+    return HEADING_NAMES.get(" ".join(words))
+
+
+def split_sections(text):
+    """Split a resume into {section: text} using its headings.
+
+    Text before the first heading (usually contact details) is not a section.
+    Repeated headings are merged, and sections are returned in report order.
+    An empty dict means no heading was recognised.
+    """
+    found = {}
+    current = None
+    for line in text.splitlines():
+        name = heading_name(line)
+        if name is not None:
+            current = name
+            found.setdefault(current, [])
+        elif current is not None:
+            found[current].append(line)
+
+    sections = {}
+    for name in SECTION_HEADINGS:
+        body = "\n".join(found.get(name, [])).strip()
+        if body:
+            sections[name] = body
+    return sections
+
+
+def merge_usage(usages):
+    # Token counts add up, the sections ran side by side so times do not
+    usages = [usage for usage in usages if usage is not None]
+    if not usages:
+        return None
+    merged = {
+        field: sum(getattr(usage, field) for usage in usages)
+        for field in ["completion_tokens", "prompt_tokens", "total_tokens"]
+    }
+    for field in ["completion_time", "prompt_time", "queue_time", "total_time"]:
+        merged[field] = max(getattr(usage, field) for usage in usages)
+    return SimpleNamespace(**merged)
+
+
+def format_report(results):
+    parts = []
+    for section, content in results.items():
+        parts.append(f"## {section.title()}\n\n{content.strip()}\n")
+    return "\n".join(parts)
+
+
+def enhance_sections(
+    client,
+    sections,
+    description,
+    model,
+    temperature=0.5,
+    max_token=1024,
+    cache=None,
+    refresh=False,
+    compact=False,
+    workers=None,
+    context_window=None,
+):
+    """Enhance every section with its own request and merge the answers.
+
+    Each section gets the full `max_token` output budget. Returns the merged
+    report and the combined usage (None when every section was cached).
+    """
+
+    def run(section, text):
+        job_description = description
+        if compact:
+            text, job_description = compact_prompt(
+                text, description, model, max_token, context_window
+            )
+        messages = build_section_messages(section, text, job_description)
+        try:
+            return complete(
+                client, messages, model, temperature, max_token, cache, refresh
+            )
+        except Exception as e:
+            logger.error(f"Error in section {section} for {model}: {e}")
+            return f"Failed to enhance this section: {e}", None
+
+    with ThreadPoolExecutor(max_workers=workers or len(sections)) as executor:
+        futures = {
+            section: executor.submit(run, section, text)
+            for section, text in sections.items()
+        }
+        answers = {section: future.result() for section, future in futures.items()}
+
+    report = format_report(
+        {section: content for section, (content, _) in answers.items()}
+    )
+    return report, merge_usage(usage for _, usage in answers.values())
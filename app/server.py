@@ -0,0 +1,297 @@
+import base64
+import binascii
+import json
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.clients import get_groq_client
+from app.completion import complete, stream_completion
+from app.config import TOOL_NAME, VERSION
+from app.prompt import build_messages, compact_prompt
+from app.cache import usage_to_dict
+from app.utils import DocumentTooLarge, read_file, setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Largest request body accepted, uploads are base64 encoded inside the JSON
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+# Threads that parse uploads, kept apart from the completion workers so slow
+# documents never hold up requests that are already streaming
+DEFAULT_PARSE_WORKERS = 4
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def check_upload_size(name, size, read_options=None):
+    # Inline text and .txt uploads are not parsed, but get the same size limit
+    max_bytes = (read_options or {}).get("max_bytes")
+    if max_bytes is not None and size > max_bytes:
+        raise DocumentTooLarge(
+            f"{name} is {size} bytes, documents are limited to {max_bytes}"
+        )
+
+
+def read_upload(document, document_cache=None, read_options=None):
+    """Turn a `resume`/`description` field of a request into text.
+
+    The field is either plain text or {"filename": ..., "content": base64}.
+    Every kind of field gets the size and character limits of `read_options`.
+    """
+    max_chars = (read_options or {}).get("max_chars")
+    if isinstance(document, str):
+        check_upload_size(
+            "Inline document", len(document.encode("utf-8")), read_options
+        )
+        return document[:max_chars]
+    if not isinstance(document, dict) or "content" not in document:
+        raise BadRequest("Documents must be text or {filename, content} objects")
+
+    filename = document.get("filename", "upload.txt")
+    try:
+        data = base64.b64decode(document["content"], validate=True)
+    except (binascii.Error, TypeError):
+        raise BadRequest(f"Content of {filename} is not valid base64")
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".txt":
+        check_upload_size(filename, len(data), read_options)
+        try:
+            return data.decode("utf-8")[:max_chars]
+        except UnicodeDecodeError:
+            raise BadRequest(f"{filename} is not valid UTF-8 text")
+    if extension not in [".pdf", ".doc", ".docx"]:
+        raise BadRequest(f"Unsupported file type: {extension}")
+
+    if document_cache is not None:
+        return document_cache.read_upload(data, filename, read_options)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "upload" + extension)
+        with open(path, "wb") as f:
+            f.write(data)
+        return read_file(path, **(read_options or {}))
+
+
+class EnhancerServer(ThreadingHTTPServer):
+    """HTTP front end that keeps clients, caches and workers warm between calls.
+
+    Completions run on `workers` threads, one per model of every request in
+    flight, and uploads are parsed on their own `parse_workers` threads.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        api_key,
+        models=None,
+        temperature=0.5,
+        max_token=1024,
+        cache=None,
+        document_cache=None,
+        read_options=None,
+        workers=8,
+        parse_workers=DEFAULT_PARSE_WORKERS,
+    ):
+        super().__init__(address, EnhancerRequestHandler)
+        self.api_key = api_key
+        self.models = models or ["llama3-8b-8192"]
+        self.temperature = temperature
+        self.max_token = max_token
+        self.cache = cache
+        self.document_cache = document_cache
+        self.read_options = read_options
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.parse_executor = ThreadPoolExecutor(max_workers=parse_workers)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.parse_executor.shutdown(wait=False, cancel_futures=True)
+
+    def prepare(self, payload):
+        # Parse both documents on the parse pool and build one job per model
+        if not isinstance(payload, dict):
+            raise BadRequest("Request body must be a JSON object")
+        for field in ["resume", "description"]:
+            if not payload.get(field):
+                raise BadRequest(f"Missing field: {field}")
+
+        futures = [
+            self.parse_executor.submit(
+                read_upload, payload[field], self.document_cache, self.read_options
+            )
+            for field in ["resume", "description"]
+        ]
+        resume, description = [future.result() for future in futures]
+
+        models = payload.get("models") or self.models
+        if isinstance(models, str):
+            models = [models]
+        options = {
+            "temperature": payload.get("temperature", self.temperature),
+            "max_token": payload.get("max_tokens", self.max_token),
+        }
+
+        jobs = []
+        for model in models:
+            model_resume, model_description = resume, description
+            if payload.get("compact"):
+                model_resume, model_description = compact_prompt(
+                    resume, description, model, options["max_token"]
+                )
+            jobs.append((model, build_messages(model_resume, model_description)))
+        return jobs, options
+
+    def enhance(self, jobs, options):
+        client = get_groq_client(self.api_key)
+
+        def run(model, messages):
+            try:
+                content, usage = complete(
+                    client,
+                    messages,
+                    model,
+                    cache=self.cache,
+                    **options,
+                )
+                return {
+                    "model": model,
+                    "content": content,
+                    "usage": usage_to_dict(usage),
+                    "error": None,
+                }
+            except Exception as e:
+                logger.error(f"Error in enhance for {model}: {e}")
+                return {"model": model, "content": None, "usage": None, "error": str(e)}
+
+        futures = [
+            self.executor.submit(run, model, messages) for model, messages in jobs
+        ]
+        return [future.result() for future in futures]
+
+    def enhance_stream(self, jobs, options):
+        # Every model streams into one queue so the handler can forward
+        # chunks in the order they arrive, whichever model they come from.
+        # Closing this generator, when the client goes away, stops them all.
+        client = get_groq_client(self.api_key)
+        events = queue.Queue()
+        stop = threading.Event()
+
+        def run(model, messages):
+            pieces = stream_completion(
+                client, messages, model, cache=self.cache, **options
+            )
+            try:
+                for piece in pieces:
+                    if stop.is_set():
+                        return
+                    events.put({"model": model, "content": piece})
+                events.put({"model": model, "done": True})
+            except Exception as e:
+                logger.error(f"Error in enhance for {model}: {e}")
+                events.put({"model": model, "done": True, "error": str(e)})
+            finally:
+                # Closing the stream stops the upstream request
+                pieces.close()
+
+        for model, messages in jobs:
+            self.executor.submit(run, model, messages)
+
+        remaining = len(jobs)
+        try:
+            while remaining:
+                event = events.get()
+                if event.get("done"):
+                    remaining -= 1
+                yield event
+        finally:
+            stop.set()
+
+
+class EnhancerRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = f"ResumeEnhancer/{VERSION}"
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data):
+        # Ref Doc: https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Transfer-Encoding
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "version": f"{TOOL_NAME} {VERSION}"})
+        else:
+            self.send_json(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/enhance":
+            self.send_json(404, {"error": f"Not found: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_BODY_BYTES:
+                self.send_json(413, {"error": "Request body too large"})
+                return
+            payload = json.loads(self.rfile.read(length) or b"null")
+            jobs, options = self.server.prepare(payload)
+        except DocumentTooLarge as e:
+            self.send_json(413, {"error": str(e)})
+            return
+        except (BadRequest, ValueError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.error(f"Failed to prepare request: {e}")
+            self.send_json(500, {"error": str(e)})
+            return
+
+        if not payload.get("stream"):
+            self.send_json(200, {"results": self.server.enhance(jobs, options)})
+            return
+
+        # Stream newline-delimited JSON events with chunked transfer encoding
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = self.server.enhance_stream(jobs, options)
+        try:
+            for event in events:
+                self.send_chunk(json.dumps(event).encode("utf-8") + b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info(f"{self.address_string()} disconnected, stopping its models")
+        finally:
+            events.close()
+
+
+def run_server(host="127.0.0.1", port=8000, **options):
+    server = EnhancerServer((host, port), **options)
+    print(f"{TOOL_NAME} listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,422 @@
+import inspect
+import threading
+import weakref
+
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+
+class FlightCancelled(Exception):
+    """Raised to a subscriber of a flight whose upstream stream was stopped."""
+
+
+# Chunks kept from the start of a flight, so a caller arriving late can still
+# join it and replay everything. Past this, chunks every subscriber has read
+# are dropped and later callers start their own request.
+FLIGHT_REPLAY_CHUNKS = 256
+
+# Most chunks a flight holds for its slowest subscriber. The upstream stream
+# is not read further until that subscriber catches up, so the subscribers
+# of one flight have to be read from different threads or tasks.
+FLIGHT_BUFFER_CHUNKS = 1024
+
+
+class FlightBuffer:
+    """The chunks of a flight that some subscriber has not read yet.
+
+    Every subscriber has a position, the index of its next chunk counted
+    from the start of the stream. Callers that joined but are not
+    subscribed yet are pending, at index 0. Methods are called with the
+    flight's lock held.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.trimmed = 0
+        self.positions = {}
+        self.pending = 0
+        self.replay_chunks = FLIGHT_REPLAY_CHUNKS
+        self.buffer_chunks = FLIGHT_BUFFER_CHUNKS
+
+    def joinable(self):
+        # Only a flight that still has its first chunk can be replayed
+        return self.trimmed == 0
+
+    def full(self):
+        # Counted from the slowest subscriber, pending ones are at index 0
+        end = self.trimmed + len(self.chunks)
+        low = 0 if self.pending else min(self.positions.values(), default=end)
+        return end - low >= self.buffer_chunks
+
+    def attach(self, token):
+        self.pending -= 1
+        self.positions[token] = 0
+
+    def detach(self, token):
+        if token is None:
+            self.pending -= 1
+        else:
+            self.positions.pop(token, None)
+        self.trim()
+
+    def has_unread(self, token):
+        return self.positions[token] < self.trimmed + len(self.chunks)
+
+    def advance(self, token, read):
+        # `token` went through `read` more chunks, which may free some
+        self.positions[token] += read
+        self.trim()
+
+    def unread(self, token):
+        # Still counted as unread until they are passed to advance()
+        return self.chunks[self.positions[token] - self.trimmed :]
+
+    def trim(self):
+        if self.pending or (
+            self.trimmed == 0 and len(self.chunks) <= self.replay_chunks
+        ):
+            return
+        end = self.trimmed + len(self.chunks)
+        low = min(self.positions.values(), default=end)
+        del self.chunks[: low - self.trimmed]
+        self.trimmed = low
+
+
+class Flight(FlightBuffer):
+    """One upstream stream whose chunks are replayed to every subscriber.
+
+    The stream is drained by its own thread, so a subscriber that stops early
+    never stalls the others, and one that joins late still gets every chunk
+    while the flight is within FLIGHT_REPLAY_CHUNKS. Memory stays flat: past
+    that, chunks every subscriber has read are dropped, and the upstream
+    stream waits once FLIGHT_BUFFER_CHUNKS are unread by the slowest one.
+    Subscribers are counted when they join, and once every one of them has
+    left the upstream stream is stopped and the flight ends with
+    FlightCancelled, so nobody mistakes the partial text for a full answer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+    def add_subscriber(self):
+        # False once the flight is cancelled or trimmed, the caller has to
+        # start a new one
+        with self.condition:
+            if self.cancelled or not self.joinable():
+                return False
+            self.subscribers += 1
+            self.pending += 1
+            return True
+
+    def run(self, start):
+        error = None
+        stream = None
+        try:
+            stream = start()
+            for chunk in stream:
+                with self.condition:
+                    while self.full() and not self.cancelled:
+                        self.condition.wait()
+                    if self.cancelled:
+                        error = FlightCancelled("Every subscriber left the stream")
+                        break
+                    self.chunks.append(chunk)
+                    self.condition.notify_all()
+        except Exception as e:
+            error = e
+        finally:
+            # Closing the response stops the generation, and its token usage
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+            with self.condition:
+                self.done = True
+                self.error = error
+                self.condition.notify_all()
+
+    def remove_subscriber(self, token=None):
+        # `token` is None for a caller that left before subscribing
+        with self.condition:
+            self.detach(token)
+            self.subscribers -= 1
+            # Nobody is left to read the rest, so stop the upstream stream
+            if self.subscribers == 0 and not self.done:
+                self.cancelled = True
+            self.condition.notify_all()
+
+    def chunks_for(self, token):
+        chunks = []
+        while True:
+            with self.condition:
+                self.advance(token, len(chunks))
+                # The upstream reader may be waiting for room
+                self.condition.notify_all()
+                while not self.has_unread(token) and not self.done:
+                    self.condition.wait()
+                chunks = self.unread(token)
+                done = self.done
+            yield from chunks
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def subscribe(self):
+        # The subscriber was counted by add_subscriber when it joined
+        subscription = Subscription(self)
+        with self.condition:
+            self.attach(subscription.token)
+        return subscription
+
+
+class Subscription:
+    """Iterator over the chunks of a flight for one subscriber.
+
+    Unlike a plain generator it leaves the flight when it is closed before
+    its first read, or dropped without being closed.
+    """
+
+    def __init__(self, flight):
+        self.flight = flight
+        self.left = False
+        # The flight only knows the token, so a dropped subscription is freed
+        self.token = object()
+        self._chunks = flight.chunks_for(self.token)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if not self.left:
+            self.left = True
+            self._chunks.close()
+            self.flight.remove_subscriber(self.token)
+
+    def __del__(self):
+        self.close()
+
+
+class SingleFlight:
+    """Coalesces identical requests that are in flight at the same time.
+
+    The first caller for a key starts the upstream request, callers arriving
+    while it streams share it instead of starting their own. Keys are dropped
+    once their stream ends, finished responses are the response cache's job.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.joined = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key, flight_class=Flight):
+        # Returns the flight for `key` and whether this caller has to start it.
+        # The caller is counted as a subscriber from here, not from its first
+        # read, so a flight is never cancelled under a caller still to come.
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.add_subscriber():
+                self.joined += 1
+                logger.info("Joining an identical request that is already in flight")
+                return flight, False
+            flight = self._flights[key] = flight_class()
+            flight.add_subscriber()
+            self.started += 1
+            return flight, True
+
+    def land(self, key, flight):
+        with self._lock:
+            # A cancelled flight may already have been replaced by a new one
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stream(self, key, start):
+        """Return an iterator over the chunks of `start()` shared by `key`."""
+        flight, leader = self.join(key)
+        if leader:
+
+            def run():
+                try:
+                    flight.run(start)
+                finally:
+                    self.land(key, flight)
+
+            threading.Thread(target=run, daemon=True).start()
+        return flight.subscribe()
+
+
+class AsyncFlight(FlightBuffer):
+    """Flight for an async stream, drained by its own task.
+
+    Subscribers are counted, cancel the upstream stream and bound its buffer
+    like in Flight. Everything runs on one event loop, so the count needs no
+    lock, and `room` wakes the draining task when it waits for a reader.
+    """
+
+    def __init__(self):
+        import asyncio
+
+        super().__init__()
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.cancelled = False
+        self.condition = asyncio.Condition()
+        self.room = asyncio.Event()
+
+    def add_subscriber(self):
+        if self.cancelled or not self.joinable():
+            return False
+        self.subscribers += 1
+        self.pending += 1
+        return True
+
+    async def run(self, start):
+        error = None
+        stream = None
+        try:
+            stream = await start()
+            async for chunk in stream:
+                while self.full() and not self.cancelled:
+                    self.room.clear()
+                    await self.room.wait()
+                if self.cancelled:
+                    error = FlightCancelled("Every subscriber left the stream")
+                    break
+                async with self.condition:
+                    self.chunks.append(chunk)
+                    self.condition.notify_all()
+        except Exception as e:
+            error = e
+        finally:
+            # AsyncGroq streams close with an awaitable close()
+            close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+            if callable(close):
+                closing = close()
+                if inspect.isawaitable(closing):
+                    await closing
+            async with self.condition:
+                self.done = True
+                self.error = error
+                self.condition.notify_all()
+
+    def remove_subscriber(self, token=None):
+        self.detach(token)
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done:
+            self.cancelled = True
+        self.room.set()
+
+    async def chunks_for(self, token):
+        chunks = []
+        while True:
+            self.advance(token, len(chunks))
+            self.room.set()
+            async with self.condition:
+                while not self.has_unread(token) and not self.done:
+                    await self.condition.wait()
+                chunks = self.unread(token)
+                done = self.done
+            for chunk in chunks:
+                yield chunk
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def subscribe(self):
+        subscription = AsyncSubscription(self)
+        self.attach(subscription.token)
+        return subscription
+
+
+class AsyncSubscription:
+    """Subscription to an AsyncFlight, also left when its task is cancelled."""
+
+    def __init__(self, flight):
+        self.flight = flight
+        self.left = False
+        self.token = object()
+        self._chunks = flight.chunks_for(self.token)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            self.leave()
+            raise
+
+    def leave(self):
+        if not self.left:
+            self.left = True
+            self.flight.remove_subscriber(self.token)
+
+    async def aclose(self):
+        self.leave()
+        await self._chunks.aclose()
+
+    def __del__(self):
+        self.leave()
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for one event loop, `start` returns an awaitable stream."""
+
+    def __init__(self):
+        super().__init__()
+        self._tasks = set()
+
+    def stream(self, key, start):
+        import asyncio
+
+        flight, leader = self.join(key, AsyncFlight)
+        if leader:
+
+            async def run():
+                try:
+                    await flight.run(start)
+                finally:
+                    self.land(key, flight)
+
+            # Keep a reference, the loop only holds weak ones to its tasks
+            task = asyncio.get_running_loop().create_task(run())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return flight.subscribe()
+
+
+_single_flight = SingleFlight()
+_async_single_flights = weakref.WeakKeyDictionary()
+
+
+def get_single_flight():
+    return _single_flight
+
+
+def get_async_single_flight():
+    # Tasks cannot be shared between event loops, so each loop has its own
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    flights = _async_single_flights.get(loop)
+    if flights is None:
+        flights = _async_single_flights[loop] = AsyncSingleFlight()
+    return flights
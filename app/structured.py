@@ -0,0 +1,198 @@
+import json
+
+from app.prompt import SYSTEM_PROMPT, build_messages
+from app.utils import setup_logging
+
+# Setup logger
+logger = setup_logging()
+
+# Fields are listed in the order the model is asked to write them, the short
+# score first so it is usable as soon as the stream starts
+# Ref Doc: https://json-schema.org/understanding-json-schema/reference/object
+RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "match_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "missing_keywords": {"type": "array", "items": {"type": "string"}},
+        "suggested_edits": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "section": {"type": "string"},
+                    "current": {"type": "string"},
+                    "suggestion": {"type": "string"},
+                },
+                "required": ["section", "suggestion"],
+            },
+        },
+        "summary": {"type": "string"},
+    },
+    "required": ["match_score", "missing_keywords", "suggested_edits", "summary"],
+}
+
+JSON_PROMPT = (
+    SYSTEM_PROMPT
+    + " Answer with a single JSON object and nothing else, following this JSON"
+    " schema with the fields in this order: "
+    + json.dumps(RESULT_SCHEMA, separators=(",", ":"))
+    + " match_score rates from 0 to 100 how well the resume matches the job."
+)
+
+
+def build_json_messages(resume, description):
+    return build_messages(resume, description, system=JSON_PROMPT)
+
+
+def normalize_result(data):
+    """Return the result fields of `data` with defaults for anything missing."""
+    result = {
+        "match_score": None,
+        "missing_keywords": [],
+        "suggested_edits": [],
+        "summary": "",
+    }
+    if isinstance(data, dict):
+        result.update((key, data[key]) for key in result if key in data)
+    try:
+        result["match_score"] = min(100, max(0, round(float(result["match_score"]))))
+    except (TypeError, ValueError):
+        result["match_score"] = None
+    return result
+
+
+class JsonStreamParser:
+    """Parses a JSON object incrementally as the chunks of a stream arrive.
+
+    `feed` returns an event for every top-level field as soon as its value is
+    complete, {"field": name, "value": value}, and one for every element of a
+    top-level array as soon as that element is complete, {"field": name,
+    "item": item}. Anything before the opening brace, such as a code fence,
+    is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.start = None
+        self.end = None
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.item_start = None
+        self.fields = {}
+
+    def feed(self, text):
+        self.buffer += text
+        events = []
+        while self.position < len(self.buffer) and self.end is None:
+            index = self.position
+            char = self.buffer[index]
+            self.position += 1
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.key_start is not None:
+                        self.key = json.loads(self.buffer[self.key_start : index + 1])
+                        self.key_start = None
+                continue
+
+            depth = len(self.stack)
+            if depth == 0:
+                if char == "{":
+                    self.start = index
+                    self.stack.append(char)
+                continue
+            if char.isspace():
+                continue
+
+            in_array = depth == 2 and self.stack[1] == "["
+            if depth == 1 and self.key is not None and self.value_start is None:
+                if char not in ":,}":
+                    self.value_start = index
+            elif in_array and self.item_start is None and char not in ",]":
+                self.item_start = index
+
+            if char == '"':
+                self.in_string = True
+                if depth == 1 and self.key is None:
+                    self.key_start = index
+            elif char in "{[":
+                self.stack.append(char)
+            elif char == ",":
+                if depth == 1:
+                    self._field(events, index)
+                elif in_array:
+                    self._item(events, index)
+            elif char in "}]":
+                if in_array:
+                    self._item(events, index)
+                self.stack.pop()
+                if depth == 1:
+                    self._field(events, index)
+                    self.end = index + 1
+                elif depth == 2:
+                    # A top-level array or object value just closed
+                    self._field(events, index + 1)
+        return events
+
+    def _decode(self, start, stop):
+        try:
+            return True, json.loads(self.buffer[start:stop])
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed JSON: {self.buffer[start:stop]!r}")
+            return False, None
+
+    def _field(self, events, stop):
+        if self.key is not None and self.value_start is not None:
+            ok, value = self._decode(self.value_start, stop)
+            if ok:
+                self.fields[self.key] = value
+                events.append({"field": self.key, "value": value})
+        self.key = None
+        self.value_start = None
+
+    def _item(self, events, stop):
+        if self.item_start is not None:
+            ok, item = self._decode(self.item_start, stop)
+            if ok:
+                events.append({"field": self.key, "item": item})
+        self.item_start = None
+
+    def close(self):
+        """Return the whole object, or the fields parsed so far if it is broken."""
+        if self.end is not None:
+            try:
+                return json.loads(self.buffer[self.start : self.end])
+            except json.JSONDecodeError:
+                pass
+        if self.start is None:
+            raise ValueError("The response does not contain a JSON object")
+        logger.warning("The JSON response is incomplete, keeping the fields parsed")
+        return dict(self.fields)
+
+
+def parse_result(text):
+    parser = JsonStreamParser()
+    parser.feed(text)
+    return normalize_result(parser.close())
+
+
+def format_event(event):
+    # One line per completed field or array element, for streaming output.
+    # Arrays are shown element by element, so their final value is skipped.
+    if "item" not in event and isinstance(event["value"], list):
+        return None
+    value = event["item"] if "item" in event else event["value"]
+    if not isinstance(value, str):
+        value = json.dumps(value)
+    prefix = "- " if "item" in event else ""
+    return f"{prefix}{event['field']}: {value}"
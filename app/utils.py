@@ -1,75 +1,384 @@
+import functools
+import json
 import logging
 import os
+import sys
+import threading
+import time
 
 import tomllib
-from colorama import Fore, Style
-from docx import Document  # type: ignore
-from pypdf import PdfReader  # type: ignore
 from app.config import TOOL_NAME
+from app.metrics import get_metrics
+
+# The document parsers are slow to import, so they are only loaded the first
+# time a file of their type is read. See load_pdf_reader and load_document.
+PdfReader = None
+Document = None
 
 
 # Custom formatter for colorized logging
 class ColoredFormatter(logging.Formatter):
     COLORS = {
-        "INFO": Fore.GREEN,
-        "WARNING": Fore.YELLOW,
-        "ERROR": Fore.RED,
+        "INFO": "GREEN",
+        "WARNING": "YELLOW",
+        "ERROR": "RED",
     }
 
     def format(self, record):
-        color = self.COLORS.get(record.levelname, Fore.WHITE)
+        # Imported here so that paths which never log do not pay for it
+        from colorama import Fore, Style
+
+        color = getattr(Fore, self.COLORS.get(record.levelname, "WHITE"))
         message = super().format(record)
         return f"{color}{message}{Style.RESET_ALL}"
 
 
-def write_to_file(file_path, content):
+# Streamed output is flushed to disk at least this often
+OUTPUT_FLUSH_INTERVAL = 1.0
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+
+def output_file_path(file_path):
     extension = os.path.splitext(file_path)[1].lower()
 
-    if extension == ".txt":
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+    if extension in [".txt", ".json", ".jsonl"]:
+        return file_path
     elif extension == "":
-        with open(file_path + ".txt", "w", encoding="utf-8") as f:
-            f.write(content)
+        return file_path + ".txt"
     else:
         raise ValueError(
-            f"Unsupported outfile type: {extension}, only .txt files are supported"
+            f"Unsupported outfile type: {extension}, "
+            "only .txt, .json and .jsonl files are supported"
+        )
+
+
+class OutputWriter:
+    """Writes text to an output file as it arrives.
+
+    Text goes to `<file>.part` through a buffered file that is flushed every
+    `flush_interval` seconds, and the part file is renamed over the output
+    once it is closed, so the output is never left half written. If writing
+    is aborted the part file is kept with everything received so far, or
+    removed when nothing was received, like a request that failed to start.
+
+    Only the time spent in file calls is recorded as the write_to_file span,
+    not the time spent waiting for the text to arrive.
+    """
+
+    def __init__(self, file_path, flush_interval=OUTPUT_FLUSH_INTERVAL):
+        started = time.perf_counter()
+        self.path = output_file_path(file_path)
+        self.part_path = self.path + ".part"
+        self.flush_interval = flush_interval
+        self.file = open(
+            self.part_path, "w", encoding="utf-8", buffering=OUTPUT_BUFFER_SIZE
+        )
+        self.last_flush = time.monotonic()
+        self.written = 0
+        self.io_seconds = time.perf_counter() - started
+
+    def write(self, text):
+        started = time.perf_counter()
+        self.file.write(text)
+        self.written += len(text)
+        now = time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.file.flush()
+            self.last_flush = now
+        self.io_seconds += time.perf_counter() - started
+
+    def close(self):
+        started = time.perf_counter()
+        self.file.close()
+        # Ref Doc: https://docs.python.org/3/library/os.html#os.replace
+        os.replace(self.part_path, self.path)
+        self.record(time.perf_counter() - started)
+
+    def abort(self):
+        started = time.perf_counter()
+        self.file.close()
+        if not self.written:
+            os.remove(self.part_path)
+        self.record(time.perf_counter() - started)
+        if self.written:
+            logger.warning(f"Output incomplete, partial text kept in {self.part_path}")
+
+    def record(self, seconds):
+        self.io_seconds += seconds
+        get_metrics().record("write_to_file", self.io_seconds, path=self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonlWriter:
+    """Appends one JSON record per line to a file shared by many writers.
+
+    Each record is written with a single call on a file opened in append
+    mode and flushed at once, so lines from concurrent threads or processes
+    never interleave and a crash loses at most the record being written.
+    """
+
+    def __init__(self, file_path):
+        self.path = file_path
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(file_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_to_file(file_path, content):
+    # The writer records the write_to_file span
+    with OutputWriter(file_path) as writer:
+        writer.write(content)
+
+
+# Documents are streamed in pieces of this size instead of read in one go
+READ_CHUNK_SIZE = 64 * 1024
+
+# Default limit for the size of one document on disk
+DEFAULT_MAX_DOCUMENT_MB = 20
+
+# The parts of a .docx archive may expand to at most this many times the size
+# of the archive, anything more is most likely a zip bomb
+MAX_DOCX_EXPANSION = 20
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+def check_document_size(file_path, max_bytes):
+    if max_bytes is None:
+        return
+    size = os.path.getsize(file_path)
+    if size > max_bytes:
+        raise DocumentTooLarge(
+            f"{file_path} is {size} bytes, documents are limited to {max_bytes}"
         )
 
 
-def read_txt_file(file_path):
+def limit_chars(pieces, max_chars=None):
+    # Pass the pieces of text through until `max_chars` have been yielded
+    remaining = max_chars
+    for piece in pieces:
+        if remaining is not None:
+            piece = piece[:remaining]
+            remaining -= len(piece)
+        yield piece
+        if remaining == 0:
+            return
+
+
+def peak_rss():
+    # Peak resident set size of this process in bytes, None where unknown
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def iter_txt_chunks(file_path, max_chars=None):
     with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    return content
+        chunks = iter(functools.partial(f.read, READ_CHUNK_SIZE), "")
+        yield from limit_chars(chunks, max_chars)
 
 
-def read_pdf_file(file_path):
-    content = ""
+def read_txt_file(file_path, max_chars=None):
+    return "".join(iter_txt_chunks(file_path, max_chars=max_chars))
+
+
+def load_pdf_reader():
+    global PdfReader
+    if PdfReader is None:
+        from pypdf import PdfReader  # type: ignore
+    return PdfReader
+
+
+def load_document():
+    global Document
+    if Document is None:
+        from docx import Document  # type: ignore
+    return Document
+
+
+# Smaller PDFs are not worth the cost of starting worker processes
+PARALLEL_PDF_MIN_PAGES = 8
+
+# Page ranges per worker process, smaller ranges let a character limit skip
+# more of the document
+PDF_RANGES_PER_WORKER = 4
+
+
+def page_text(page):
+    # Every page ends with a line break, so the footer of one page never runs
+    # into the header of the next and both stay lines of their own
+    text = page.extract_text() or ""
+    return text if text.endswith("\n") else text + "\n"
+
+
+def iter_pdf_pages(file_path, max_pages=None, max_chars=None):
+    # Yield the text of each page in order, stopping at the page/char limits
     with open(file_path, "rb") as f:
-        reader = PdfReader(f)
-        for page in range(len(reader.pages)):
-            content += reader.pages[page].extract_text()
-    return content
+        reader = load_pdf_reader()(f)
+
+        def pages():
+            for index, page in enumerate(reader.pages):
+                if max_pages is not None and index >= max_pages:
+                    return
+                yield page_text(page)
+
+        yield from limit_chars(pages(), max_chars)
+
+
+def extract_pdf_pages(file_path, start, stop, max_chars=None):
+    # Runs in a worker process, so it opens its own reader. No range can
+    # contribute more than `max_chars`, so extraction stops there.
+    with open(file_path, "rb") as f:
+        reader = load_pdf_reader()(f)
+        pages = (page_text(reader.pages[index]) for index in range(start, stop))
+        return list(limit_chars(pages, max_chars))
+
+
+def read_pdf_file(file_path, max_pages=None, max_chars=None, workers=1):
+    if workers > 1:
+        with open(file_path, "rb") as f:
+            page_count = len(load_pdf_reader()(f).pages)
+        if max_pages is not None:
+            page_count = min(page_count, max_pages)
 
+        if page_count >= PARALLEL_PDF_MIN_PAGES:
+            # Split the pages into contiguous ranges, a few per worker
+            # Ref Doc: https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+            from concurrent.futures import ProcessPoolExecutor
 
-def read_word_file(file_path):
-    doc = Document(file_path)
-    content = "\n".join([para.text for para in doc.paragraphs])
-    return content
+            step = -(-page_count // (workers * PDF_RANGES_PER_WORKER))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        extract_pdf_pages,
+                        file_path,
+                        start,
+                        min(start + step, page_count),
+                        max_chars,
+                    )
+                    for start in range(0, page_count, step)
+                ]
 
+                def pages():
+                    for future in futures:
+                        yield from future.result()
 
-def read_file(file_path):
+                try:
+                    return "".join(limit_chars(pages(), max_chars))
+                finally:
+                    # Ranges past the character limit are never extracted
+                    executor.shutdown(cancel_futures=True)
+
+    return "".join(iter_pdf_pages(file_path, max_pages=max_pages, max_chars=max_chars))
+
+
+def check_docx_archive(file_path, max_bytes):
+    # The size of the archive on disk says little about its parsed size
+    import zipfile
+
+    if max_bytes is None or not zipfile.is_zipfile(file_path):
+        return
+    with zipfile.ZipFile(file_path) as archive:
+        expanded = sum(info.file_size for info in archive.infolist())
+    if expanded > max_bytes * MAX_DOCX_EXPANSION:
+        raise DocumentTooLarge(f"{file_path} expands to {expanded} bytes")
+
+
+def iter_word_paragraphs(file_path, max_chars=None, max_bytes=None):
+    check_docx_archive(file_path, max_bytes)
+    doc = load_document()(file_path)
+
+    def paragraphs():
+        for index, para in enumerate(doc.paragraphs):
+            yield para.text if index == 0 else "\n" + para.text
+
+    yield from limit_chars(paragraphs(), max_chars)
+
+
+def read_word_file(file_path, max_chars=None, max_bytes=None):
+    return "".join(iter_word_paragraphs(file_path, max_chars, max_bytes))
+
+
+def read_file(
+    file_path, cache=None, max_pages=None, max_chars=None, max_bytes=None, workers=1
+):
+    """Return the text of a .txt, .pdf, .doc or .docx file.
+
+    Files larger than `max_bytes` are rejected with DocumentTooLarge before
+    they are opened, and every format is extracted piece by piece, stopping
+    after `max_chars` characters (and `max_pages` pages for PDFs).
+    """
     extension = os.path.splitext(file_path)[1].lower()
+    with get_metrics().span("read_file", path=file_path, extension=extension) as span:
+        peak_before = peak_rss()
+        try:
+            return _read_file(
+                file_path, extension, cache, max_pages, max_chars, max_bytes, workers
+            )
+        finally:
+            span["peak_rss"] = peak_rss()
+            if peak_before is not None:
+                # How much this document raised the process high-water mark
+                span["peak_rss_growth"] = span["peak_rss"] - peak_before
+                get_metrics().set_gauge("peak_rss_bytes", span["peak_rss"])
+
+
+def _read_file(file_path, extension, cache, max_pages, max_chars, max_bytes, workers):
+    limits = {"max_chars": max_chars}
 
     if extension == ".txt":
-        return read_txt_file(file_path)
+        reader = read_txt_file
     elif extension == ".pdf":
-        return read_pdf_file(file_path)
+        limits["max_pages"] = max_pages
+        reader = functools.partial(read_pdf_file, workers=workers)
     elif extension in [".doc", ".docx"]:
-        return read_word_file(file_path)
+        reader = read_word_file
+        if max_bytes is not None:
+            reader = functools.partial(reader, max_bytes=max_bytes)
     else:
         raise ValueError(f"Unsupported file type: {extension}")
 
+    # Only the limits that change the extracted text become part of the cache key
+    options = {key: value for key, value in limits.items() if value is not None}
+    if options:
+        reader = functools.partial(reader, **options)
+
+    check_document_size(file_path, max_bytes)
+    if cache is not None and extension != ".txt":
+        # Plain text is cheaper to read than to look up in the cache
+        return cache.read(file_path, reader, options or None)
+    return reader(file_path)
+
 
 # set up logger
 def setup_logging():
@@ -137,10 +446,39 @@ def get_help():
         --description         Input job description (pdf, txt, docx, doc) (Required)
         --api_key, -a         Input Groq API key (Required)
         -m, --model           Specify model to use
+        --backend             groq (default), keywords (offline) or llama (local GGUF)
         -o, --output          Output to specified file (txt or json)
+        --json                Ask for a JSON result (score, missing keywords, edits)
         -t, --temperature     Set completion randomness (default 0.5)
         -mt, --maxTokens      Maximum number of tokens (default 1024)
         --token-usage         Print token usage information
+        -s, --stream          Stream the response to the terminal
+        -c, --concurrency     Query up to N models at the same time (default 1)
+        --race                Start all models at once, keep the first acceptable answer
+        --hedge               Back up the first model with the second when it is slow
+        --race-min-chars      Shortest answer --race and --hedge accept (default 200)
+        --batch-resumes       Resume files, directories or globs for batch mode
+        --batch-descriptions  Description files, directories or globs for batch mode
+        --manifest            CSV of resume,description pairs for batch mode
+        --output-dir          Directory for batch results (default results)
+        -w, --workers         Number of batch worker threads (default 4)
+        --queue               Resumable work queue file for batch mode, shared by workers
+        --top                 Only send each resume with its N best matching descriptions
+        --rank                Rank documents locally by keyword match, no API calls
+        --build-index         Build or update the on-disk description index
+        --index               Directory of the description index
+        --no-cache            Do not read or write cached responses and documents
+        --refresh             Ignore cached responses and store fresh ones
+        --warm-cache          Extract and cache documents ahead of time
+        --max-pages           Maximum number of PDF pages to extract
+        --max-chars           Maximum number of characters to extract per document
+        --max-size-mb         Reject documents larger than this (default 20)
+        --pdf-workers         Processes used to extract large PDFs (default 1)
+        --compact             Clean up and trim documents to fit the model context
+        --sections            Enhance each resume section separately and merge the results
+        --serve               Run as an HTTP service (see --host and --port)
+        --metrics             Write stage timings to a file (.prom for Prometheus)
+        --profile             Profile the run (.html uses pyinstrument)
 
         Examples:
         1. Basic Usage:
@@ -149,6 +487,9 @@ def get_help():
         2. Specify Model and Output:
            py app/resume_enhancer.py --resume resume.pdf --description description.pdf --api_key YOUR_API_KEY --model llama3-8b-8192 --output output.txt
 
+        3. Batch Mode (every resume against every description):
+           py app/resume_enhancer.py --batch-resumes resumes/ --batch-descriptions "jobs/*.txt" --api_key YOUR_API_KEY --output-dir results
+
         Note: Get your Groq API key from https://groq.com/developers
         """
 
@@ -0,0 +1,243 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from app.cache import usage_to_dict
+
+# A job whose worker has not finished it within this many seconds is handed
+# to another worker, the first one most likely died
+LEASE_SECONDS = 600
+
+# Failed jobs are retried this many times before they are given up on
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    resume TEXT NOT NULL,
+    description TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    output TEXT,
+    output_name TEXT,
+    usage TEXT,
+    error TEXT,
+    updated_at REAL,
+    UNIQUE (resume, description, model)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+"""
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def process_alive(pid):
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows, assume it is alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkQueue:
+    """Durable queue of (resume, description, model) jobs in an SQLite file.
+
+    Every job moves from pending to running to done or failed, together with
+    its output path, usage and error. A batch that is interrupted picks up
+    the jobs that are not done yet when it runs again, and any number of
+    threads and processes, on any machine that can lock the file, can claim
+    jobs from the same queue. Claims are leases, a job held by a worker that
+    died goes back to the others once `lease` seconds have passed. Jobs held
+    by a dead process on this host are put back as soon as the queue is
+    opened, and `release` (or `close`) puts back the jobs of a run that was
+    interrupted.
+    """
+
+    def __init__(self, path, lease=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        # Ids of the jobs claimed through this queue and not finished yet
+        self._claimed = set()
+        self._claimed_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connection().db
+        db.executescript(SCHEMA)
+        # Queues created before output names were stored
+        columns = [row["name"] for row in db.execute("PRAGMA table_info(jobs)")]
+        if "output_name" not in columns:
+            db.execute("ALTER TABLE jobs ADD COLUMN output_name TEXT")
+        self.reclaim()
+
+    def _connection(self):
+        # SQLite connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Ref Doc: https://www.sqlite.org/wal.html
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return _Transaction(db)
+
+    def add(self, jobs, refresh=False):
+        """Queue (resume, description, model[, output_name]) jobs.
+
+        Returns how many are new. `output_name` is the file name the adding
+        run chose for the result, so whichever process runs the job writes
+        the same file. Jobs already in the queue keep their state, except
+        failed ones, which get a fresh set of attempts. With `refresh` done
+        jobs run again too.
+        """
+        retry = "('failed', 'done')" if refresh else "('failed')"
+        now = time.time()
+        with self._connection() as db:
+            before = db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            db.executemany(
+                "INSERT INTO jobs (resume, description, model, output_name, "
+                "updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (resume, description, model) DO UPDATE SET "
+                "status = 'pending', attempts = 0, error = NULL, "
+                "output_name = COALESCE(excluded.output_name, output_name), "
+                "updated_at = excluded.updated_at "
+                f"WHERE status IN {retry}",
+                [(*job[:3], job[3] if len(job) > 3 else None, now) for job in jobs],
+            )
+            after = db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return after - before
+
+    def claim(self, worker=None):
+        """Lease the next pending or abandoned job, None when there is none."""
+        now = time.time()
+        with self._connection() as db:
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "worker = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (worker or worker_name(), now + self.lease, now, row["id"]),
+            )
+        with self._claimed_lock:
+            self._claimed.add(row["id"])
+        return dict(row, attempts=row["attempts"] + 1)
+
+    def _settled(self, job):
+        with self._claimed_lock:
+            self._claimed.discard(job["id"])
+
+    def release(self, job):
+        """Put back a claimed job that was not run, without using an attempt."""
+        self._settled(job)
+        with self._connection() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), "
+                "worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (time.time(), job["id"]),
+            )
+
+    def reclaim(self):
+        """Put back the running jobs of processes on this host that are gone."""
+        host = socket.gethostname()
+        with self._connection() as db:
+            rows = db.execute(
+                "SELECT id, worker FROM jobs WHERE status = 'running'"
+            ).fetchall()
+            dead = []
+            for row in rows:
+                parts = (row["worker"] or "").rsplit(":", 2)
+                if len(parts) != 3 or parts[0] != host or not parts[1].isdigit():
+                    continue
+                if not process_alive(int(parts[1])):
+                    dead.append(row["id"])
+            db.executemany(
+                "UPDATE jobs SET status = 'pending', worker = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE id = ?",
+                [(time.time(), job_id) for job_id in dead],
+            )
+        return len(dead)
+
+    def finish(self, job, output, usage):
+        self._settled(job)
+        with self._connection() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'done', output = ?, usage = ?, error = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE id = ?",
+                (output, json.dumps(usage_to_dict(usage)), time.time(), job["id"]),
+            )
+
+    def fail(self, job, error):
+        # Retried by the next claim until the attempts run out
+        status = "failed" if job["attempts"] >= self.max_attempts else "pending"
+        self._settled(job)
+        with self._connection() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job["id"]),
+            )
+        return status
+
+    def counts(self):
+        with self._connection() as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return {status: count for status, count in rows}
+
+    def jobs(self, status=None):
+        query = "SELECT * FROM jobs"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._connection() as db:
+            rows = db.execute(query + " ORDER BY id", params).fetchall()
+        return [
+            dict(row, usage=json.loads(row["usage"]) if row["usage"] else None)
+            for row in rows
+        ]
+
+    def close(self):
+        # Jobs still claimed were interrupted, other runs may take them now
+        with self._claimed_lock:
+            claimed = list(self._claimed)
+        for job_id in claimed:
+            self.release({"id": job_id})
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so two workers can never
+    # read the same pending job and both claim it
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,48 @@
+"""Batch throughput in pairs per minute against the mock Groq server."""
+
+import os
+import tempfile
+import time
+
+from app.batch import build_pairs, run_batch
+from benchmarks.common import mock_groq_environment, quiet
+from benchmarks.fixtures import write_document
+
+
+def run(mock_groq, resumes=4, descriptions=5, workers=8):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        resume_paths = [
+            write_document(tmp_dir, f"resume{index}", ".txt", 2)
+            for index in range(resumes)
+        ]
+        description_paths = [
+            write_document(tmp_dir, f"job{index}", ".txt", 1)
+            for index in range(descriptions)
+        ]
+        pairs = build_pairs(resume_paths, description_paths)
+
+        with mock_groq_environment(mock_groq), quiet():
+            requests_before = mock_groq.requests
+            started = time.perf_counter()
+            results = run_batch(
+                pairs,
+                api_key="benchmark",
+                models=["model-a"],
+                output_dir=os.path.join(tmp_dir, "results"),
+                workers=workers,
+            )
+            elapsed = time.perf_counter() - started
+            requests = mock_groq.requests - requests_before
+
+    return [
+        {
+            "name": "batch",
+            "pairs": len(pairs),
+            "workers": workers,
+            "failed": sum(1 for result in results if result["error"]),
+            # One per pair, fewer would mean pairs shared a request
+            "requests": requests,
+            "elapsed_ms": elapsed * 1000,
+            "pairs_per_minute": len(pairs) / elapsed * 60,
+        }
+    ]
@@ -0,0 +1,48 @@
+"""get_response end to end against the mock Groq server, one and many models."""
+
+from app.resume_enhancer import get_response
+from benchmarks.common import measure, mock_groq_environment, quiet
+from benchmarks.fixtures import make_text
+
+FANOUT_MODELS = ["model-a", "model-b", "model-c", "model-d"]
+
+
+def run(mock_groq, repeat=3):
+    resume = make_text(600)
+    description = make_text(300)
+
+    def enhance(models, concurrency=1, backend="groq"):
+        with quiet():
+            get_response(
+                resume=resume,
+                description=description,
+                api_key="benchmark",
+                models=models,
+                concurrency=concurrency,
+                backend=backend,
+            )
+
+    with mock_groq_environment(mock_groq):
+        return [
+            {
+                "name": "get_response.single",
+                **measure(lambda: enhance(["model-a"]), repeat=repeat),
+            },
+            {
+                "name": "get_response.fanout.sequential",
+                "models": len(FANOUT_MODELS),
+                **measure(lambda: enhance(FANOUT_MODELS), repeat=repeat),
+            },
+            {
+                "name": "get_response.fanout.concurrent",
+                "models": len(FANOUT_MODELS),
+                **measure(
+                    lambda: enhance(FANOUT_MODELS, len(FANOUT_MODELS)), repeat=repeat
+                ),
+            },
+            {
+                # Offline keyword gap analysis, no request leaves the process
+                "name": "get_response.keywords",
+                **measure(lambda: enhance(None, backend="keywords"), repeat=repeat),
+            },
+        ]
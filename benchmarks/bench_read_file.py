@@ -0,0 +1,39 @@
+"""read_file across txt, pdf and docx documents of different sizes."""
+
+import tempfile
+
+from app.cache import DocumentCache
+from app.utils import read_file
+from benchmarks.common import measure
+from benchmarks.fixtures import write_document
+
+SIZES = {"small": 2, "medium": 20, "large": 100}
+EXTENSIONS = [".txt", ".pdf", ".docx"]
+
+
+def run(repeat=5, sizes=None):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = DocumentCache(directory=f"{tmp_dir}/cache")
+        for size, pages in (sizes or SIZES).items():
+            for extension in EXTENSIONS:
+                path = write_document(tmp_dir, size, extension, pages)
+                name = f"read_file{extension}.{size}"
+                results.append(
+                    {
+                        "name": name,
+                        "pages": pages,
+                        **measure(lambda: read_file(path), repeat=repeat),
+                    }
+                )
+                if extension != ".txt":
+                    results.append(
+                        {
+                            "name": f"{name}.cached",
+                            "pages": pages,
+                            **measure(
+                                lambda: read_file(path, cache=cache), repeat=repeat
+                            ),
+                        }
+                    )
+    return results
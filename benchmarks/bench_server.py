@@ -0,0 +1,95 @@
+"""Latency of the HTTP service under concurrent load against the mock Groq API.
+
+Usage:
+    python -m benchmarks.bench_server --requests 200 --concurrency 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from benchmarks.mock_groq import MockGroqServer
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run(requests=100, concurrency=10, latency=0.2, tokens_per_second=500, tokens=200):
+    mock_groq = MockGroqServer(
+        ("127.0.0.1", 0),
+        latency=latency,
+        tokens_per_second=tokens_per_second,
+        tokens=tokens,
+    ).start()
+    # The Groq SDK picks its base URL up from the environment
+    os.environ["GROQ_BASE_URL"] = mock_groq.base_url
+
+    from app.server import EnhancerServer
+
+    server = EnhancerServer(
+        ("127.0.0.1", 0), api_key="benchmark", workers=max(concurrency, 8)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/enhance"
+    payload = {"resume": "Python developer " * 50, "description": "Backend role " * 50}
+
+    with httpx.Client(
+        timeout=60, limits=httpx.Limits(max_connections=concurrency)
+    ) as client:
+
+        def one_request(_):
+            started = time.perf_counter()
+            response = client.post(url, json=payload)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(one_request, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    server.shutdown()
+    server.server_close()
+    mock_groq.shutdown()
+
+    return {
+        "benchmark": "server",
+        "requests": requests,
+        "concurrency": concurrency,
+        "upstream_latency": latency,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "mean": statistics.fmean(latencies),
+        "requests_per_second": requests / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP service")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--tokens", type=int, default=200)
+    arguments = parser.parse_args()
+
+    print(
+        json.dumps(
+            run(
+                requests=arguments.requests,
+                concurrency=arguments.concurrency,
+                latency=arguments.latency,
+                tokens_per_second=arguments.tokens_per_second,
+                tokens=arguments.tokens,
+            ),
+            indent=4,
+        )
+    )
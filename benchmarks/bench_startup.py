@@ -0,0 +1,97 @@
+"""Start-up time of the CLI, measured with ``python -X importtime``.
+
+Fails (exit code 1) when importing the CLI takes longer than the budget or
+pulls in any of the heavy modules that should only load on demand.
+
+Usage:
+    python -m benchmarks.bench_startup --budget-ms 150
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that --help and --version must not import
+HEAVY_MODULES = ["groq", "httpx", "pypdf", "docx", "lxml", "halo", "requests", "numpy"]
+
+DEFAULT_BUDGET_MS = 150
+
+
+def import_time(module="app.resume_enhancer"):
+    """Return (cumulative import time in ms, heavy modules imported)."""
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = None
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module and parts[2][1] != " ":
+            cumulative = int(parts[1]) / 1000
+    heavy = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative, heavy
+
+
+def command_time(arguments):
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "app.resume_enhancer", *arguments],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+    )
+    return (time.perf_counter() - started) * 1000
+
+
+def run(runs=5):
+    # The minimum over several runs is the least noisy estimate
+    imports = [import_time() for _ in range(runs)]
+    return {
+        "benchmark": "startup",
+        "import_ms": min(cumulative for cumulative, _ in imports),
+        "heavy_modules": imports[0][1],
+        "version_ms": min(command_time(["--version"]) for _ in range(runs)),
+        "help_ms": min(command_time(["--help"]) for _ in range(runs)),
+    }
+
+
+def check(result, budget_ms=DEFAULT_BUDGET_MS):
+    errors = []
+    if result["import_ms"] > budget_ms:
+        errors.append(
+            f"Importing the CLI took {result['import_ms']:.1f} ms, "
+            f"budget is {budget_ms} ms"
+        )
+    if result["heavy_modules"]:
+        errors.append(
+            "Heavy modules imported at start-up: " + ", ".join(result["heavy_modules"])
+        )
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CLI start-up time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    arguments = parser.parse_args()
+
+    result = run(arguments.runs)
+    print(json.dumps(result, indent=4))
+    errors = check(result, arguments.budget_ms)
+    for error in errors:
+        print(error, file=sys.stderr)
+    sys.exit(1 if errors else 0)
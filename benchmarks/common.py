@@ -0,0 +1,48 @@
+import contextlib
+import io
+import os
+import statistics
+import time
+
+
+def measure(function, repeat=5, warmup=1):
+    """Call `function` repeatedly and return timing statistics in ms."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "repeat": repeat,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    # get_response prints its results, which would drown the benchmark output
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            yield
+
+
+@contextlib.contextmanager
+def mock_groq_environment(mock_groq):
+    """Point every Groq client created inside the block at `mock_groq`."""
+    from app.clients import close_clients
+
+    previous = os.environ.get("GROQ_BASE_URL")
+    os.environ["GROQ_BASE_URL"] = mock_groq.base_url
+    close_clients()
+    try:
+        yield
+    finally:
+        close_clients()
+        if previous is None:
+            os.environ.pop("GROQ_BASE_URL", None)
+        else:
+            os.environ["GROQ_BASE_URL"] = previous
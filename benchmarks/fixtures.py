@@ -0,0 +1,83 @@
+"""Generate resume and job description files of a given size for benchmarks."""
+
+import os
+
+WORDS = (
+    "Python developer with experience in distributed systems cloud infrastructure "
+    "REST APIs data pipelines testing automation Kubernetes Docker PostgreSQL "
+    "mentoring agile delivery performance monitoring security"
+).split()
+
+
+def make_text(words, tag=None):
+    # A tag makes the text unique, identical prompts would share one request
+    text = " ".join(WORDS[index % len(WORDS)] for index in range(words))
+    return f"{tag}\n{text}" if tag else text
+
+
+def make_pdf(pages):
+    """Build a minimal PDF from the text of each page, no extra dependencies.
+
+    Line breaks in a page's text start a new line on the page.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in pages:
+        lines = ") Tj T* (".join(text.split("\n"))
+        stream = f"BT /F1 12 Tf 14 TL 72 720 Td ({lines}) Tj ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode()
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return pdf
+
+
+def write_document(directory, name, extension, pages, words_per_page=300):
+    """Write a document with `pages` pages of text and return its path."""
+    path = os.path.join(directory, f"{name}{extension}")
+    page_texts = [
+        make_text(words_per_page, tag=f"{name} page {index + 1}")
+        for index in range(pages)
+    ]
+
+    if extension == ".txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(page_texts))
+    elif extension == ".pdf":
+        with open(path, "wb") as f:
+            f.write(make_pdf(page_texts))
+    elif extension == ".docx":
+        from docx import Document  # type: ignore
+
+        document = Document()
+        for text in page_texts:
+            document.add_paragraph(text)
+        document.save(path)
+    else:
+        raise ValueError(f"Unsupported fixture type: {extension}")
+    return path
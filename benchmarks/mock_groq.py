@@ -0,0 +1,122 @@
+"""Local stand-in for the Groq chat completions API used by the benchmarks.
+
+It streams a fixed number of tokens after a configurable time to first token,
+at a configurable rate, in the same server-sent events format as Groq.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.2, tokens_per_second=500, tokens=200):
+        super().__init__(address, MockGroqHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        thread.start()
+        return self
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_event(self, data):
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        body = json.dumps(
+            {"object": "list", "data": [{"id": "mock-model", "object": "model"}]}
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server._lock:
+            server.requests += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("x-ratelimit-limit-requests", "14400")
+        self.send_header("x-ratelimit-remaining-requests", "14399")
+        self.send_header("x-ratelimit-reset-requests", "6s")
+        self.end_headers()
+
+        started = time.perf_counter()
+        time.sleep(server.latency)
+        interval = 1.0 / server.tokens_per_second
+        for index in range(server.tokens):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [
+                    {"index": 0, "delta": {"content": "word "}, "finish_reason": None}
+                ],
+            }
+            if index == server.tokens - 1:
+                elapsed = time.perf_counter() - started
+                chunk["choices"][0]["finish_reason"] = "stop"
+                chunk["x_groq"] = {
+                    "id": "req-mock",
+                    "usage": {
+                        "completion_tokens": server.tokens,
+                        "prompt_tokens": 100,
+                        "total_tokens": server.tokens + 100,
+                        "completion_time": elapsed - server.latency,
+                        "prompt_time": server.latency,
+                        "queue_time": 0.0,
+                        "total_time": elapsed,
+                    },
+                }
+            self.send_event(json.dumps(chunk))
+            time.sleep(interval)
+        self.send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock Groq API server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--tokens", type=int, default=200)
+    arguments = parser.parse_args()
+
+    server = MockGroqServer(
+        ("127.0.0.1", arguments.port),
+        latency=arguments.latency,
+        tokens_per_second=arguments.tokens_per_second,
+        tokens=arguments.tokens,
+    )
+    print(f"Mock Groq API listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,133 @@
+"""Run the benchmark suite offline and write machine-readable results.
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+
+Every result has a unique "name". With --compare, results are matched by name
+against an earlier run and the command fails when one is slower than the
+baseline by more than the threshold.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+
+from benchmarks import bench_batch, bench_get_response, bench_read_file
+from benchmarks.mock_groq import MockGroqServer
+
+BENCHMARKS = ["read_file", "get_response", "batch"]
+
+# Metric compared for each kind of result and whether higher is better
+METRICS = [("median_ms", False), ("pairs_per_minute", True)]
+
+
+def run(only=None, repeat=5, latency=0.2, tokens_per_second=500, tokens=200):
+    selected = only or BENCHMARKS
+    results = []
+    if "read_file" in selected:
+        results += bench_read_file.run(repeat=repeat)
+
+    if "get_response" in selected or "batch" in selected:
+        mock_groq = MockGroqServer(
+            ("127.0.0.1", 0),
+            latency=latency,
+            tokens_per_second=tokens_per_second,
+            tokens=tokens,
+        ).start()
+        try:
+            if "get_response" in selected:
+                results += bench_get_response.run(mock_groq, repeat=max(1, repeat // 2))
+            if "batch" in selected:
+                results += bench_batch.run(mock_groq)
+        finally:
+            mock_groq.shutdown()
+            mock_groq.server_close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mock_groq": {
+                "latency": latency,
+                "tokens_per_second": tokens_per_second,
+                "tokens": tokens,
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """Return (rows, regressions) comparing two runs by result name."""
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+    rows = []
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+        for metric, higher_is_better in METRICS:
+            if metric not in result or metric not in previous or not previous[metric]:
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric]
+            worse = -change if higher_is_better else change
+            row = {
+                "name": result["name"],
+                "metric": metric,
+                "baseline": previous[metric],
+                "current": result[metric],
+                "change": change,
+            }
+            rows.append(row)
+            if worse > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    arguments = parser.parse_args()
+
+    current = run(
+        only=arguments.only,
+        repeat=arguments.repeat,
+        latency=arguments.latency,
+        tokens_per_second=arguments.tokens_per_second,
+        tokens=arguments.tokens,
+    )
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=4)
+    else:
+        print(json.dumps(current, indent=4))
+
+    if arguments.compare:
+        with open(arguments.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(current, baseline, arguments.threshold)
+        for row in rows:
+            flag = " REGRESSION" if row in regressions else ""
+            print(
+                f"{row['name']:<40} {row['metric']:<18} "
+                f"{row['baseline']:>10.2f} -> {row['current']:>10.2f} "
+                f"({row['change']:+.1%}){flag}",
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
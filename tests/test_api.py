@@ -0,0 +1,117 @@
+from api import enhance, enhance_stream, enhance_files  # type: ignore
+from benchmarks.common import mock_groq_environment
+from benchmarks.mock_groq import MockGroqServer
+from cache import ResponseCache  # type: ignore
+from clients import aclose_clients  # type: ignore
+from metrics import Metrics  # type: ignore
+from unittest import mock
+import asyncio
+import time
+import pytest  # type: ignore
+
+
+def run(coroutine):
+    # Every test runs on its own loop, so the async pool is closed with it
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await aclose_clients()
+
+    return asyncio.run(main())
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+## Test the async API from api
+
+
+class Test_api:
+    def setup_method(self):
+        self.server = MockGroqServer(
+            ("127.0.0.1", 0), latency=0.1, tokens_per_second=1000, tokens=5
+        ).start()
+        self.environment = mock_groq_environment(self.server)
+        self.environment.__enter__()
+
+    def teardown_method(self):
+        self.environment.__exit__(None, None, None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_enhance_structured_results(self, capsys):
+        results = run(
+            enhance("Resume", "Description", "test_api_key", models=["a", "b"])
+        )
+
+        assert [result["model"] for result in results] == ["a", "b"]
+        for result in results:
+            assert result["error"] is None
+            assert result["content"]
+            assert result["cached"] is False
+            assert result["timings"]["time_to_first_token"] >= 0.1
+        # No terminal side effects
+        assert capsys.readouterr().out == ""
+
+    def test_enhance_many_on_one_loop(self):
+        async def many():
+            return await asyncio.gather(
+                *(enhance(f"Resume {i}", "Description", "key") for i in range(20))
+            )
+
+        started = time.perf_counter()
+        results = run(many())
+        elapsed = time.perf_counter() - started
+
+        assert len(results) == 20
+        assert all(result["error"] is None for [result] in results)
+        # The requests overlap instead of queueing behind each other
+        assert elapsed < 2.0
+        assert self.server.requests == 20
+
+    def test_enhance_stream_events(self):
+        events = run(
+            collect(enhance_stream("Resume", "Description", "key", models=["a", "b"]))
+        )
+
+        done = [event for event in events if event.get("done")]
+        assert sorted(event["model"] for event in done) == ["a", "b"]
+        assert all(event["error"] is None for event in done)
+        assert any("content" in event for event in events)
+
+    def test_enhance_uses_cache(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        first = run(enhance("Resume", "Description", "key", cache=cache))
+        second = run(enhance("Resume", "Description", "key", cache=cache))
+
+        assert second[0]["cached"] is True
+        assert second[0]["content"] == first[0]["content"]
+        assert self.server.requests == 1
+
+    def test_enhance_records_completion_metrics(self):
+        metrics = Metrics()
+        with mock.patch("app.completion.get_metrics", return_value=metrics):
+            [result] = run(enhance("Resume", "Description", "key"))
+
+        assert result["error"] is None
+        names = [span["name"] for span in metrics.spans]
+        assert names == ["time_to_first_token", "completion"]
+        assert metrics.spans[1]["tokens"] > 0
+        assert ("tokens_per_second", (("model", "llama3-8b-8192"),)) in metrics.gauges
+
+    def test_enhance_files(self, tmp_path):
+        (tmp_path / "resume.txt").write_text("Resume")
+        (tmp_path / "job.txt").write_text("Description")
+
+        [result] = run(
+            enhance_files(
+                str(tmp_path / "resume.txt"), str(tmp_path / "job.txt"), "key"
+            )
+        )
+        assert result["error"] is None
+
+    def test_enhance_no_api_key(self):
+        with pytest.raises(ValueError, match="API key is required"):
+            run(enhance("Resume", "Description", None))
@@ -0,0 +1,185 @@
+from backends import (  # type: ignore
+    LlamaClient,
+    MockClient,
+    OfflineClient,
+    default_models,
+    get_client,
+    keyword_gap,
+    make_chunk,
+    needs_api_key,
+)
+from cache import ResponseCache  # type: ignore
+from completion import collect_completion  # type: ignore
+from prompt import build_messages  # type: ignore
+from structured import build_json_messages, parse_result  # type: ignore
+from resume_enhancer import get_response  # type: ignore
+from unittest import mock
+from io import StringIO
+import pytest  # type: ignore
+
+RESUME = """Jane Doe
+
+Skills
+Python, Docker, PostgreSQL
+
+Experience
+Built REST APIs in Python and deployed them with Docker.
+"""
+
+DESCRIPTION = """Backend engineer. We use Python and Kubernetes.
+You will run Kubernetes clusters with Terraform and Python services on AWS.
+"""
+
+
+## Test keyword_gap from backends.keyword_gap
+
+
+class Test_keyword_gap:
+    def test_missing_keywords_by_weight(self):
+        result = keyword_gap(RESUME, DESCRIPTION)
+        # Kubernetes appears twice, it is the largest gap
+        assert result["missing_keywords"][0] == "Kubernetes"
+        assert "Terraform" in result["missing_keywords"]
+        assert "AWS" in result["missing_keywords"]
+        assert "Python" not in result["missing_keywords"]
+        assert 0 < result["match_score"] < 100
+
+    def test_suggested_edits_quote_the_description(self):
+        edit = keyword_gap(RESUME, DESCRIPTION)["suggested_edits"][0]
+        assert edit["section"] == "Skills"
+        assert edit["current"] == "Python, Docker, PostgreSQL"
+        assert "We use Python and Kubernetes." in edit["suggestion"]
+
+    def test_full_match(self):
+        result = keyword_gap(DESCRIPTION, DESCRIPTION)
+        assert result["match_score"] == 100
+        assert result["missing_keywords"] == []
+
+    def test_deterministic(self):
+        assert keyword_gap(RESUME, DESCRIPTION) == keyword_gap(RESUME, DESCRIPTION)
+
+
+## Test the offline clients from backends.get_client
+
+
+class Test_get_client:
+    def test_keywords_text_report(self):
+        client = get_client("keywords")
+        content, usage = collect_completion(
+            client.chat.completions.create(
+                messages=build_messages(RESUME, DESCRIPTION), model="keyword-gap"
+            )
+        )
+        assert content.startswith("Keyword match: ")
+        assert "- Kubernetes" in content
+        assert usage.total_tokens == usage.prompt_tokens + usage.completion_tokens
+
+    def test_keywords_json_result(self):
+        client = get_client("keywords")
+        content, _ = collect_completion(
+            client.chat.completions.create(
+                messages=build_json_messages(RESUME, DESCRIPTION), model="keyword-gap"
+            )
+        )
+        assert parse_result(content) == keyword_gap(RESUME, DESCRIPTION)
+
+    def test_mock_client(self):
+        client = MockClient(response="Canned answer")
+        content, _ = collect_completion(
+            client.chat.completions.create(messages=build_messages("R", "D"), model="m")
+        )
+        assert content == "Canned answer"
+        assert client.requests == 1
+
+    def test_groq_needs_api_key(self):
+        assert needs_api_key("groq")
+        assert not needs_api_key("keywords")
+        with pytest.raises(ValueError, match="API key is required"):
+            get_client("groq")
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="Unknown backend"):
+            get_client("nope")
+
+    def test_llama_needs_a_model(self):
+        with pytest.raises(ValueError, match="needs a model"):
+            default_models("llama")
+
+    def test_llama_without_package(self, tmp_path):
+        client = LlamaClient(str(tmp_path))
+        with mock.patch.dict("sys.modules", {"llama_cpp": None}):
+            with pytest.raises(RuntimeError, match="llama-cpp-python"):
+                client.chat.completions.create(
+                    messages=build_messages("R", "D"), model="model"
+                )
+
+    def test_llama_streams_local_model(self, tmp_path):
+        (tmp_path / "tiny.gguf").write_bytes(b"GGUF")
+        llama = mock.Mock()
+        llama.return_value.create_chat_completion.return_value = iter(
+            [
+                {"choices": [{"delta": {"role": "assistant"}}]},
+                {"choices": [{"delta": {"content": "Local "}}]},
+                {"choices": [{"delta": {"content": "answer"}}]},
+            ]
+        )
+        client = LlamaClient(str(tmp_path), n_ctx=2048)
+        with mock.patch.dict("sys.modules", {"llama_cpp": mock.Mock(Llama=llama)}):
+            content, usage = collect_completion(
+                client.chat.completions.create(
+                    messages=build_messages("R", "D"), model="tiny"
+                )
+            )
+
+        assert content == "Local answer"
+        assert usage.completion_tokens > 0
+        assert llama.call_args.kwargs["model_path"] == str(tmp_path / "tiny.gguf")
+        assert llama.call_args.kwargs["n_ctx"] == 2048
+
+    def test_offline_client_needs_answer(self):
+        with pytest.raises(TypeError):
+            OfflineClient()
+
+
+## Test get_response with an offline backend from resume_enhancer.get_response
+
+
+class Test_get_response_offline:
+    def test_mock_answers_are_not_served_to_groq(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        options = dict(
+            resume=RESUME,
+            description=DESCRIPTION,
+            api_key="key",
+            models=["llama3-8b-8192"],
+            cache=cache,
+        )
+        groq_client = mock.Mock()
+        groq_client.chat.completions.create.return_value = iter(
+            [make_chunk("Groq answer")]
+        )
+
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            get_response(backend="mock", **options)
+            with mock.patch.dict(
+                "app.backends.BACKENDS",
+                {"groq": (lambda api_key: groq_client, True, "llama3-8b-8192")},
+            ):
+                get_response(backend="groq", **options)
+            output = mock_stdout.getvalue()
+
+        groq_client.chat.completions.create.assert_called_once()
+        assert output.index("Enhanced resume") < output.index("Groq answer")
+        assert len(cache.entries()) == 2
+
+    def test_keywords_backend_without_api_key(self):
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            get_response(
+                resume=RESUME,
+                description=DESCRIPTION,
+                api_key=None,
+                backend="keywords",
+            )
+            output = mock_stdout.getvalue()
+        assert "Model: keyword-gap" in output
+        assert "- Kubernetes" in output
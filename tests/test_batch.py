@@ -0,0 +1,254 @@
+from backends import make_chunk  # type: ignore
+from batch import (  # type: ignore
+    build_pairs,
+    document_names,
+    expand_inputs,
+    output_path,
+    read_manifest,
+    run_batch,
+)
+from workqueue import WorkQueue  # type: ignore
+from unittest import mock
+import json
+import pytest  # type: ignore
+
+
+## Test expand_inputs from batch.expand_inputs
+
+
+class Test_expand_inputs:
+    def test_expand_inputs_directory(self, tmp_path):
+        (tmp_path / "b.txt").write_text("b")
+        (tmp_path / "a.pdf").write_text("a")
+        (tmp_path / "notes.md").write_text("skip")
+
+        result = expand_inputs([str(tmp_path)])
+        assert result == [str(tmp_path / "a.pdf"), str(tmp_path / "b.txt")]
+
+    def test_expand_inputs_glob(self, tmp_path):
+        (tmp_path / "one.txt").write_text("1")
+        (tmp_path / "two.txt").write_text("2")
+        (tmp_path / "three.docx").write_text("3")
+
+        result = expand_inputs([str(tmp_path / "*.txt")])
+        assert result == [str(tmp_path / "one.txt"), str(tmp_path / "two.txt")]
+
+    def test_expand_inputs_no_duplicates(self, tmp_path):
+        (tmp_path / "one.txt").write_text("1")
+
+        result = expand_inputs([str(tmp_path), str(tmp_path / "one.txt")])
+        assert result == [str(tmp_path / "one.txt")]
+
+
+## Test read_manifest from batch.read_manifest
+
+
+class Test_read_manifest:
+    def test_read_manifest_valid(self, tmp_path):
+        manifest = tmp_path / "pairs.csv"
+        manifest.write_text("resume,description\nr.txt,d.txt\n")
+
+        assert read_manifest(str(manifest)) == [
+            (str(tmp_path / "r.txt"), str(tmp_path / "d.txt"))
+        ]
+
+    def test_read_manifest_missing_columns(self, tmp_path):
+        manifest = tmp_path / "pairs.csv"
+        manifest.write_text("cv,job\nr.txt,d.txt\n")
+
+        with pytest.raises(ValueError, match="resume"):
+            read_manifest(str(manifest))
+
+
+## Test output_path from batch.output_path
+
+
+class Test_output_path:
+    def test_unique_names_stay_short(self):
+        names = document_names(["a/resume.pdf", "jobs/backend.txt"])
+        assert output_path("out", "a/resume.pdf", "jobs/backend.txt", "m", names) == (
+            "out/resume_backend_m.txt"
+        )
+
+    def test_same_stem_gets_the_extension(self):
+        names = document_names(["resume.pdf", "resume.docx"])
+        assert names == {"resume.docx": "resume-docx", "resume.pdf": "resume-pdf"}
+
+    def test_same_file_name_gets_a_hash(self):
+        paths = ["a/resume.pdf", "b/resume.pdf", "c/resume.docx"]
+        names = document_names(paths)
+        assert len(set(names.values())) == 3
+        assert names["c/resume.docx"] == "resume-docx"
+        assert names["a/resume.pdf"].startswith("resume-pdf-")
+
+
+## Test run_batch from batch.run_batch
+
+
+class Test_run_batch:
+    def setup_method(self):
+        self.patcher = mock.patch("batch.get_client")
+        self.mock_groq = self.patcher.start()
+        self.mock_client_instance = self.mock_groq.return_value
+        self.mock_client_instance.chat.completions.create.side_effect = (
+            lambda **kwargs: [make_chunk("Mocked "), make_chunk("batch content")]
+        )
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    def test_run_batch_cross_product(self, tmp_path):
+        resumes = []
+        descriptions = []
+        for name in ["r1", "r2"]:
+            (tmp_path / f"{name}.txt").write_text(f"resume {name}")
+            resumes.append(str(tmp_path / f"{name}.txt"))
+        for name in ["d1", "d2", "d3"]:
+            (tmp_path / f"{name}.txt").write_text(f"description {name}")
+            descriptions.append(str(tmp_path / f"{name}.txt"))
+
+        output_dir = tmp_path / "results"
+        results = run_batch(
+            build_pairs(resumes, descriptions),
+            api_key="test_api_key",
+            output_dir=str(output_dir),
+            workers=3,
+        )
+
+        assert len(results) == 6
+        assert all(result["error"] is None for result in results)
+        assert (output_dir / "r2_d3_llama3-8b-8192.txt").read_text() == (
+            "Mocked batch content"
+        )
+        # One shared client for the whole batch
+        self.mock_groq.assert_called_once_with("groq", "test_api_key")
+
+    def test_run_batch_reports_unreadable_documents(self, tmp_path):
+        (tmp_path / "r.txt").write_text("resume")
+        results = run_batch(
+            [(str(tmp_path / "r.txt"), str(tmp_path / "missing.txt"))],
+            api_key="test_api_key",
+            output_dir=str(tmp_path / "results"),
+        )
+
+        assert results[0]["error"] == "Input document could not be read"
+
+    def test_run_batch_no_api_key(self):
+        with pytest.raises(ValueError, match="API key is required"):
+            run_batch([], api_key=None)
+
+    def test_run_batch_top_n_prerank(self, tmp_path):
+        (tmp_path / "r.txt").write_text("Python developer with Django experience")
+        (tmp_path / "python.txt").write_text("Python and Django backend role")
+        (tmp_path / "react.txt").write_text("React frontend role")
+
+        results = run_batch(
+            build_pairs(
+                [str(tmp_path / "r.txt")],
+                [str(tmp_path / "python.txt"), str(tmp_path / "react.txt")],
+            ),
+            api_key="test_api_key",
+            output_dir=str(tmp_path / "results"),
+            top_n=1,
+        )
+
+        assert [result["description"] for result in results] == [
+            str(tmp_path / "python.txt")
+        ]
+
+    def test_run_batch_queue_resumes(self, tmp_path):
+        for name in ["r1", "r2", "d"]:
+            (tmp_path / f"{name}.txt").write_text(name)
+        pairs = build_pairs(
+            [str(tmp_path / "r1.txt"), str(tmp_path / "r2.txt")],
+            [str(tmp_path / "d.txt")],
+        )
+        queue = WorkQueue(str(tmp_path / "queue.db"), max_attempts=1)
+
+        def flaky(**kwargs):
+            if "r2" in kwargs["messages"][1]["content"]:
+                raise ConnectionError("network blip")
+            return [make_chunk("Mocked "), make_chunk("batch content")]
+
+        self.mock_client_instance.chat.completions.create.side_effect = flaky
+        results = run_batch(
+            pairs, api_key="key", output_dir=str(tmp_path / "results"), queue=queue
+        )
+        assert sorted(bool(result["error"]) for result in results) == [False, True]
+        assert queue.counts() == {"done": 1, "failed": 1}
+
+        # The second run only repeats the job that failed
+        self.mock_client_instance.chat.completions.create.side_effect = None
+        self.mock_client_instance.chat.completions.create.return_value = [
+            make_chunk("Recovered")
+        ]
+        [result] = run_batch(
+            pairs, api_key="key", output_dir=str(tmp_path / "results"), queue=queue
+        )
+        assert result["resume"] == str(tmp_path / "r2.txt")
+        assert queue.counts() == {"done": 2}
+
+    def test_run_batch_queue_worker_without_inputs(self, tmp_path):
+        (tmp_path / "r.txt").write_text("resume")
+        (tmp_path / "d.txt").write_text("description")
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        queue.add([(str(tmp_path / "r.txt"), str(tmp_path / "d.txt"), "model")])
+
+        [result] = run_batch(
+            [], api_key="key", output_dir=str(tmp_path / "results"), queue=queue
+        )
+        assert result["error"] is None
+        assert (tmp_path / "results" / "r_d_model.txt").exists()
+
+    def test_run_batch_queue_worker_uses_queued_output_names(self, tmp_path):
+        for directory in ["a", "b"]:
+            (tmp_path / directory).mkdir()
+            (tmp_path / directory / "resume.txt").write_text(directory)
+        (tmp_path / "d.txt").write_text("description")
+        pairs = build_pairs(
+            [str(tmp_path / "a" / "resume.txt"), str(tmp_path / "b" / "resume.txt")],
+            [str(tmp_path / "d.txt")],
+        )
+        output_dir = str(tmp_path / "results")
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+
+        # The first run only queues the jobs, a worker without inputs runs them
+        with mock.patch("batch.drain_queue", return_value=[]):
+            run_batch(pairs, api_key="key", output_dir=output_dir, queue=queue)
+        results = run_batch([], api_key="key", output_dir=output_dir, queue=queue)
+
+        names = document_names([path for pair in pairs for path in pair])
+        expected = [
+            output_path(output_dir, *pair, "llama3-8b-8192", names) for pair in pairs
+        ]
+        assert sorted(result["output"] for result in results) == sorted(expected)
+        assert len(set(expected)) == 2
+
+    def test_run_batch_jsonl(self, tmp_path):
+        for name in ["r1", "r2", "d"]:
+            (tmp_path / f"{name}.txt").write_text(name)
+        self.mock_client_instance.chat.completions.create.side_effect = None
+        self.mock_client_instance.chat.completions.create.return_value = [
+            make_chunk('{"match_score": 70, "summary": "Good"}')
+        ]
+        jsonl = tmp_path / "results" / "results.jsonl"
+        run_batch(
+            build_pairs(
+                [str(tmp_path / "r1.txt"), str(tmp_path / "r2.txt")],
+                [str(tmp_path / "d.txt")],
+            ),
+            api_key="key",
+            output_dir=str(tmp_path / "results"),
+            jsonl=str(jsonl),
+        )
+
+        records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+        assert sorted(record["resume"] for record in records) == [
+            str(tmp_path / "r1.txt"),
+            str(tmp_path / "r2.txt"),
+        ]
+        assert all(record["match_score"] == 70 for record in records)
+        # One file for the whole batch
+        assert sorted(path.name for path in (tmp_path / "results").iterdir()) == [
+            "results.jsonl"
+        ]
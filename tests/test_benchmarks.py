@@ -0,0 +1,65 @@
+from benchmarks.common import mock_groq_environment
+from benchmarks.mock_groq import MockGroqServer
+from benchmarks.run import compare
+from resume_enhancer import get_response  # type: ignore
+from unittest import mock
+from io import StringIO
+
+
+## Test compare from benchmarks.run.compare
+
+
+class Test_compare:
+    def setup_method(self):
+        self.baseline = {
+            "results": [
+                {"name": "read_file.pdf.small", "median_ms": 10.0},
+                {"name": "batch", "pairs_per_minute": 600.0},
+            ]
+        }
+
+    def test_compare_no_regression(self):
+        current = {
+            "results": [
+                {"name": "read_file.pdf.small", "median_ms": 11.0},
+                {"name": "batch", "pairs_per_minute": 590.0},
+                {"name": "new_benchmark", "median_ms": 1.0},
+            ]
+        }
+        rows, regressions = compare(current, self.baseline, threshold=0.2)
+        assert len(rows) == 2
+        assert regressions == []
+
+    def test_compare_regressions(self):
+        current = {
+            "results": [
+                {"name": "read_file.pdf.small", "median_ms": 15.0},
+                {"name": "batch", "pairs_per_minute": 300.0},
+            ]
+        }
+        _, regressions = compare(current, self.baseline, threshold=0.2)
+        assert [row["name"] for row in regressions] == ["read_file.pdf.small", "batch"]
+
+
+## Test the mock Groq server from benchmarks.mock_groq
+
+
+class Test_MockGroqServer:
+    def test_get_response_against_mock_server(self):
+        mock_groq = MockGroqServer(
+            ("127.0.0.1", 0), latency=0.01, tokens_per_second=10000, tokens=5
+        ).start()
+        try:
+            with mock_groq_environment(mock_groq):
+                with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                    get_response(
+                        resume="Sample Resume",
+                        description="Sample Job Description",
+                        api_key="test_api_key",
+                    )
+        finally:
+            mock_groq.shutdown()
+            mock_groq.server_close()
+
+        assert "word word word word word" in mock_stdout.getvalue()
+        assert mock_groq.requests == 1
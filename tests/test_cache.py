@@ -0,0 +1,175 @@
+from cache import DocumentCache, ResponseCache  # type: ignore
+from unittest import mock
+import json
+import os
+import time
+
+
+def make_messages(resume):
+    return [
+        {"role": "system", "content": "System prompt"},
+        {"role": "user", "content": resume},
+    ]
+
+
+## Test ResponseCache from cache.ResponseCache
+
+
+class Test_ResponseCache:
+    def test_make_key_ignores_whitespace(self):
+        key1 = ResponseCache.make_key(make_messages("Resume  text\n"), "m", 0.5, 1024)
+        key2 = ResponseCache.make_key(make_messages("Resume text"), "m", 0.5, 1024)
+        assert key1 == key2
+
+    def test_make_key_includes_parameters(self):
+        messages = make_messages("Resume text")
+        key = ResponseCache.make_key(messages, "m", 0.5, 1024)
+        assert key != ResponseCache.make_key(messages, "other", 0.5, 1024)
+        assert key != ResponseCache.make_key(messages, "m", 0.7, 1024)
+        assert key != ResponseCache.make_key(messages, "m", 0.5, 2048)
+
+    def test_get_and_set(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        assert cache.get("abc123") is None
+
+        cache.set("abc123", "Cached content")
+        assert cache.get("abc123")["content"] == "Cached content"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_expired_entries_are_misses(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path), max_age=60)
+        cache.set("abc123", "Cached content")
+        old = time.time() - 120
+        os.utime(cache._path("abc123"), (old, old))
+
+        assert cache.get("abc123") is None
+        assert not os.path.exists(cache._path("abc123"))
+
+    def test_size_eviction_removes_least_recently_used(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path), max_bytes=250)
+        for index, key in enumerate(["aa1", "bb2"]):
+            cache.set(key, "x" * 80)
+            old = time.time() - 100 + index
+            os.utime(cache._path(key), (old, old))
+
+        # Reading "aa1" makes "bb2" the least recently used entry
+        cache.get("aa1")
+        cache.set("cc3", "x" * 80)
+
+        assert cache.get("aa1") is not None
+        assert cache.get("bb2") is None
+        assert cache.get("cc3") is not None
+
+    def test_writes_under_the_limit_do_not_walk_the_directory(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path), max_bytes=10_000)
+        with mock.patch.object(
+            ResponseCache, "entries", wraps=cache.entries
+        ) as mock_entries:
+            for index in range(20):
+                cache.set(f"key{index}", "x" * 80)
+            # Only the first write walks the directory to learn its size
+            assert mock_entries.call_count == 1
+
+            for index in range(20, 100):
+                cache.set(f"key{index}", "x" * 80)
+            # Crossing max_bytes walks it again, and brings the cache back
+            assert mock_entries.call_count > 1
+        assert sum(size for _, size, _ in cache.entries()) <= 10_000
+
+
+## Test DocumentCache from cache.DocumentCache
+
+
+class Test_DocumentCache:
+    def setup_method(self):
+        self.reader = mock.Mock(return_value="Extracted text")
+
+    def test_read_miss_then_hit(self, tmp_path):
+        document = tmp_path / "resume.pdf"
+        document.write_bytes(b"%PDF-1.4 resume")
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+
+        assert cache.read(str(document), self.reader) == "Extracted text"
+        assert cache.read(str(document), self.reader) == "Extracted text"
+        self.reader.assert_called_once_with(str(document))
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_unchanged_file_is_not_hashed_again(self, tmp_path):
+        document = tmp_path / "resume.pdf"
+        document.write_bytes(b"%PDF-1.4 resume")
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+        cache.read(str(document), self.reader)
+        cache.flush()
+
+        # A fresh instance reuses the persisted path index
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+        with mock.patch.object(DocumentCache, "hash_file") as mock_hash:
+            assert cache.read(str(document), self.reader) == "Extracted text"
+        mock_hash.assert_not_called()
+
+    def test_changed_file_is_parsed_again(self, tmp_path):
+        document = tmp_path / "resume.pdf"
+        document.write_bytes(b"%PDF-1.4 resume")
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+        cache.read(str(document), self.reader)
+
+        document.write_bytes(b"%PDF-1.4 updated resume")
+        self.reader.return_value = "Updated text"
+        assert cache.read(str(document), self.reader) == "Updated text"
+        assert self.reader.call_count == 2
+
+    def test_same_content_at_new_path_is_a_hit(self, tmp_path):
+        for name in ["a.pdf", "b.pdf"]:
+            (tmp_path / name).write_bytes(b"%PDF-1.4 resume")
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+
+        cache.read(str(tmp_path / "a.pdf"), self.reader)
+        cache.read(str(tmp_path / "b.pdf"), self.reader)
+        self.reader.assert_called_once()
+
+    def test_index_is_saved_once_per_warm(self, tmp_path):
+        paths = []
+        for index in range(20):
+            path = tmp_path / f"resume{index}.pdf"
+            path.write_bytes(f"%PDF-1.4 resume {index}".encode())
+            paths.append(str(path))
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+
+        def read_file(path, cache):
+            return cache.read(path, self.reader)
+
+        with (
+            mock.patch("cache.read_file", side_effect=read_file),
+            mock.patch.object(
+                DocumentCache,
+                "_save_index",
+                autospec=True,
+                side_effect=DocumentCache._save_index,
+            ) as mock_save,
+        ):
+            assert cache.warm(paths) == 20
+        assert mock_save.call_count == 1
+        assert len(DocumentCache(directory=str(tmp_path / "cache"))._index) == 20
+
+    def test_index_drops_deleted_files(self, tmp_path):
+        for name in ["a.pdf", "b.pdf"]:
+            (tmp_path / name).write_bytes(name.encode())
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+        cache.read(str(tmp_path / "a.pdf"), self.reader)
+        cache.read(str(tmp_path / "b.pdf"), self.reader)
+        cache.flush()
+
+        (tmp_path / "a.pdf").unlink()
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+        assert list(cache._index) == [str(tmp_path / "b.pdf")]
+        cache.flush()
+        with open(cache.index_path) as f:
+            assert list(json.load(f)) == [str(tmp_path / "b.pdf")]
+
+    def test_warm(self, tmp_path):
+        for name in ["a.pdf", "b.docx"]:
+            (tmp_path / name).write_bytes(name.encode())
+        cache = DocumentCache(directory=str(tmp_path / "cache"))
+
+        with mock.patch("cache.read_file", side_effect=lambda path, cache: "text"):
+            assert cache.warm([str(tmp_path / "a.pdf"), str(tmp_path / "b.docx")]) == 2
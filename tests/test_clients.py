@@ -0,0 +1,51 @@
+import clients  # type: ignore
+from clients import (  # type: ignore
+    close_clients,
+    configure_pool,
+    get_groq_client,
+    get_http_client,
+)
+import pytest  # type: ignore
+
+
+## Test shared clients from clients
+
+
+class Test_clients:
+    def setup_method(self):
+        close_clients()
+        self.limits = dict(clients._pool_limits)
+
+    def teardown_method(self):
+        close_clients()
+        clients._pool_limits.clear()
+        clients._pool_limits.update(self.limits)
+
+    def test_get_http_client_is_shared(self):
+        assert get_http_client() is get_http_client()
+
+    def test_get_groq_client_reuses_pool(self):
+        client = get_groq_client("test_api_key")
+        assert get_groq_client("test_api_key") is client
+        assert get_groq_client("other_api_key") is not client
+        assert client._client is get_http_client()
+
+    def test_configure_pool(self):
+        configure_pool(max_connections=5, max_keepalive_connections=None)
+        assert clients._pool_limits["max_connections"] == 5
+        assert clients._pool_limits["max_keepalive_connections"] == 10
+
+    def test_configure_pool_unknown_limit(self):
+        with pytest.raises(ValueError, match="Unknown pool limits: pool_size"):
+            configure_pool(pool_size=5)
+
+    def test_configure_pool_after_first_request(self):
+        get_http_client()
+        configure_pool(max_connections=5)
+        assert clients._pool_limits["max_connections"] == 20
+
+    def test_close_clients(self):
+        client = get_http_client()
+        close_clients()
+        assert client.is_closed
+        assert get_http_client() is not client
@@ -0,0 +1,89 @@
+from corpus import CorpusIndex  # type: ignore
+from matching import BM25Index  # type: ignore
+from unittest import mock
+import numpy as np
+import pytest  # type: ignore
+
+RESUME = "Python developer, built Django REST APIs on PostgreSQL"
+
+
+def write_jobs(directory, jobs):
+    directory.mkdir(exist_ok=True)
+    for name, text in jobs.items():
+        (directory / name).write_text(text)
+    return sorted(str(directory / name) for name in jobs)
+
+
+## Test CorpusIndex from corpus.CorpusIndex
+
+
+class Test_CorpusIndex:
+    def test_open_missing_index(self, tmp_path):
+        corpus = CorpusIndex.open(str(tmp_path / "index"))
+        assert len(corpus) == 0
+        assert corpus.top_k(RESUME) == []
+
+    def test_update_and_reopen_with_mmap(self, tmp_path):
+        paths = write_jobs(
+            tmp_path / "jobs",
+            {
+                "backend.txt": "Python Django PostgreSQL backend",
+                "frontend.txt": "React TypeScript frontend",
+            },
+        )
+        corpus = CorpusIndex(str(tmp_path / "index"))
+        assert corpus.update(paths) == (2, 0, 0)
+
+        reopened = CorpusIndex.open(str(tmp_path / "index"))
+        assert isinstance(reopened.arrays["postings"], np.memmap)
+        assert reopened.top_k(RESUME, 1) == corpus.top_k(RESUME, 1)
+        assert reopened.top_k(RESUME, 1)[0][0] == paths[0]
+
+    def test_update_only_reads_changed_files(self, tmp_path):
+        jobs = tmp_path / "jobs"
+        paths = write_jobs(
+            jobs,
+            {
+                "a.txt": "Python Django backend",
+                "b.txt": "React frontend",
+                "c.txt": "Java Spring services",
+            },
+        )
+        CorpusIndex(str(tmp_path / "index")).update(paths)
+
+        # Change one file, delete one and add one
+        (jobs / "b.txt").write_text("React Native mobile and Python tooling")
+        (jobs / "c.txt").unlink()
+        (jobs / "d.txt").write_text("Go Kubernetes platform")
+        paths = [str(jobs / name) for name in ["a.txt", "b.txt", "d.txt"]]
+
+        corpus = CorpusIndex.open(str(tmp_path / "index"))
+        with mock.patch(
+            "app.batch.read_file", side_effect=lambda path, **_: open(path).read()
+        ) as mock_read:
+            assert corpus.update(paths) == (1, 1, 1)
+        assert sorted(call.args[0] for call in mock_read.call_args_list) == [
+            str(jobs / "b.txt"),
+            str(jobs / "d.txt"),
+        ]
+
+        # The result matches an index built from scratch
+        fresh = BM25Index.build({path: open(path).read() for path in paths})
+        reopened = CorpusIndex.open(str(tmp_path / "index"))
+        for query in [RESUME, "react mobile", "kubernetes"]:
+            assert [doc for doc, _ in reopened.top_k(query)] == [
+                doc for doc, _ in fresh.top_k(query)
+            ]
+            assert [score for _, score in reopened.top_k(query)] == pytest.approx(
+                [score for _, score in fresh.top_k(query)]
+            )
+        assert "spring" not in reopened.terms
+
+    def test_update_replaces_old_data(self, tmp_path):
+        paths = write_jobs(tmp_path / "jobs", {"a.txt": "Python"})
+        corpus = CorpusIndex(str(tmp_path / "index"))
+        corpus.update(paths)
+        corpus.update(paths)
+
+        data_dirs = [p for p in (tmp_path / "index").iterdir() if p.is_dir()]
+        assert len(data_dirs) == 1
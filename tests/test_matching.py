@@ -0,0 +1,85 @@
+from matching import BM25Index, tokenize, rank_documents, prerank_pairs  # type: ignore
+import pytest  # type: ignore
+
+DESCRIPTIONS = {
+    "backend.txt": "Backend engineer: Python, Django, PostgreSQL and REST APIs",
+    "frontend.txt": "Frontend developer with React, TypeScript and CSS",
+    "data.txt": "Data engineer using Python, Spark and SQL pipelines",
+}
+RESUME = "Python developer, built Django REST APIs on PostgreSQL"
+
+
+## Test tokenize from matching.tokenize
+
+
+class Test_tokenize:
+    def test_tokenize_keeps_skills(self):
+        assert tokenize("Knows C++, C# and Node.js.") == [
+            "knows",
+            "c++",
+            "c#",
+            "node.js",
+        ]
+
+    def test_tokenize_drops_stop_words(self):
+        assert tokenize("The role of an engineer") == ["role", "engineer"]
+
+
+## Test BM25Index from matching.BM25Index
+
+
+class Test_BM25Index:
+    def test_top_k_ranks_best_match_first(self):
+        index = BM25Index.build(DESCRIPTIONS)
+        ranked = index.top_k(RESUME, k=3)
+
+        assert ranked[0][0] == "backend.txt"
+        scores = [score for _, score in ranked]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_top_k_limits_results(self):
+        index = BM25Index.build(DESCRIPTIONS)
+        assert len(index.top_k(RESUME, k=1)) == 1
+
+    def test_scores_rare_terms_weigh_more(self):
+        index = BM25Index.build(DESCRIPTIONS)
+        # "python" is in two descriptions, "django" only in one
+        python, django = index.scores("python"), index.scores("django")
+        backend = index.positions["backend.txt"]
+        assert django[backend] > python[backend]
+
+    def test_scores_unknown_terms(self):
+        index = BM25Index.build(DESCRIPTIONS)
+        assert index.top_k("kubernetes terraform") == []
+
+    def test_empty_corpus(self):
+        assert BM25Index.build({}).top_k(RESUME) == []
+
+
+## Test rank_documents and prerank_pairs from matching
+
+
+class Test_prerank:
+    def test_rank_documents_reverse(self):
+        resumes = {
+            "react.txt": "React and TypeScript frontend developer",
+            "django.txt": "Django and PostgreSQL backend developer",
+        }
+        ranked = rank_documents(DESCRIPTIONS["frontend.txt"], resumes, k=1)
+        assert ranked[0][0] == "react.txt"
+
+    def test_prerank_pairs_keeps_top_n_per_resume(self):
+        documents = {"resume.txt": RESUME, **DESCRIPTIONS}
+        pairs = [("resume.txt", name) for name in DESCRIPTIONS]
+
+        assert prerank_pairs(pairs, documents, 1) == [("resume.txt", "backend.txt")]
+
+    def test_prerank_pairs_keeps_unreadable_resumes(self):
+        pairs = [("missing.txt", name) for name in DESCRIPTIONS]
+        assert prerank_pairs(pairs, dict(DESCRIPTIONS), 1) == pairs
+
+    @pytest.mark.parametrize("top_n", [3, 10])
+    def test_prerank_pairs_keeps_order(self, top_n):
+        documents = {"resume.txt": RESUME, **DESCRIPTIONS}
+        pairs = [("resume.txt", name) for name in DESCRIPTIONS]
+        assert prerank_pairs(pairs, documents, top_n) == pairs
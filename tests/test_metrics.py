@@ -0,0 +1,135 @@
+from backends import make_chunk  # type: ignore
+from metrics import Metrics, profile  # type: ignore
+from completion import record_timings  # type: ignore
+from resume_enhancer import get_response  # type: ignore
+from unittest import mock
+import json
+import pstats
+
+
+## Test Metrics from metrics.Metrics
+
+
+class Test_Metrics:
+    def test_span_records_duration_and_labels(self):
+        metrics = Metrics()
+        with metrics.span("read_file", extension=".pdf") as labels:
+            labels["pages"] = 3
+
+        [span] = metrics.spans
+        assert span["name"] == "read_file"
+        assert span["extension"] == ".pdf"
+        assert span["pages"] == 3
+        assert span["duration"] >= 0
+
+    def test_span_recorded_on_error(self):
+        metrics = Metrics()
+        try:
+            with metrics.span("get_response"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+        assert [span["name"] for span in metrics.spans] == ["get_response"]
+
+    def test_spans_are_bounded(self):
+        metrics = Metrics(max_spans=2)
+        for _ in range(5):
+            metrics.record("completion", 0.1)
+
+        assert len(metrics.spans) == 2
+        assert 'span_seconds_count{span="completion"} 5' in (
+            metrics.export_prometheus()
+        )
+
+    def test_export_jsonl(self, tmp_path):
+        metrics = Metrics()
+        metrics.record("main", 1.5)
+        metrics.record("completion", 0.5, model="llama3-8b-8192", tokens=10)
+
+        path = tmp_path / "metrics.jsonl"
+        metrics.export(str(path))
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["main", "completion"]
+        assert lines[1]["model"] == "llama3-8b-8192"
+        assert lines[1]["tokens"] == 10
+
+    def test_export_prometheus(self, tmp_path):
+        metrics = Metrics()
+        metrics.record("completion", 0.25, model="llama3-8b-8192", tokens=10)
+        metrics.record("completion", 0.75, model="llama3-8b-8192", tokens=20)
+        metrics.set_gauge("tokens_per_second", 42.0, model="llama3-8b-8192")
+
+        path = tmp_path / "metrics.prom"
+        metrics.export(str(path))
+        text = path.read_text()
+
+        labels = '{span="completion",model="llama3-8b-8192"}'
+        assert f"resume_enhancer_span_seconds_count{labels} 2" in text
+        assert f"resume_enhancer_span_seconds_sum{labels} 1.000000" in text
+        assert "# TYPE resume_enhancer_tokens_per_second gauge" in text
+        assert (
+            'resume_enhancer_tokens_per_second{model="llama3-8b-8192"} 42.000000'
+            in text
+        )
+
+
+## Test record_timings from completion.record_timings
+
+
+class Test_record_timings:
+    def test_record_timings_ttft_and_throughput(self):
+        metrics = Metrics()
+        usage = mock.Mock(completion_tokens=12)
+        chunks = [make_chunk("Hello "), make_chunk("world"), make_chunk(None, usage)]
+
+        with mock.patch("completion.get_metrics", return_value=metrics):
+            passed = list(record_timings(iter(chunks), "llama3-8b-8192", 0.0))
+
+        assert passed == chunks
+        names = [span["name"] for span in metrics.spans]
+        assert names == ["time_to_first_token", "completion"]
+        assert metrics.spans[1]["tokens"] == 12
+        assert ("tokens_per_second", (("model", "llama3-8b-8192"),)) in metrics.gauges
+
+
+## Test the stage spans of resume_enhancer.get_response
+
+
+class Test_get_response_spans:
+    def test_prompt_and_streamed_output_are_recorded(self, tmp_path):
+        metrics = Metrics()
+        with (
+            mock.patch("resume_enhancer.get_metrics", return_value=metrics),
+            mock.patch("app.utils.get_metrics", return_value=metrics),
+            mock.patch("sys.stdout"),
+        ):
+            get_response(
+                resume="Python developer",
+                description="Python and Kubernetes",
+                api_key=None,
+                output=[str(tmp_path / "result"), "txt"],
+                backend="keywords",
+            )
+
+        names = {span["name"] for span in metrics.spans}
+        assert {"get_response", "build_prompt", "write_to_file"} <= names
+        [write] = [span for span in metrics.spans if span["name"] == "write_to_file"]
+        assert write["path"].endswith("result_keyword-gap.txt")
+
+
+## Test profile from metrics.profile
+
+
+class Test_profile:
+    def test_profile_writes_cprofile_stats(self, tmp_path):
+        path = tmp_path / "run.prof"
+        with profile(str(path)):
+            sum(range(1000))
+
+        assert pstats.Stats(str(path)).total_calls > 0
+
+    def test_profile_disabled(self):
+        with profile(None):
+            pass
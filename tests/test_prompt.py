@@ -0,0 +1,131 @@
+from prompt import (  # type: ignore
+    build_messages,
+    build_section_messages,
+    compact_prompt,
+    estimate_tokens,
+    normalize_whitespace,
+    remove_boilerplate,
+    truncate_to_tokens,
+)
+from utils import read_pdf_file  # type: ignore
+from benchmarks.fixtures import make_pdf
+
+
+## Test build_messages from prompt.build_messages
+
+
+class Test_build_messages:
+    def test_build_messages(self):
+        messages = build_messages("Sample Resume", "Sample Job Description")
+        assert [message["role"] for message in messages] == ["system", "user"]
+        assert "Sample Resume" in messages[1]["content"]
+        assert "Sample Job Description" in messages[1]["content"]
+
+    def test_build_messages_stable_prefix_first(self):
+        first = build_messages("Resume one", "  Backend role\n")
+        second = build_messages("Resume two", "  Backend role\n")
+
+        assert first[0] == second[0]
+        prefix = "Job Description:\nBackend role\n\nResume:\n"
+        assert first[1]["content"] == prefix + "Resume one"
+        assert second[1]["content"] == prefix + "Resume two"
+
+    def test_build_section_messages_share_prefix(self):
+        skills = build_section_messages("skills", "Python", "Backend role")
+        education = build_section_messages("education", "BSc", "Backend role")
+
+        assert skills[0] == education[0]
+        assert skills[1]["content"].startswith("Job Description:\nBackend role\n\n")
+        assert skills[1]["content"].endswith("Resume section (skills):\nPython")
+
+
+## Test compaction helpers from prompt
+
+
+class Test_compaction:
+    def test_normalize_whitespace(self):
+        text = "  Jane   Doe \n\n\n\n\tPython  developer  "
+        assert normalize_whitespace(text) == "Jane Doe\n\nPython developer"
+
+    def test_remove_boilerplate(self):
+        pages = [
+            f"Jane Doe - Resume\nExperience {index}\nPage {index} of 3"
+            for index in range(1, 4)
+        ]
+        text = "\n".join(pages)
+        assert remove_boilerplate(text) == (
+            "Jane Doe - Resume\nExperience 1\nExperience 2\nExperience 3"
+        )
+
+    def test_remove_boilerplate_after_pdf_extraction(self, tmp_path):
+        pages = [
+            f"Jane Doe - Resume\nExperience {index}\nPage {index} of 3"
+            for index in range(1, 4)
+        ]
+        pdf_path = tmp_path / "resume.pdf"
+        pdf_path.write_bytes(make_pdf(pages))
+
+        text = remove_boilerplate(read_pdf_file(str(pdf_path)))
+        assert text.split("\n") == [
+            "Jane Doe - Resume",
+            "Experience 1",
+            "Experience 2",
+            "Experience 3",
+            "",
+        ]
+
+    def test_remove_boilerplate_keeps_phone_numbers_and_years(self):
+        text = "Jane Doe\n4165551234\nEducation\nBSc Computer Science\n2021\n7"
+        assert remove_boilerplate(text) == text
+
+    def test_remove_boilerplate_bare_page_numbers(self):
+        text = "Experience 1\n1\nExperience 2\n2\nExperience 3\n3"
+        assert remove_boilerplate(text) == "Experience 1\nExperience 2\nExperience 3"
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a, b") == 3
+        assert estimate_tokens("internationalization") == 5
+
+    def test_truncate_to_tokens(self):
+        assert truncate_to_tokens("one two three four", 2) == "one two"
+        assert truncate_to_tokens("one two", 10) == "one two"
+        assert truncate_to_tokens("one two", 0) == ""
+
+
+## Test compact_prompt from prompt.compact_prompt
+
+
+class Test_compact_prompt:
+    def test_compact_prompt_fits_budget(self):
+        resume = "word " * 5000
+        description = "Python developer wanted"
+
+        compacted_resume, compacted_description = compact_prompt(
+            resume, description, "llama3-8b-8192", 1024
+        )
+
+        assert compacted_description == description
+        total = estimate_tokens(compacted_resume) + estimate_tokens(
+            compacted_description
+        )
+        assert total < 8192 - 1024
+        assert len(compacted_resume) < len(resume)
+
+    def test_compact_prompt_shares_budget(self):
+        resume = "resume " * 400
+        description = "description " * 400
+
+        compacted_resume, compacted_description = compact_prompt(
+            resume, description, "small-model", 100, context_window=600
+        )
+
+        assert 0 < estimate_tokens(compacted_resume) <= 500
+        assert 0 < estimate_tokens(compacted_description) <= 500
+
+    def test_compact_prompt_keeps_short_documents(self):
+        resume, description = compact_prompt(
+            "Jane  Doe\n\n\n\nPython", "Backend   role", "llama3-8b-8192", 1024
+        )
+        assert resume == "Jane Doe\n\nPython"
+        assert description == "Backend role"
@@ -0,0 +1,158 @@
+from backends import make_chunk  # type: ignore
+from racing import LatencyHistory, race, min_length_check  # type: ignore
+from unittest import mock
+import threading
+import time
+
+MESSAGES = [{"role": "user", "content": "Resume"}]
+
+
+## Test race from racing.race
+
+
+class Test_race:
+    def setup_method(self):
+        # model -> (seconds before the first token, answer)
+        self.models = {}
+        self.closed = set()
+        self.started = []
+        self.client = mock.Mock()
+        self.client.chat.completions.create.side_effect = self.create
+
+    def create(self, model, **kwargs):
+        self.started.append(model)
+        delay, answer = self.models[model]
+
+        def stream():
+            try:
+                time.sleep(delay)
+                for word in answer.split(" "):
+                    yield make_chunk(word + " ")
+                    time.sleep(0.01)
+            finally:
+                self.closed.add(model)
+
+        return stream()
+
+    def jobs(self, *models):
+        return [(model, MESSAGES, 64) for model in models]
+
+    def test_first_acceptable_answer_wins(self):
+        self.models = {
+            "race-fast": (0.0, "word " * 30),
+            "race-slow": (0.3, "word " * 500),
+        }
+        model, content, _ = race(
+            self.client,
+            self.jobs("race-slow", "race-fast"),
+            accept=min_length_check(50),
+        )
+
+        assert model == "race-fast"
+        assert len(content) >= 50
+        # The loser's stream is closed instead of running to the end
+        time.sleep(0.5)
+        assert "race-slow" in self.closed
+
+    def test_short_answer_is_not_accepted(self):
+        self.models = {
+            "short-fast": (0.0, "Too short"),
+            "short-slow": (0.1, "word " * 30),
+        }
+        model, _, _ = race(
+            self.client,
+            self.jobs("short-fast", "short-slow"),
+            accept=min_length_check(50),
+        )
+        assert model == "short-slow"
+
+    def test_longest_answer_when_none_is_accepted(self):
+        self.models = {"none-a": (0.0, "a b"), "none-b": (0.0, "a b c d")}
+        model, _, _ = race(
+            self.client, self.jobs("none-a", "none-b"), accept=min_length_check(500)
+        )
+        assert model == "none-b"
+
+    def test_hedge_sends_backup_when_first_token_is_late(self):
+        self.models = {
+            "hedge-slow": (1.0, "word " * 30),
+            "hedge-backup": (0.0, "word " * 30),
+        }
+        started = time.perf_counter()
+        model, _, _ = race(
+            self.client,
+            self.jobs("hedge-slow", "hedge-backup"),
+            accept=min_length_check(10),
+            hedge_after=0.1,
+        )
+
+        assert model == "hedge-backup"
+        assert time.perf_counter() - started < 0.9
+
+    def test_hedge_skips_backup_when_first_token_is_on_time(self):
+        self.models = {
+            "ontime-first": (0.0, "word " * 30),
+            "ontime-backup": (0.0, "word " * 30),
+        }
+        model, _, _ = race(
+            self.client,
+            self.jobs("ontime-first", "ontime-backup"),
+            accept=min_length_check(10),
+            hedge_after=0.5,
+        )
+
+        assert model == "ontime-first"
+        assert self.started == ["ontime-first"]
+
+    def test_hedge_backup_when_first_model_fails(self):
+        self.models = {"failing-backup": (0.0, "word " * 30)}
+        model, _, _ = race(
+            self.client,
+            self.jobs("failing-first", "failing-backup"),
+            accept=min_length_check(10),
+            hedge_after=5.0,
+        )
+        assert model == "failing-backup"
+
+    def test_records_time_to_first_token(self):
+        self.models = {"history-a": (0.05, "word " * 30)}
+        history = LatencyHistory(path=None)
+        race(self.client, self.jobs("history-a"), history=history)
+        [sample] = history.samples["history-a"]
+        assert sample >= 0.05
+
+
+## Test LatencyHistory from racing.LatencyHistory
+
+
+class Test_LatencyHistory:
+    def test_percentile_needs_enough_samples(self, tmp_path):
+        history = LatencyHistory(path=str(tmp_path / "latency.json"))
+        for index in range(10):
+            history.add("model", index / 10)
+        assert history.percentile("model") is None
+
+        for index in range(10, 100):
+            history.add("model", index / 10)
+        assert history.percentile("model") == 9.5
+
+    def test_samples_persist(self, tmp_path):
+        path = str(tmp_path / "latency.json")
+        history = LatencyHistory(path=path, max_samples=3)
+        for seconds in [1.0, 2.0, 3.0, 4.0]:
+            history.add("model", seconds)
+        history.save()
+
+        assert LatencyHistory(path=path).samples == {"model": [2.0, 3.0, 4.0]}
+
+    def test_thread_safe_add(self):
+        history = LatencyHistory(path=None)
+        threads = [
+            threading.Thread(target=lambda: [history.add("m", 1.0) for _ in range(50)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(history.samples["m"]) == 100
@@ -0,0 +1,65 @@
+from registry import ModelRegistry  # type: ignore
+from unittest import mock
+import json
+import time
+
+MODELS = [
+    {"id": "llama3-8b-8192", "context_window": 8192, "active": True},
+    {
+        "id": "llama-3.1-8b-instant",
+        "context_window": 131072,
+        "max_completion_tokens": 8000,
+        "active": True,
+    },
+    {"id": "retired-model", "context_window": 4096, "active": False},
+]
+
+
+## Test ModelRegistry from registry.ModelRegistry
+
+
+class Test_ModelRegistry:
+    def setup_method(self):
+        self.patcher = mock.patch("registry.get_http_client")
+        self.mock_http = self.patcher.start()
+        self.mock_http.return_value.get.return_value.json.return_value = {
+            "object": "list",
+            "data": MODELS,
+        }
+
+    def teardown_method(self):
+        self.patcher.stop()
+
+    def test_models_cached_on_disk(self, tmp_path):
+        path = str(tmp_path / "models.json")
+        assert ModelRegistry("key", path=path).models() == MODELS
+        # A new registry reads the listing from disk, no second request
+        assert ModelRegistry("key", path=path).models() == MODELS
+        assert self.mock_http.return_value.get.call_count == 1
+
+    def test_stale_models_refreshed_in_background(self, tmp_path):
+        path = tmp_path / "models.json"
+        path.write_text(json.dumps({"fetched_at": time.time() - 100, "data": []}))
+
+        registry = ModelRegistry("key", path=str(path), ttl=10)
+        # The stale listing is served right away
+        assert registry.models() == []
+        registry._refreshing.join(timeout=5)
+        assert registry.models() == MODELS
+        assert json.loads(path.read_text())["data"] == MODELS
+
+    def test_validate_suggests_close_match(self):
+        registry = ModelRegistry("key", path=None)
+        assert registry.validate(["llama3-8b-8192"]) == []
+        assert registry.validate(["llama3-8b-8129"]) == [
+            "Unknown model: llama3-8b-8129, did you mean llama3-8b-8192?"
+        ]
+        assert registry.validate(["retired-model"]) == ["Unknown model: retired-model"]
+
+    def test_model_budgets(self):
+        registry = ModelRegistry("key", path=None)
+        assert registry.context_window("llama-3.1-8b-instant") == 131072
+        assert registry.max_tokens("llama-3.1-8b-instant", 16000) == 8000
+        assert registry.max_tokens("llama3-8b-8192", 1024) == 1024
+        # Unknown models fall back to the built-in table
+        assert registry.context_window("mixtral-8x7b-32768") == 32768
@@ -1,7 +1,11 @@
 from resume_enhancer import get_response, get_version  # type: ignore
 from config import TOOL_NAME, VERSION  # type: ignore
+from cache import ResponseCache  # type: ignore
 from unittest import mock
 from io import StringIO
+from types import SimpleNamespace
+import json
+import time
 import pytest  # type: ignore
 
 
@@ -12,7 +16,7 @@ class Test_GetResponse:
 
     def setup_method(self):
         # Mock the Groq client and its completions method
-        self.patcher = mock.patch("resume_enhancer.Groq")
+        self.patcher = mock.patch("resume_enhancer.get_client")
         self.mock_groq = self.patcher.start()  # Start the patch
 
         self.mock_client_instance = mock.Mock()
@@ -102,39 +106,80 @@ class Test_GetResponse:
         assert "Processing with model: model1" in output
         assert "Processing with model: model2" in output
 
-    def test_get_response_with_output(self):
-        # Test with output specified, should call write_to_file
-        with mock.patch("resume_enhancer.write_to_file") as mock_write:
-            get_response(
-                resume="Sample Resume",
-                description="Sample Job Description",
-                api_key="test_api_key",
-                output=["output_filename"],
-            )
-            file_name = "output_filename_llama3-8b-8192.txt"
-            mock_write.assert_called_once_with(file_name, "Mocked response content")
+    def test_get_response_with_output(self, tmp_path):
+        # Test with output specified, the response is written to the file
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            output=[str(tmp_path / "output_filename")],
+        )
+        file_name = tmp_path / "output_filename_llama3-8b-8192.txt"
+        assert file_name.read_text() == "Mocked response content"
+        assert not (tmp_path / "output_filename_llama3-8b-8192.txt.part").exists()
+
+    def test_get_response_multiple_model_with_output(self, tmp_path):
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            models=["model1", "model2"],
+            output=[str(tmp_path / "output_filename")],
+        )
 
-    def test_get_response_multiple_model_with_output(self):
-        # Patch the write_to_file function
-        with mock.patch("resume_enhancer.write_to_file") as mock_write:
+        # Every model gets its own output file
+        for model in ["model1", "model2"]:
+            file_name = tmp_path / f"output_filename_{model}.txt"
+            assert file_name.read_text() == "Mocked response content"
+
+    def test_get_response_stream_with_output(self, tmp_path):
+        # Streaming to the terminal and to a file in the same run
+        self.mock_client_instance.chat.completions.create.return_value = [
+            mock.Mock(choices=[mock.Mock(delta=mock.Mock(content=part))])
+            for part in ["Mocked ", "streamed ", "content"]
+        ]
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
             get_response(
                 resume="Sample Resume",
                 description="Sample Job Description",
                 api_key="test_api_key",
-                models=["model1", "model2"],
-                output=["output_filename"],
+                output=[str(tmp_path / "output_filename")],
+                stream=True,
             )
 
-            # Define the expected file names and calls
-            file_name_model1 = "output_filename_model1.txt"
-            file_name_model2 = "output_filename_model2.txt"
-            expected_calls = [
-                mock.call(file_name_model1, "Mocked response content"),
-                mock.call(file_name_model2, "Mocked response content"),
-            ]
+        assert "Mocked streamed content" in mock_stdout.getvalue()
+        file_name = tmp_path / "output_filename_llama3-8b-8192.txt"
+        assert file_name.read_text() == "Mocked streamed content"
 
-            # Use assert_has_calls to check for multiple calls in order
-            mock_write.assert_has_calls(expected_calls, any_order=False)
+    def test_get_response_output_kept_when_stream_fails(self, tmp_path):
+        def broken_stream():
+            yield mock.Mock(choices=[mock.Mock(delta=mock.Mock(content="Partial"))])
+            raise ConnectionError("stream dropped")
+
+        self.mock_client_instance.chat.completions.create.return_value = broken_stream()
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            output=[str(tmp_path / "output_filename")],
+        )
+
+        assert not (tmp_path / "output_filename_llama3-8b-8192.txt").exists()
+        part = tmp_path / "output_filename_llama3-8b-8192.txt.part"
+        assert part.read_text() == "Partial"
+
+    def test_get_response_no_part_file_when_request_fails(self, tmp_path):
+        self.mock_client_instance.chat.completions.create.side_effect = ValueError(
+            "401 Invalid API Key"
+        )
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            output=[str(tmp_path / "output_filename")],
+        )
+
+        assert list(tmp_path.iterdir()) == []
 
     def test_get_response_with_token_usage(self):
         # Capture stderr to check for token usage info
@@ -159,6 +204,241 @@ class Test_GetResponse:
         assert "- Queue Time: 0.100 seconds" in stderr_output
         assert "- Total Time: 0.600 seconds" in stderr_output
 
+    def test_get_response_concurrent_with_output(self, tmp_path):
+        # Every model should still get its own output file
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            models=["model1", "model2", "model3"],
+            output=[str(tmp_path / "output_filename")],
+            concurrency=3,
+        )
+
+        for model in ["model1", "model2", "model3"]:
+            file_name = tmp_path / f"output_filename_{model}.txt"
+            assert file_name.read_text() == "Mocked response content"
+
+    def test_get_response_concurrent_runs_models_together(self):
+        # Wall-clock time should be close to one request, not the sum of all
+        chunks = self.mock_client_instance.chat.completions.create.return_value
+
+        def slow_create(**kwargs):
+            time.sleep(0.3)
+            return chunks
+
+        self.mock_client_instance.chat.completions.create.side_effect = slow_create
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            started = time.perf_counter()
+            get_response(
+                resume="Sample Resume",
+                description="Sample Job Description",
+                api_key="test_api_key",
+                models=["model1", "model2", "model3"],
+                concurrency=3,
+            )
+            elapsed = time.perf_counter() - started
+            output = mock_stdout.getvalue()
+
+        assert elapsed < 0.8
+        assert output.count("Mocked response content") == 3
+
+    def test_get_response_cache_hit_skips_request(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        for _ in range(2):
+            with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+                get_response(
+                    resume="Sample Resume",
+                    description="Sample Job Description",
+                    api_key="test_api_key",
+                    cache=cache,
+                )
+            assert "Mocked response content" in mock_stdout.getvalue()
+
+        assert self.mock_client_instance.chat.completions.create.call_count == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_get_response_caches_usage_without_token_usage(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            cache=cache,
+        )
+
+        [(_, _, path)] = cache.entries()
+        with open(path) as f:
+            assert json.load(f)["usage"]["total_tokens"] == 150
+
+    def test_get_response_token_usage_without_x_groq(self, tmp_path):
+        self.mock_client_instance.chat.completions.create.return_value = [
+            SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content="Answer"))]
+            )
+        ]
+        with mock.patch("resume_enhancer.logger") as mock_logger:
+            get_response(
+                resume="Sample Resume",
+                description="Sample Job Description",
+                api_key="test_api_key",
+                output=[str(tmp_path / "output_filename")],
+                token_usage=True,
+            )
+
+        mock_logger.error.assert_not_called()
+        mock_logger.warning.assert_called_once()
+        file_name = tmp_path / "output_filename_llama3-8b-8192.txt"
+        assert file_name.read_text() == "Answer"
+
+    def test_get_response_refresh_bypasses_cache(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        for _ in range(2):
+            get_response(
+                resume="Sample Resume",
+                description="Sample Job Description",
+                api_key="test_api_key",
+                cache=cache,
+                refresh=True,
+            )
+
+        assert self.mock_client_instance.chat.completions.create.call_count == 2
+
+    def test_get_response_token_usage_shows_cache_counters(self, tmp_path):
+        cache = ResponseCache(directory=str(tmp_path))
+        with mock.patch("sys.stderr", new_callable=StringIO) as mock_stderr:
+            for _ in range(2):
+                get_response(
+                    resume="Sample Resume",
+                    description="Sample Job Description",
+                    api_key="test_api_key",
+                    token_usage=True,
+                    cache=cache,
+                )
+            stderr_output = mock_stderr.getvalue()
+
+        assert "- Served from cache, no tokens used" in stderr_output
+        assert "- Hits: 1" in stderr_output
+        assert "- Misses: 1" in stderr_output
+
+    def test_get_response_compact(self):
+        get_response(
+            resume="Jane   Doe\n\n\n\nPage 1 of 2\nPython",
+            description="Backend    role",
+            api_key="test_api_key",
+            compact=True,
+        )
+
+        messages = self.mock_client_instance.chat.completions.create.call_args.kwargs[
+            "messages"
+        ]
+        assert "Jane Doe\n\nPython" in messages[1]["content"]
+        assert "Page 1 of 2" not in messages[1]["content"]
+        assert "Backend role" in messages[1]["content"]
+
+    def test_get_response_sections(self):
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            get_response(
+                resume="Skills\nPython\n\nExperience\nBackend engineer",
+                description="Sample Job Description",
+                api_key="test_api_key",
+                sections=True,
+            )
+            output = mock_stdout.getvalue()
+
+        # One request per section, merged into one report
+        assert self.mock_client_instance.chat.completions.create.call_count == 2
+        assert "## Experience\n\nMocked response content" in output
+        assert "## Skills\n\nMocked response content" in output
+
+    def test_get_response_sections_fallback(self):
+        get_response(
+            resume="A resume without any headings",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            sections=True,
+        )
+        assert self.mock_client_instance.chat.completions.create.call_count == 1
+
+    def test_get_response_registry_budget(self):
+        registry = mock.Mock()
+        registry.max_tokens.return_value = 512
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            max_token=4096,
+            registry=registry,
+        )
+
+        registry.max_tokens.assert_called_with("llama3-8b-8192", 4096)
+        kwargs = self.mock_client_instance.chat.completions.create.call_args.kwargs
+        assert kwargs["max_tokens"] == 512
+
+    def test_get_response_structured_output(self, tmp_path):
+        result = '{"match_score": 80, "missing_keywords": ["Go"]}'
+        self.mock_client_instance.chat.completions.create.return_value = [
+            mock.Mock(choices=[mock.Mock(delta=mock.Mock(content=result))])
+        ]
+        get_response(
+            resume="Sample Resume",
+            description="Sample Job Description",
+            api_key="test_api_key",
+            output=[str(tmp_path / "output_filename")],
+            structured=True,
+        )
+
+        file_name = tmp_path / "output_filename_llama3-8b-8192.json"
+        data = json.loads(file_name.read_text())
+        assert data["match_score"] == 80
+        assert data["missing_keywords"] == ["Go"]
+        assert data["suggested_edits"] == []
+
+    def test_get_response_structured_stream(self):
+        self.mock_client_instance.chat.completions.create.return_value = [
+            mock.Mock(choices=[mock.Mock(delta=mock.Mock(content=part))])
+            for part in ['{"match_score": 6', '5, "missing_keywords": ["Go"', "]}"]
+        ]
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            get_response(
+                resume="Sample Resume",
+                description="Sample Job Description",
+                api_key="test_api_key",
+                stream=True,
+                structured=True,
+            )
+
+        output = mock_stdout.getvalue()
+        assert "match_score: 65" in output
+        assert "- missing_keywords: Go" in output
+
+    def test_get_response_race(self):
+        def create(model, **kwargs):
+            if model == "slow-model":
+                time.sleep(0.3)
+            return [
+                mock.Mock(
+                    choices=[mock.Mock(delta=mock.Mock(content=f"{model} answer"))],
+                    x_groq=None,
+                )
+            ]
+
+        self.mock_client_instance.chat.completions.create.side_effect = create
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            get_response(
+                resume="Sample Resume",
+                description="Sample Job Description",
+                api_key="test_api_key",
+                models=["slow-model", "fast-model"],
+                race=True,
+                race_min_chars=5,
+            )
+            output = mock_stdout.getvalue()
+
+        assert "Racing models: slow-model, fast-model" in output
+        assert "fast-model answer" in output
+        assert "slow-model answer" not in output
+
     def test_get_version(self):
         # Test that the version is returned correctly
         assert TOOL_NAME == "Resume Enhancer Tool"
@@ -0,0 +1,129 @@
+from scheduler import RequestScheduler, parse_duration  # type: ignore
+from unittest import mock
+import httpx
+import pytest  # type: ignore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = mock.Mock(headers=headers or {})
+
+
+## Test parse_duration from scheduler.parse_duration
+
+
+class Test_parse_duration:
+    def test_parse_duration(self):
+        assert parse_duration("7.66s") == pytest.approx(7.66)
+        assert parse_duration("2m59.56s") == pytest.approx(179.56)
+        assert parse_duration("1h2m") == pytest.approx(3720)
+        assert parse_duration("120ms") == pytest.approx(0.12)
+        assert parse_duration("3") == 3.0
+        assert parse_duration(None) is None
+        assert parse_duration("soon") is None
+
+
+## Test RequestScheduler from scheduler.RequestScheduler
+
+
+class Test_RequestScheduler:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.scheduler = RequestScheduler(
+            base_delay=1.0, sleep=self.clock.sleep, clock=self.clock
+        )
+
+    def test_waits_for_request_quota_reset(self):
+        self.scheduler.observe(
+            "model1",
+            {
+                "x-ratelimit-limit-requests": "30",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "2.5s",
+            },
+        )
+
+        self.scheduler.acquire("model1")
+        assert self.clock.sleeps == [2.5]
+        # The quota is refilled after the reset, minus this request
+        assert self.scheduler.limits["model1"].remaining_requests == 29
+
+    def test_waits_for_token_quota_reset(self):
+        self.scheduler.observe(
+            "model1",
+            {
+                "x-ratelimit-remaining-tokens": "500",
+                "x-ratelimit-reset-tokens": "7s",
+            },
+        )
+
+        self.scheduler.acquire("model1", tokens=100)
+        assert self.clock.sleeps == []
+        self.scheduler.acquire("model1", tokens=1000)
+        assert self.clock.sleeps == [7.0]
+
+    def test_limits_are_per_model(self):
+        self.scheduler.observe(
+            "model1",
+            {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "5s"},
+        )
+        assert self.scheduler.wait_time("model2") == 0
+        assert self.scheduler.wait_time("model1") == 5
+
+    def test_observe_response_reads_model_from_request(self):
+        request = httpx.Request(
+            "POST", "https://api.groq.com", json={"model": "model1"}
+        )
+        response = httpx.Response(
+            200,
+            headers={"x-ratelimit-remaining-tokens": "42"},
+            request=request,
+        )
+
+        self.scheduler.observe_response(response)
+        assert self.scheduler.limits["model1"].remaining_tokens == 42
+
+    def test_call_retries_with_backoff(self):
+        request = mock.Mock(side_effect=[StatusError(503), StatusError(500), "done"])
+
+        with mock.patch("scheduler.random.uniform", side_effect=lambda a, b: b):
+            assert self.scheduler.call("model1", request) == "done"
+        assert self.clock.sleeps == [1.0, 2.0]
+
+    def test_call_honours_retry_after(self):
+        request = mock.Mock(
+            side_effect=[StatusError(429, {"retry-after": "10"}), "done"]
+        )
+
+        assert self.scheduler.call("model1", request) == "done"
+        assert self.clock.sleeps == [10.0]
+
+    def test_call_does_not_retry_client_errors(self):
+        request = mock.Mock(side_effect=StatusError(400))
+
+        with pytest.raises(StatusError):
+            self.scheduler.call("model1", request)
+        assert request.call_count == 1
+
+    def test_call_gives_up_after_max_retries(self):
+        self.scheduler.max_retries = 2
+        request = mock.Mock(side_effect=StatusError(503))
+
+        with pytest.raises(StatusError):
+            self.scheduler.call("model1", request)
+        assert request.call_count == 3
@@ -0,0 +1,106 @@
+from backends import make_chunk  # type: ignore
+from sections import split_sections, merge_usage, enhance_sections  # type: ignore
+from unittest import mock
+import threading
+import time
+
+RESUME = """Jane Doe
+jane@example.com
+
+SKILLS:
+Python, Django, PostgreSQL
+
+Work Experience
+Backend engineer at Acme, 2020-2024
+- Built REST APIs
+
+Education
+BSc Computer Science
+
+Projects
+Resume Enhancer CLI
+"""
+
+
+## Test split_sections from sections.split_sections
+
+
+class Test_split_sections:
+    def test_split_sections_in_report_order(self):
+        sections = split_sections(RESUME)
+
+        assert list(sections) == ["experience", "projects", "skills", "education"]
+        assert sections["skills"] == "Python, Django, PostgreSQL"
+        assert sections["experience"].startswith("Backend engineer at Acme")
+        # Contact details before the first heading are not sent
+        assert all("jane@example.com" not in text for text in sections.values())
+
+    def test_split_sections_merges_repeated_headings(self):
+        sections = split_sections("Skills\nPython\nEducation\nBSc\nSkills\nGo\n")
+        assert sections["skills"] == "Python\nGo"
+
+    def test_split_sections_no_headings(self):
+        assert split_sections("Just a paragraph about me and my work") == {}
+
+
+## Test merge_usage from sections.merge_usage
+
+
+class Test_merge_usage:
+    def test_merge_usage_sums_tokens(self):
+        usage = dict(
+            completion_tokens=10,
+            prompt_tokens=5,
+            total_tokens=15,
+            completion_time=0.2,
+            prompt_time=0.1,
+            queue_time=0.05,
+            total_time=0.35,
+        )
+        merged = merge_usage([mock.Mock(**usage), None, mock.Mock(**usage)])
+
+        assert merged.total_tokens == 30
+        assert merged.total_time == 0.35
+
+    def test_merge_usage_all_cached(self):
+        assert merge_usage([None, None]) is None
+
+
+## Test enhance_sections from sections.enhance_sections
+
+
+class Test_enhance_sections:
+    def test_enhance_sections_runs_concurrently(self):
+        client = mock.Mock()
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def create(messages, **kwargs):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.1)
+            with lock:
+                running.pop()
+            section = messages[1]["content"].split("section (")[1].split(")")[0]
+            return [make_chunk(f"Tips for {section}")]
+
+        client.chat.completions.create.side_effect = create
+        report, usage = enhance_sections(
+            client, split_sections(RESUME), "Backend role", "llama3-8b-8192"
+        )
+
+        assert max(peak) == 4
+        assert report.index("## Experience") < report.index("## Skills")
+        assert "Tips for skills" in report
+        assert usage is None
+
+    def test_enhance_sections_reports_failed_section(self):
+        client = mock.Mock()
+        client.chat.completions.create.side_effect = ValueError("bad request")
+
+        report, _ = enhance_sections(
+            client, {"skills": "Python"}, "Backend role", "llama3-8b-8192"
+        )
+        assert "Failed to enhance this section: bad request" in report
@@ -0,0 +1,169 @@
+from backends import make_chunk  # type: ignore
+from server import EnhancerServer  # type: ignore
+from unittest import mock
+import base64
+import json
+import threading
+import time
+import httpx
+
+
+## Test EnhancerServer from server.EnhancerServer
+
+
+class Test_EnhancerServer:
+    def setup_method(self):
+        self.patcher = mock.patch("server.get_groq_client")
+        self.mock_groq = self.patcher.start()
+        self.mock_client_instance = self.mock_groq.return_value
+        self.mock_client_instance.chat.completions.create.side_effect = (
+            lambda **kwargs: [make_chunk("Mocked "), make_chunk("server content")]
+        )
+
+        self.server = EnhancerServer(("127.0.0.1", 0), api_key="test_api_key")
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.patcher.stop()
+
+    def test_health(self):
+        response = httpx.get(f"{self.url}/health")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+
+    def test_enhance(self):
+        response = httpx.post(
+            f"{self.url}/enhance",
+            json={
+                "resume": "Sample Resume",
+                "description": "Sample Job Description",
+                "models": ["model1", "model2"],
+            },
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["model"] for result in results] == ["model1", "model2"]
+        assert all(result["content"] == "Mocked server content" for result in results)
+
+    def test_enhance_upload(self):
+        response = httpx.post(
+            f"{self.url}/enhance",
+            json={
+                "resume": {
+                    "filename": "resume.txt",
+                    "content": base64.b64encode(b"Uploaded Resume").decode(),
+                },
+                "description": "Sample Job Description",
+            },
+        )
+
+        assert response.status_code == 200
+        messages = self.mock_client_instance.chat.completions.create.call_args.kwargs[
+            "messages"
+        ]
+        assert "Uploaded Resume" in messages[1]["content"]
+
+    def test_enhance_stream(self):
+        with httpx.stream(
+            "POST",
+            f"{self.url}/enhance",
+            json={
+                "resume": "Sample Resume",
+                "description": "Sample Job Description",
+                "stream": True,
+            },
+        ) as response:
+            assert response.headers["content-type"] == "application/x-ndjson"
+            events = [json.loads(line) for line in response.iter_lines() if line]
+
+        assert "".join(event.get("content", "") for event in events) == (
+            "Mocked server content"
+        )
+        assert events[-1] == {"model": "llama3-8b-8192", "done": True}
+
+    def test_enhance_stream_stops_when_the_client_leaves(self):
+        produced = []
+        closed = threading.Event()
+
+        def endless_stream(**kwargs):
+            try:
+                for index in range(1000):
+                    produced.append(index)
+                    time.sleep(0.01)
+                    yield make_chunk(f"piece {index} ")
+            finally:
+                closed.set()
+
+        self.mock_client_instance.chat.completions.create.side_effect = endless_stream
+        jobs, options = self.server.prepare(
+            {"resume": "Sample Resume", "description": "Sample Job Description"}
+        )
+
+        events = self.server.enhance_stream(jobs, options)
+        assert next(events)["content"] == "piece 0 "
+        events.close()
+
+        # The upstream stream is closed instead of drained for nobody
+        assert closed.wait(2)
+        assert len(produced) < 1000
+
+    def test_enhance_missing_field(self):
+        response = httpx.post(f"{self.url}/enhance", json={"resume": "Sample Resume"})
+        assert response.status_code == 400
+        assert response.json()["error"] == "Missing field: description"
+
+    def test_enhance_oversized_txt_upload(self):
+        self.server.read_options = {"max_bytes": 1024}
+        response = httpx.post(
+            f"{self.url}/enhance",
+            json={
+                "resume": {
+                    "filename": "resume.txt",
+                    "content": base64.b64encode(b"x" * 2048).decode(),
+                },
+                "description": "Sample Job Description",
+            },
+        )
+
+        assert response.status_code == 413
+        assert response.json()["error"] == (
+            "resume.txt is 2048 bytes, documents are limited to 1024"
+        )
+        self.mock_client_instance.chat.completions.create.assert_not_called()
+
+    def test_enhance_inline_text_gets_char_limit(self):
+        self.server.read_options = {"max_chars": 12}
+        response = httpx.post(
+            f"{self.url}/enhance",
+            json={
+                "resume": "Sample Resume with a long tail",
+                "description": "Sample Job Description",
+            },
+        )
+
+        assert response.status_code == 200
+        messages = self.mock_client_instance.chat.completions.create.call_args.kwargs[
+            "messages"
+        ]
+        assert "Sample Resum" in messages[1]["content"]
+        assert "long tail" not in messages[1]["content"]
+
+    def test_enhance_unsupported_upload(self):
+        response = httpx.post(
+            f"{self.url}/enhance",
+            json={
+                "resume": {"filename": "resume.exe", "content": ""},
+                "description": "Sample Job Description",
+            },
+        )
+        assert response.status_code == 400
+        assert response.json()["error"] == "Unsupported file type: .exe"
+
+    def test_unknown_path(self):
+        assert httpx.get(f"{self.url}/missing").status_code == 404
@@ -0,0 +1,294 @@
+from singleflight import (  # type: ignore
+    AsyncSingleFlight,
+    FlightCancelled,
+    SingleFlight,
+)
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import asyncio
+import threading
+import pytest  # type: ignore
+
+
+## Test SingleFlight from singleflight.SingleFlight
+
+
+class Test_SingleFlight:
+    def setup_method(self):
+        self.flights = SingleFlight()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def start(self):
+        self.calls += 1
+
+        def stream():
+            yield "first "
+            # Hold the flight open until every caller has joined
+            self.release.wait(timeout=5)
+            yield "second"
+
+        return stream()
+
+    def test_identical_requests_share_one_call(self):
+        streams = [self.flights.stream("key", self.start) for _ in range(5)]
+        self.release.set()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda s: "".join(s), streams))
+
+        assert results == ["first second"] * 5
+        assert self.calls == 1
+        assert (self.flights.started, self.flights.joined) == (1, 4)
+
+    def test_late_joiner_replays_from_the_start(self):
+        leader = self.flights.stream("key", self.start)
+        assert next(leader) == "first "
+        joiner = self.flights.stream("key", self.start)
+        self.release.set()
+
+        assert "".join(joiner) == "first second"
+        assert "".join(leader) == "second"
+        assert self.calls == 1
+
+    def test_different_keys_do_not_coalesce(self):
+        self.release.set()
+        assert "".join(self.flights.stream("a", self.start)) == "first second"
+        assert "".join(self.flights.stream("b", self.start)) == "first second"
+        assert self.calls == 2
+
+    def test_finished_flight_is_not_reused(self):
+        self.release.set()
+        "".join(self.flights.stream("key", self.start))
+        "".join(self.flights.stream("key", self.start))
+        assert self.calls == 2
+
+    def test_error_reaches_every_waiter(self):
+        def broken():
+            yield "Partial"
+            self.release.wait(timeout=5)
+            raise ConnectionError("stream dropped")
+
+        streams = [self.flights.stream("key", broken) for _ in range(3)]
+        self.release.set()
+        for stream in streams:
+            assert next(stream) == "Partial"
+            with pytest.raises(ConnectionError, match="stream dropped"):
+                next(stream)
+
+    def test_last_subscriber_leaving_cancels_upstream(self):
+        closed = threading.Event()
+
+        def endless():
+            def stream():
+                try:
+                    while True:
+                        yield "chunk"
+                        self.release.wait(timeout=0.01)
+                finally:
+                    closed.set()
+
+            return stream()
+
+        stream = self.flights.stream("key", endless)
+        assert next(stream) == "chunk"
+        stream.close()
+
+        assert closed.wait(timeout=2)
+        # A new caller starts a fresh request instead of the cancelled one
+        assert next(self.flights.stream("key", self.start)) == "first "
+        self.release.set()
+
+    def test_joined_subscriber_keeps_flight_alive(self):
+        def chunks():
+            def stream():
+                for index in range(3):
+                    yield f"c{index}"
+                    self.release.wait(timeout=0.05)
+
+            return stream()
+
+        first = self.flights.stream("key", chunks)
+        # Joined, but not reading yet
+        second = self.flights.stream("key", chunks)
+        assert next(first) == "c0"
+        first.close()
+        assert list(second) == ["c0", "c1", "c2"]
+
+    def test_cancelled_flight_ends_with_an_error(self):
+        flight, _ = self.flights.join("key")
+        flight.remove_subscriber()
+        assert flight.cancelled
+        flight.run(lambda: iter(["c0", "c1"]))
+        assert isinstance(flight.error, FlightCancelled)
+
+    def test_closing_before_the_first_read_leaves_the_flight(self):
+        stream = self.flights.stream("key", self.start)
+        stream.close()
+        self.release.set()
+        flight, leader = self.flights.join("key")
+        assert leader
+
+    @mock.patch("singleflight.FLIGHT_BUFFER_CHUNKS", 8)
+    @mock.patch("singleflight.FLIGHT_REPLAY_CHUNKS", 4)
+    def test_read_chunks_are_dropped_past_the_replay_window(self):
+        flight, _ = self.flights.join("key")
+        stream = flight.subscribe()
+        thread = threading.Thread(
+            target=flight.run, args=(lambda: (f"c{i}" for i in range(1000)),)
+        )
+        thread.start()
+
+        sizes = []
+        for index, chunk in enumerate(stream):
+            assert chunk == f"c{index}"
+            sizes.append(len(flight.chunks))
+        thread.join(timeout=5)
+        assert index == 999
+        assert max(sizes) <= 8
+
+    @mock.patch("singleflight.FLIGHT_BUFFER_CHUNKS", 8)
+    @mock.patch("singleflight.FLIGHT_REPLAY_CHUNKS", 4)
+    def test_upstream_waits_for_the_slowest_subscriber(self):
+        read = []
+
+        def start():
+            def stream():
+                for index in range(100):
+                    read.append(index)
+                    yield f"c{index}"
+
+            return stream()
+
+        slow = self.flights.stream("key", start)
+        fast = self.flights.stream("key", start)
+        assert next(slow) == "c0"
+        consumer = ThreadPoolExecutor(max_workers=1).submit(lambda: list(fast))
+        # Without reads from the slow subscriber the upstream stops at the bound
+        self.release.wait(timeout=0.2)
+        assert len(read) <= 9
+        assert not consumer.done()
+
+        assert list(slow) == [f"c{index}" for index in range(1, 100)]
+        assert len(consumer.result(timeout=5)) == 100
+
+    @mock.patch("singleflight.FLIGHT_REPLAY_CHUNKS", 1)
+    def test_late_caller_starts_a_new_flight_once_trimmed(self):
+        leader = self.flights.stream("key", self.start)
+        assert next(leader) == "first "
+        # Not trimmed yet, the first chunk is within the replay window
+        joiner = self.flights.stream("key", self.start)
+        assert self.calls == 1
+        self.release.set()
+        assert "".join(leader) + "".join(joiner) == "secondfirst second"
+
+        self.release.clear()
+        leader = self.flights.stream("key", self.start)
+        assert next(leader) == "first "
+        self.release.set()
+        assert next(leader) == "second"
+        # Both chunks were read by everyone, the flight can no longer replay
+        late = self.flights.stream("key", self.start)
+        assert "".join(late) == "first second"
+        assert self.calls == 3
+
+
+## Test AsyncSingleFlight from singleflight.AsyncSingleFlight
+
+
+class Test_AsyncSingleFlight:
+    def test_identical_requests_share_one_call(self):
+        calls = []
+
+        async def start():
+            calls.append(1)
+
+            async def stream():
+                for piece in ["first ", "second"]:
+                    await asyncio.sleep(0.01)
+                    yield piece
+
+            return stream()
+
+        async def collect(stream):
+            return "".join([piece async for piece in stream])
+
+        async def main():
+            flights = AsyncSingleFlight()
+            streams = [flights.stream("key", start) for _ in range(5)]
+            return await asyncio.gather(*(collect(stream) for stream in streams))
+
+        assert asyncio.run(main()) == ["first second"] * 5
+        assert len(calls) == 1
+
+    def test_error_reaches_every_waiter(self):
+        async def start():
+            raise ConnectionError("refused")
+
+        async def main():
+            flights = AsyncSingleFlight()
+            streams = [flights.stream("key", start) for _ in range(2)]
+            for stream in streams:
+                with pytest.raises(ConnectionError, match="refused"):
+                    async for _ in stream:
+                        pass
+
+        asyncio.run(main())
+
+    def test_last_subscriber_leaving_closes_upstream(self):
+        read = []
+        closed = []
+
+        class Upstream:
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                await asyncio.sleep(0.01)
+                read.append(1)
+                return "chunk"
+
+            async def close(self):
+                closed.append(1)
+
+        async def start():
+            return Upstream()
+
+        async def main():
+            flights = AsyncSingleFlight()
+            stream = flights.stream("key", start)
+            assert await stream.__anext__() == "chunk"
+            await stream.aclose()
+            await asyncio.sleep(0.2)
+
+        asyncio.run(main())
+        assert closed == [1]
+        assert len(read) <= 2
+
+    @mock.patch("singleflight.FLIGHT_BUFFER_CHUNKS", 4)
+    def test_upstream_waits_for_the_slowest_subscriber(self):
+        read = []
+
+        async def start():
+            async def stream():
+                for index in range(50):
+                    read.append(index)
+                    yield f"c{index}"
+
+            return stream()
+
+        async def collect(stream):
+            return [chunk async for chunk in stream]
+
+        async def main():
+            flights = AsyncSingleFlight()
+            slow = flights.stream("key", start)
+            fast = flights.stream("key", start)
+            assert await slow.__anext__() == "c0"
+            consumer = asyncio.ensure_future(collect(fast))
+            await asyncio.sleep(0.1)
+            assert len(read) <= 5
+            rest = await collect(slow)
+            assert len(await asyncio.wait_for(consumer, 5)) == 50
+            return rest
+
+        assert asyncio.run(main()) == [f"c{index}" for index in range(1, 50)]
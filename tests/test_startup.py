@@ -0,0 +1,17 @@
+from benchmarks.bench_startup import check, import_time
+
+
+## Test CLI start-up from benchmarks.bench_startup
+
+
+class Test_startup:
+    def test_cli_import_skips_heavy_modules(self):
+        _, heavy = import_time()
+        assert heavy == []
+
+    def test_cli_import_within_budget(self):
+        # Generous budget so that only real regressions fail on slow machines,
+        # use `python -m benchmarks.bench_startup` for the strict check
+        cumulative, heavy = import_time()
+        result = {"import_ms": cumulative, "heavy_modules": heavy}
+        assert check(result, budget_ms=500) == []
@@ -0,0 +1,87 @@
+from structured import (  # type: ignore
+    JsonStreamParser,
+    build_json_messages,
+    format_event,
+    normalize_result,
+    parse_result,
+)
+import json
+import pytest  # type: ignore
+
+RESULT = {
+    "match_score": 72,
+    "missing_keywords": ["Kubernetes", "Terraform"],
+    "suggested_edits": [
+        {"section": "Skills", "current": "Docker", "suggestion": "Docker, Kubernetes"}
+    ],
+    "summary": 'Strong backend match, "cloud" experience is thin.',
+}
+
+
+## Test JsonStreamParser from structured.JsonStreamParser
+
+
+class Test_JsonStreamParser:
+    def test_events_arrive_before_the_stream_ends(self):
+        text = json.dumps(RESULT, indent=2)
+        parser = JsonStreamParser()
+        seen = []
+        for index, char in enumerate(text):
+            for event in parser.feed(char):
+                seen.append((index, event))
+
+        events = [event for _, event in seen]
+        assert events[0] == {"field": "match_score", "value": 72}
+        assert {"field": "missing_keywords", "item": "Kubernetes"} in events
+        assert {"field": "missing_keywords", "value": RESULT["missing_keywords"]} in (
+            events
+        )
+        assert events[-1] == {"field": "summary", "value": RESULT["summary"]}
+        # The score is known long before the last chunk
+        assert seen[0][0] < len(text) // 4
+        assert parser.close() == RESULT
+
+    def test_skips_code_fence(self):
+        parser = JsonStreamParser()
+        events = parser.feed('```json\n{"match_score": 40}\n```')
+        assert events == [{"field": "match_score", "value": 40}]
+        assert parser.close() == {"match_score": 40}
+
+    def test_incomplete_object_keeps_parsed_fields(self):
+        parser = JsonStreamParser()
+        parser.feed('{"match_score": 55, "missing_keywords": ["Go", "Ru')
+        assert parser.close() == {"match_score": 55}
+
+    def test_no_object(self):
+        parser = JsonStreamParser()
+        parser.feed("I cannot help with that.")
+        with pytest.raises(ValueError, match="does not contain a JSON object"):
+            parser.close()
+
+
+## Test result helpers from structured
+
+
+class Test_structured_results:
+    def test_parse_result_fills_defaults(self):
+        assert parse_result('{"match_score": "130"}') == {
+            "match_score": 100,
+            "missing_keywords": [],
+            "suggested_edits": [],
+            "summary": "",
+        }
+
+    def test_normalize_result_bad_score(self):
+        assert normalize_result({"match_score": "high"})["match_score"] is None
+
+    def test_format_event(self):
+        assert format_event({"field": "match_score", "value": 72}) == "match_score: 72"
+        assert format_event({"field": "missing_keywords", "item": "Go"}) == (
+            "- missing_keywords: Go"
+        )
+        assert format_event({"field": "missing_keywords", "value": ["Go"]}) is None
+
+    def test_build_json_messages_keeps_prefix_order(self):
+        messages = build_json_messages("Resume", "Backend role")
+        assert "match_score" in messages[0]["content"]
+        assert messages[1]["content"].startswith("Job Description:\nBackend role")
@@ -1,7 +1,20 @@
-from utils import read_txt_file, read_pdf_file, read_word_file, read_file
+from utils import (
+    read_txt_file,
+    read_pdf_file,
+    read_word_file,
+    read_file,
+    iter_pdf_pages,
+    extract_pdf_pages,
+    write_to_file,
+    OutputWriter,
+    DocumentTooLarge,
+)
+from metrics import Metrics  # type: ignore
+from benchmarks.fixtures import make_pdf
 from unittest import mock
 import pytest
 
+
 ## Test read_txt_file from Utils.read_txt_file
 
 
@@ -23,6 +36,15 @@ class Test_read_txt_file:
         result = read_txt_file("empty.txt")
         assert result == ""
 
+    def test_read_txt_file_in_chunks(self, tmp_path):
+        path = tmp_path / "resume.txt"
+        path.write_text("x" * 200_000)
+
+        with mock.patch("utils.READ_CHUNK_SIZE", 1000):
+            # Stops reading once the limit is reached
+            assert read_txt_file(str(path), max_chars=2500) == "x" * 2500
+        assert read_txt_file(str(path)) == "x" * 200_000
+
 
 # Test read_pdf_file function
 class Test_read_pdf_file:
@@ -36,13 +58,63 @@ class Test_read_pdf_file:
         ]
 
         result = read_pdf_file("dummy.pdf")
-        assert result == "Page content"
+        assert result == "Page content\n"
 
     @mock.patch("utils.open", side_effect=FileNotFoundError)
     def test_read_pdf_file_not_found(self, mock_open):
         with pytest.raises(FileNotFoundError):
             read_pdf_file("missing.pdf")
 
+    def test_read_pdf_file_limits(self, tmp_path):
+        pdf_path = tmp_path / "resume.pdf"
+        pdf_path.write_bytes(make_pdf([f"Page {index}" for index in range(5)]))
+
+        assert read_pdf_file(str(pdf_path), max_pages=2) == "Page 0\nPage 1\n"
+        assert read_pdf_file(str(pdf_path), max_chars=8) == "Page 0\nP"
+
+    def test_read_pdf_file_parallel(self, tmp_path):
+        pdf_path = tmp_path / "portfolio.pdf"
+        pdf_path.write_bytes(make_pdf([f"Page {index}" for index in range(12)]))
+
+        expected = "".join(f"Page {index}\n" for index in range(12))
+        assert read_pdf_file(str(pdf_path), workers=3) == expected
+        assert read_pdf_file(str(pdf_path), workers=3, max_pages=10) == expected[:70]
+        assert read_pdf_file(str(pdf_path), workers=3, max_chars=15) == expected[:15]
+
+    def test_extract_pdf_pages_stops_at_max_chars(self, tmp_path):
+        pdf_path = tmp_path / "portfolio.pdf"
+        pdf_path.write_bytes(make_pdf([f"Page {index}" for index in range(6)]))
+
+        assert extract_pdf_pages(str(pdf_path), 2, 6, max_chars=8) == ["Page 2\n", "P"]
+
+
+# Test iter_pdf_pages function
+class Test_iter_pdf_pages:
+    @mock.patch("utils.open", new_callable=mock.mock_open, read_data=b"%PDF-1.4")
+    @mock.patch("utils.PdfReader")
+    def test_iter_pdf_pages_is_lazy(self, mock_pdf_reader, mock_open):
+        pages = [
+            mock.Mock(extract_text=mock.Mock(return_value=f"Page {index}"))
+            for index in range(3)
+        ]
+        mock_pdf_reader.return_value.pages = pages
+
+        iterator = iter_pdf_pages("dummy.pdf")
+        assert next(iterator) == "Page 0\n"
+        pages[1].extract_text.assert_not_called()
+        assert list(iterator) == ["Page 1\n", "Page 2\n"]
+
+    @mock.patch("utils.open", new_callable=mock.mock_open, read_data=b"%PDF-1.4")
+    @mock.patch("utils.PdfReader")
+    def test_iter_pdf_pages_stops_at_char_limit(self, mock_pdf_reader, mock_open):
+        pages = [
+            mock.Mock(extract_text=mock.Mock(return_value="12345")) for _ in range(3)
+        ]
+        mock_pdf_reader.return_value.pages = pages
+
+        assert list(iter_pdf_pages("dummy.pdf", max_chars=7)) == ["12345\n", "1"]
+        pages[2].extract_text.assert_not_called()
+
 
 # Test read_word_file function
 class Test_read_word_file:
@@ -58,6 +130,24 @@ class Test_read_word_file:
         result = read_word_file("dummy.docx")
         assert result == "Paragraph 1\nParagraph 2"
 
+    @mock.patch("utils.Document")
+    def test_read_word_file_char_limit(self, mock_document):
+        mock_document.return_value.paragraphs = [
+            mock.Mock(text="Paragraph 1"),
+            mock.Mock(text="Paragraph 2"),
+        ]
+        assert read_word_file("dummy.docx", max_chars=14) == "Paragraph 1\nPa"
+
+    def test_read_word_file_rejects_zip_bomb(self, tmp_path):
+        import zipfile
+
+        path = tmp_path / "bomb.docx"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("word/document.xml", "0" * 1_000_000)
+
+        with pytest.raises(DocumentTooLarge, match="expands to"):
+            read_word_file(str(path), max_bytes=path.stat().st_size)
+
     @mock.patch("utils.Document", side_effect=FileNotFoundError)
     def test_read_word_file_not_found(self, mock_document):
         with pytest.raises(FileNotFoundError):
@@ -84,3 +174,74 @@ class Test_read_file:
     def test_read_file_unsupported(self):
         with pytest.raises(ValueError, match="Unsupported file type: .unknown"):
             read_file("dummy.unknown")
+
+    def test_read_file_uses_cache(self):
+        cache = mock.Mock()
+        cache.read.return_value = "Cached content"
+        with mock.patch("utils.read_word_file") as mock_read_word:
+            result = read_file("dummy.docx", cache=cache)
+        assert result == "Cached content"
+        cache.read.assert_called_once_with("dummy.docx", mock_read_word, None)
+
+    def test_read_file_rejects_large_document(self, tmp_path):
+        path = tmp_path / "upload.pdf"
+        path.write_bytes(b"%PDF-1.4" + b"0" * 2000)
+
+        with mock.patch("utils.read_pdf_file") as mock_read_pdf:
+            with pytest.raises(DocumentTooLarge, match="limited to 1000"):
+                read_file(str(path), max_bytes=1000)
+        # Rejected before any parsing
+        mock_read_pdf.assert_not_called()
+
+    def test_read_file_records_peak_rss(self, tmp_path):
+        path = tmp_path / "resume.txt"
+        path.write_text("Text content")
+
+        metrics = Metrics()
+        with mock.patch("utils.get_metrics", return_value=metrics):
+            read_file(str(path))
+        [span] = metrics.spans
+        assert span["name"] == "read_file"
+        assert span["peak_rss"] > 0
+        assert span["peak_rss_growth"] >= 0
+
+
+# Test write_to_file and OutputWriter
+class Test_write_to_file:
+    def test_write_to_file_adds_extension(self, tmp_path):
+        write_to_file(str(tmp_path / "result"), "Enhanced resume")
+        assert (tmp_path / "result.txt").read_text() == "Enhanced resume"
+
+    def test_write_to_file_unsupported(self, tmp_path):
+        with pytest.raises(ValueError, match="Unsupported outfile type: .pdf"):
+            write_to_file(str(tmp_path / "result.pdf"), "Enhanced resume")
+
+    def test_output_writer_renames_when_closed(self, tmp_path):
+        path = tmp_path / "result.txt"
+        path.write_text("previous run")
+        with OutputWriter(str(path), flush_interval=0) as writer:
+            writer.write("first ")
+            # Flushed to the part file, the old output is still in place
+            assert (tmp_path / "result.txt.part").read_text() == "first "
+            assert path.read_text() == "previous run"
+            writer.write("second")
+
+        assert path.read_text() == "first second"
+        assert not (tmp_path / "result.txt.part").exists()
+
+    def test_output_writer_keeps_part_on_error(self, tmp_path):
+        path = tmp_path / "result.txt"
+        with pytest.raises(RuntimeError):
+            with OutputWriter(str(path)) as writer:
+                writer.write("partial")
+                raise RuntimeError("stream dropped")
+
+        assert not path.exists()
+        assert (tmp_path / "result.txt.part").read_text() == "partial"
+
+    def test_output_writer_removes_empty_part_on_error(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            with OutputWriter(str(tmp_path / "result.txt")):
+                raise RuntimeError("request failed")
+
+        assert list(tmp_path.iterdir()) == []
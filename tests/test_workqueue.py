@@ -0,0 +1,153 @@
+from workqueue import WorkQueue  # type: ignore
+from batch import drain_queue  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import pytest  # type: ignore
+
+JOBS = [("r1.txt", "d1.txt", "model"), ("r2.txt", "d1.txt", "model")]
+
+
+## Test WorkQueue from workqueue.WorkQueue
+
+
+class Test_WorkQueue:
+    def test_claim_and_finish(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        assert queue.add(JOBS) == 2
+
+        job = queue.claim()
+        assert (job["resume"], job["attempts"]) == ("r1.txt", 1)
+        queue.finish(job, "out.txt", SimpleNamespace(total_tokens=10))
+
+        assert queue.counts() == {"done": 1, "pending": 1}
+        [done] = queue.jobs("done")
+        assert done["output"] == "out.txt"
+        assert done["usage"]["total_tokens"] == 10
+
+    def test_state_survives_reopening(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        queue = WorkQueue(path)
+        queue.add(JOBS)
+        queue.finish(queue.claim(), "out.txt", None)
+        queue.close()
+
+        # An interrupted run adds the same jobs again, only the rest is left
+        queue = WorkQueue(path)
+        assert queue.add(JOBS) == 0
+        assert queue.claim()["resume"] == "r2.txt"
+        assert queue.claim() is None
+
+    def test_output_names_are_stored_and_old_queues_migrated(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        with sqlite3.connect(path) as db:
+            db.execute(
+                "CREATE TABLE jobs (id INTEGER PRIMARY KEY, resume TEXT NOT NULL, "
+                "description TEXT NOT NULL, model TEXT NOT NULL, "
+                "status TEXT NOT NULL DEFAULT 'pending', "
+                "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, lease_until REAL, "
+                "output TEXT, usage TEXT, error TEXT, updated_at REAL, "
+                "UNIQUE (resume, description, model))"
+            )
+
+        queue = WorkQueue(path)
+        queue.add([(*JOBS[0], "r1_d1_model.txt"), JOBS[1]])
+        assert queue.claim()["output_name"] == "r1_d1_model.txt"
+        assert queue.claim()["output_name"] is None
+
+    def test_failed_jobs_are_retried(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / "queue.db"), max_attempts=2)
+        queue.add(JOBS[:1])
+
+        assert queue.fail(queue.claim(), "timeout") == "pending"
+        assert queue.fail(queue.claim(), "timeout") == "failed"
+        assert queue.claim() is None
+
+        # Adding the job again gives it a fresh set of attempts
+        queue.add(JOBS[:1])
+        assert queue.claim()["attempts"] == 1
+
+    def test_close_releases_interrupted_claims(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        queue = WorkQueue(path)
+        queue.add(JOBS)
+        queue.claim()
+        queue.close()
+
+        queue = WorkQueue(path)
+        queue.add(JOBS)
+        assert queue.counts() == {"pending": 2}
+        assert queue.claim()["attempts"] == 1
+
+    def test_jobs_of_dead_processes_are_reclaimed_on_open(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        queue = WorkQueue(path)
+        queue.add(JOBS[:1])
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        queue.claim(worker=f"{socket.gethostname()}:{dead.pid}:1")
+        queue.claim(worker="elsewhere:1:1")
+
+        assert WorkQueue(path).counts() == {"pending": 1}
+
+    def test_expired_lease_is_reclaimed(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / "queue.db"), lease=0.05)
+        queue.add(JOBS[:1])
+
+        assert queue.claim(worker="crashed") is not None
+        assert queue.claim() is None
+        time.sleep(0.1)
+        assert queue.claim()["attempts"] == 2
+
+    def test_concurrent_workers_never_share_a_job(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        WorkQueue(path).add((f"r{i}.txt", "d.txt", "model") for i in range(50))
+
+        def drain(worker):
+            # Separate queue objects, as in separate processes
+            queue = WorkQueue(path)
+            claimed = []
+            while (job := queue.claim(worker=worker)) is not None:
+                claimed.append(job["id"])
+                queue.finish(job, None, None)
+            return claimed
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            claimed = list(executor.map(drain, ["a", "b", "c", "d"]))
+
+        ids = [job_id for worker_ids in claimed for job_id in worker_ids]
+        assert sorted(ids) == list(range(1, 51))
+        assert WorkQueue(path).counts() == {"done": 50}
+
+
+## Test drain_queue from batch.drain_queue
+
+
+class Test_drain_queue:
+    def test_interrupted_job_goes_back_to_the_queue(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        queue.add(JOBS)
+
+        def enhance(resume, description, model, output_name):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            drain_queue(queue, enhance)
+        assert queue.counts() == {"pending": 2}
+
+    def test_stop_flag_stops_claiming(self, tmp_path):
+        queue = WorkQueue(str(tmp_path / "queue.db"))
+        queue.add(JOBS)
+        stop = threading.Event()
+
+        def enhance(resume, description, model, output_name):
+            stop.set()
+            return {"error": None, "output": "out.txt", "usage": None}
+
+        assert len(drain_queue(queue, enhance, stop)) == 1
+        assert queue.counts() == {"done": 1, "pending": 1}